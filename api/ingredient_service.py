@@ -1,24 +1,29 @@
 # ingredients.py
+import asyncio
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
-from typing import List
-import google.generativeai as generativeai
-import logging, os, json
-from dotenv import load_dotenv
-from utils.youtube_download import recog_video
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import AsyncIterator, Callable, List, Literal
+import logging
+import orjson
+from utils.youtube_download import recog_video, video_cache_key
+from utils.state_backend import get_state_backend
+from utils.genai_client import get_google_ai_key
+from utils.model_router import routed_generate, routed_generate_async, routed_stream, task_model
+from utils.streaming_json import StreamingJSONParser
+from utils.youtube_captions import CAPTION_FAST_PATH, MIN_INGREDIENTS, fetch_video_text, format_video_text
+from utils.ingredient_lexicon import categorize_recipe_ingredients
+from api import search_service
+from utils.structured_output import (
+    StructuredOutputError,
+    build_response_schema,
+    make_gemini_repair,
+    parse_structured,
+)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-load_dotenv()
-
-GOOGLE_AI_KEY = os.getenv("GOOGLE_AI_KEY")
-if not GOOGLE_AI_KEY:
-    logger.error("GOOGLE_AI_KEY environment variable not found.")
-else:
-    logger.info("GOOGLE_AI_KEY key is set.")
-    generativeai.configure(api_key=GOOGLE_AI_KEY)
-
 # 🔹 여기서는 FastAPI 말고 APIRouter 사용
 router = APIRouter(
     prefix="/ingredients",
@@ -51,6 +56,174 @@ class FoodRequest(BaseModel):
 class IngredientsResponse(BaseModel):
     ingredients: List[IngredientCategory]
 
+class IngredientClassification(BaseModel):
+    name: str
+    category: Literal["과일/채소", "정육", "쌀/면", "수산물", "양념/소스", "우유/유제품"]
+
+
+def classify_unknown_ingredients(names: List[str]) -> dict:
+    """
+    로컬 사전에 없는 재료명만 Gemini 로 분류합니다.
+    반환값: 재료명 → IngredientCategory 필드명
+    """
+    alias_to_field = {info.alias: field for field, info in IngredientCategory.model_fields.items()}
+    result = routed_generate(
+        "ingredients_classify",
+        "다음 재료를 장보기 카테고리로 분류하세요: " + ", ".join(names),
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": build_response_schema(List[IngredientClassification]),
+        },
+    )
+    classified = parse_structured(result.text or "", List[IngredientClassification])
+    return {item.name: alias_to_field[item.category] for item in classified}
+
+
+def build_ingredients_from_recipe(menu_name: str, recipe_text: str) -> IngredientsResponse | None:
+    """
+    이미 받아 둔 레시피의 [재료] 섹션을 로컬 사전으로 분류해 응답을 만듭니다.
+    사전에 없는 재료가 있을 때만 Gemini 로 그 재료들만 분류합니다.
+    [재료] 섹션을 찾지 못하면 None 을 반환합니다.
+    """
+    categorized, unknown = categorize_recipe_ingredients(recipe_text)
+    if not unknown and not any(categorized.values()):
+        return None
+
+    if unknown:
+        logger.info(f"Local lexicon missed {len(unknown)} ingredients, asking Gemini: {unknown}")
+        classified = classify_unknown_ingredients([item["name"] for item in unknown])
+        for item in unknown:
+            # 모델도 분류하지 못한 재료는 양념/소스로 둠
+            categorized[classified.get(item["name"], "sauce")].append(item)
+
+    return IngredientsResponse(ingredients=[IngredientCategory(food_name=menu_name, **categorized)])
+
+
+# 영상/자막 재료 추출 고정 지시문 (prompt_cache 로 한 번만 묶어 둠)
+LINK_INGREDIENTS_INSTRUCTION = """
+주어진 요리 영상 또는 영상 정보를 분석해서 필요한 재료를 카테고리별로 정리하세요.
+
+규칙:
+- 메뉴명은 영상의 핵심 요리 이름으로 채웁니다.
+- 재료명(name)은 한국어로 작성합니다.
+- 계량 정보가 없으면 quantity 에 "적당량" 또는 "약간"처럼 합리적인 값을 넣습니다.
+- 해당 카테고리에 재료가 없으면 빈 배열로 둡니다.
+"""
+
+# 영상 재료 추출 요청 (job_service 의 백그라운드 작업에서도 사용, link_model() 과 함께)
+LINK_INGREDIENTS_PROMPT = "이 영상에 나온 재료를 정리하세요."
+
+CAPTION_INGREDIENTS_RULE = "아래 영상 정보에 나온 재료만 사용하고, 나오지 않은 재료는 추측하지 않습니다.\n\n"
+
+MENU_INGREDIENTS_INSTRUCTION = """
+자취생 요리 재료 추천 도우미로서 주어진 메뉴를 만들기 위한 재료를 카테고리별로 정리하세요.
+
+규칙:
+- "ingredients" 배열에 객체 하나를 넣고, "메뉴명"은 주어진 메뉴명을 그대로 사용합니다.
+- 재료명(name)은 한국어로 작성합니다.
+- 계량 정보가 없으면 quantity 에 "적당량" 또는 "약간"처럼 합리적인 값을 넣습니다.
+- 해당 카테고리에 재료가 없으면 빈 배열로 둡니다.
+"""
+
+
+def menu_generation_config() -> dict:
+    # 응답 형식은 response_schema 로, 내용 규칙은 고정 지시문으로 묶어 두고 메뉴명만 보냄
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": build_response_schema(IngredientsResponse),
+    }
+
+
+def menu_prompt(menu_name: str) -> str:
+    return f'메뉴명: "{menu_name}"'
+
+
+def parse_menu_ingredients(raw_response: str) -> IngredientsResponse:
+    # 파싱/검증 실패 시 잘못된 카테고리 조각만 다시 생성
+    return parse_structured(
+        raw_response,
+        IngredientsResponse,
+        item_type=IngredientCategory,
+        repair=make_gemini_repair(),
+    )
+
+
+def stored_menu_ingredients(menu_name: str) -> IngredientsResponse | None:
+    """저장된 결과, 또는 같은 메뉴의 레시피를 이미 받아 뒀다면 LLM 호출 없이 로컬 사전으로 분류한 결과"""
+    store = get_state_backend()
+    store_key = search_service.menu_key(menu_name)
+
+    cached = store.get_result("ingredients_menu", store_key)
+    if cached:
+        return IngredientsResponse(**cached)
+
+    recipe_text = search_service.get_cached_recipe(menu_name)
+    if recipe_text:
+        try:
+            local_response = build_ingredients_from_recipe(menu_name, recipe_text)
+            if local_response:
+                logger.info(f"Built ingredients for '{menu_name}' from cached recipe.")
+                store.put_result("ingredients_menu", store_key, local_response.model_dump(by_alias=True))
+                return local_response
+        except Exception as e:
+            logger.warning(f"Local ingredient categorization failed, falling back to Gemini: {e}")
+    return None
+
+
+def link_model(task: str = "ingredients_link"):
+    return task_model(task, "link_ingredients", LINK_INGREDIENTS_INSTRUCTION)
+
+
+def link_generation_config() -> dict:
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": build_response_schema(List[IngredientCategory]),
+    }
+
+
+def parse_link_ingredients(raw_response: str) -> List[IngredientCategory]:
+    # 영상 분석은 비싸므로, 실패한 카테고리 조각만 텍스트로 복구
+    return parse_structured(
+        raw_response,
+        List[IngredientCategory],
+        item_type=IngredientCategory,
+        repair=make_gemini_repair(),
+    )
+
+
+def extract_link_ingredients_from_captions(link: str) -> List[IngredientCategory] | None:
+    """
+    영상을 받지 않고 제목/설명/자막만으로 재료를 추출해 봅니다.
+    재료가 MIN_INGREDIENTS 개 이상 나오면 결과, 아니면 None (영상 분석으로 넘어감)
+    """
+    video_text = fetch_video_text(link)
+    if not video_text:
+        return None
+
+    prompt = CAPTION_INGREDIENTS_RULE + format_video_text(video_text)
+    try:
+        result = routed_generate(
+            "ingredients_captions", prompt, "link_ingredients", LINK_INGREDIENTS_INSTRUCTION,
+            generation_config=link_generation_config(),
+        )
+        categories = parse_link_ingredients(result.text or "")
+    except StructuredOutputError as e:
+        logger.warning(f"Caption-based ingredient output unusable, falling back to video: {e}")
+        return None
+    except Exception as e:
+        # Gemini 호출 실패도 영상 분석으로 넘어감 (fetch_video_text 와 같은 처리)
+        logger.warning(f"Caption-based ingredient extraction failed, falling back to video: {e}")
+        return None
+    total = sum(
+        len(getattr(category, field))
+        for category in categories
+        for field in IngredientCategory.model_fields
+        if field != "food_name"
+    )
+    logger.info(f"Caption-based ingredient extraction found {total} ingredients.")
+    return categories if total >= MIN_INGREDIENTS else None
+
+
 @router.post(
     "/menu",
     response_model=IngredientsResponse,
@@ -61,95 +234,43 @@ async def get_ingredients_by_menu(request: FoodRequest):
     사용자가 보낸 메뉴명을 기반으로 Gemini에게 재료 목록을 요청하고,
     IngredientResponse 형식에 맞춰 반환합니다.
     """
-    if not GOOGLE_AI_KEY:
-        raise HTTPException(status_code=500, detail="Google AI API key is not configured.")
-
-    try:
-        model = generativeai.GenerativeModel("gemini-2.0-flash")
-    except Exception as e:
-        logger.error(f"Failed to initialize Gemini model: {e}")
-        raise HTTPException(status_code=500, detail="Failed to initialize Gemini model.")
-
     menu_name = request.food_name
+    store = get_state_backend()
+    store_key = search_service.menu_key(menu_name)
+
+    # 🔹 저장된 결과나 이미 받아 둔 레시피가 있으면 LLM 호출 없이 반환
+    # 저장소 조회와 로컬 분류(모르는 재료는 Gemini 호출)는 이벤트 루프 밖에서
+    stored = await asyncio.to_thread(stored_menu_ingredients, menu_name)
+    if stored:
+        return stored
 
-    # 🔹 IngredientResponse 형식을 "강하게" 강제하는 프롬프트
-    prompt = f"""
-    당신은 자취생 요리 재료 추천 도우미입니다.
-
-    사용자가 요리 이름을 주면, 그 요리를 만들기 위한 재료를
-    아래 JSON 형식으로만, 추가 설명 없이 반환하세요.
-
-    사용자가 보낸 메뉴명: "{menu_name}"
-
-    반환 형식(JSON 예시):
-
-    {{
-      "ingredients": [
-        {{
-          "메뉴명": "{menu_name}",
-          "과일/채소": [{{ "name": "양파", "quantity": "1/2개" }}],
-          "정육": [],
-          "쌀/면": [],
-          "수산물": [],
-          "양념/소스": [],
-          "우유/유제품": []
-        }}
-      ]
-    }}
-
-    규칙:
-    - 반드시 위와 완전히 동일한 key 들만 사용하세요.
-      ("ingredients", "메뉴명", "과일/채소", "정육", "쌀/면", "수산물", "양념/소스", "우유/유제품")
-    - "ingredients" 값은 하나 이상의 객체를 가진 배열입니다.
-    - 각 재료 카테고리 값은 {{ "name": string, "quantity": string }} 형태의 객체 배열입니다.
-    - 재료명(name)은 한국어로 작성합니다.
-    - 계량 정보가 없으면 quantity 에 "적당량" 또는 "약간"처럼 합리적인 값을 넣습니다.
-    - 해당 카테고리에 재료가 없으면 [] (빈 배열) 로 둡니다.
-    - "메뉴명" 필드는 반드시 사용자가 보낸 메뉴명("{menu_name}")을 그대로 사용하세요.
-    - JSON 이외의 다른 텍스트(설명, 문장, 주석, 마크다운, ``` 등)는 절대 출력하지 마세요.
-    """
-
-    generation_config = {"response_mime_type": "application/json"}
+    if not get_google_ai_key():
+        raise HTTPException(status_code=500, detail="Google AI API key is not configured.")
 
     try:
         logger.info(f"Generating ingredients for menu: {menu_name}")
-        result = model.generate_content(
-            prompt,
-            generation_config=generation_config,
+        result = await routed_generate_async(
+            "ingredients_menu",
+            menu_prompt(menu_name),
+            "menu_ingredients",
+            MENU_INGREDIENTS_INSTRUCTION,
+            generation_config=menu_generation_config(),
         )
 
         raw_response = result.text or ""
         logger.info("Gemini raw output received for /menu.")
         logger.debug(f"Raw response content: {raw_response}")
 
-        # 혹시라도 ```json ... ``` 형태로 줄 경우 대비
-        if raw_response.startswith("```json"):
-            raw_response = raw_response.strip()
-            if raw_response.endswith("```"):
-                raw_response = raw_response[7:-3].strip()
-
-        try:
-            data = json.loads(raw_response)
-        except json.JSONDecodeError as e:
-            logger.error(f"Model output is not valid JSON despite requesting it. Error: {e}")
-            logger.error(f"Invalid response content: {raw_response}")
-            raise HTTPException(
-                status_code=500,
-                detail="Gemini에서 유효한 JSON 형식이 반환되지 않았습니다.",
-            )
-
-        # 🔹 Pydantic으로 한 번 더 검증해서 IngredientResponse 형식 보장
-        try:
-            ingredients_response = IngredientsResponse(**data)
-        except ValidationError as e:
-            logger.error(f"Pydantic validation error for IngredientsResponse: {e}")
-            raise HTTPException(
-                status_code=500,
-                detail="모델 응답이 IngredientResponse 형식과 일치하지 않습니다.",
-            )
-
+        # 🔹 파싱/검증 실패 시 잘못된 카테고리 조각만 다시 생성
+        ingredients_response = await asyncio.to_thread(parse_menu_ingredients, raw_response)
+        await asyncio.to_thread(
+            store.put_result, "ingredients_menu", store_key, ingredients_response.model_dump(by_alias=True)
+        )
         return ingredients_response
 
+    except StructuredOutputError as se:
+        logger.error(f"Structured output error: {se}")
+        raise HTTPException(status_code=500, detail=str(se))
     except ValueError as ve:
         logger.error(f"Data processing error: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -160,73 +281,36 @@ async def get_ingredients_by_menu(request: FoodRequest):
             detail=f"An unexpected error occurred: {e}",
         )
 
-@router.post(
-    "/link",
-    response_model=List[IngredientCategory],
-    response_model_by_alias=True,
-)
-async def get_ingredients_by_link(request: LinkRequest):
-    if not GOOGLE_AI_KEY:
-        raise HTTPException(status_code=500, detail="Google AI KEY is not configured.")
+@router.post("/link")
+async def get_ingredients_by_link(request: LinkRequest, wait: bool = False):
+    """
+    영상 재료 추출을 백그라운드 작업으로 등록하고 job_id 를 바로 반환 (/jobs/ingredients-link 와 같음)
+    ?wait=true 면 작업이 끝날 때까지 기다려 예전처럼 카테고리별 재료 목록을 반환
+    (자막 추출/다운로드/업로드/생성은 작업 단계에서 이벤트 루프 밖으로 실행됨)
+    """
+    # job_service 가 이 모듈을 import 하므로 여기서 import
+    from api.job_service import runner
 
-    try:
-        model = generativeai.GenerativeModel("gemini-2.0-flash")
-    except Exception as e:
-        logger.error(f"Failed to initialize Gemini model: {e}")
-        raise HTTPException(status_code=500, detail="Failed to initialize Gemini model.")
-        
-    link = request.link
+    # 저장된 결과는 키 없이도 작업에서 바로 반환됨
+    cached = await asyncio.to_thread(get_state_backend().has_result, "ingredients_link", video_cache_key(request.link))
+    if not cached and not get_google_ai_key():
+        raise HTTPException(status_code=500, detail="Google AI KEY is not configured.")
 
-    prompt = """
-    주어진 요리 영상을 분석해서 필요한 재료를 아래 JSON 형식으로만, 추가 설명 없이 반환하세요.
-    메뉴명은 영상의 핵심 요리 이름으로 채우세요.
-
-    출력 형식 (예시):
-    [
-      {
-        "메뉴명": "사과 파스타",
-        "과일/채소": [{ "name": "사과", "quantity": "1/4개" }],
-        "정육": [{ "name": "목살", "quantity": "1kg" }],
-        "쌀/면": [{ "name": "파스타면", "quantity": "1인분" }],
-        "수산물": [],
-        "양념/소스": [{ "name": "돈가스소스", "quantity": "3T" }],
-        "우유/유제품": []
-      }
-    ]
-
-    규칙:
-    - 반드시 위와 완전히 동일한 key 들만 사용하세요.
-      ("메뉴명", "과일/채소", "정육", "쌀/면", "수산물", "양념/소스", "우유/유제품")
-    - 각 value 는 { "name": string, "quantity": string } 객체의 배열입니다.
-    - 재료명(name)은 한국어로 작성합니다.
-    - 계량 정보가 없으면 quantity 에 "적당량" 또는 "약간"처럼 합리적인 값을 넣습니다.
-    - 해당 카테고리에 재료가 없으면 [] (빈 배열) 로 둡니다.
-    - JSON 이외의 다른 텍스트(설명, 문장, 주석, 마크다운, ``` 등)는 절대 출력하지 마세요.
-    """
-
-    generation_config = {"response_mime_type": "application/json"}
+    payload = {"link": request.link}
+    if not wait:
+        job_id = await runner.submit("ingredients_link", payload)
+        return {"job_id": job_id, "status": "queued"}
 
     try:
-        logger.info(f"Processing link: {link}")
-        raw_response = recog_video(prompt, link, model, generation_config)
-        logger.info(f"Gemini raw output received.")
-        logger.debug(f"Raw response content: {raw_response}")
-
-        if raw_response.startswith("```json") and raw_response.endswith("```"):
-            raw_response = raw_response[7:-3].strip()
-
-        try:
-            data = json.loads(raw_response)
-        except json.JSONDecodeError as e:
-            logger.error(f"Model output is not valid JSON despite requesting it. Error: {e}")
-            logger.error(f"Invalid response content: {raw_response}")
-            raise HTTPException(
-                status_code=500,
-                detail="Gemini에서 유효한 JSON 형식이 반환되지 않았습니다.",
-            )
-
-        return data
-        
+        logger.info(f"Processing link: {request.link}")
+        result = await runner.run("ingredients_link", payload)
+        return [IngredientCategory(**category) for category in result]
+
+    except HTTPException:
+        raise
+    except StructuredOutputError as se:
+        logger.error(f"Structured output error: {se}")
+        raise HTTPException(status_code=500, detail=str(se))
     except ValueError as ve:
         logger.error(f"Data processing error: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -236,3 +320,166 @@ async def get_ingredients_by_link(request: LinkRequest):
             status_code=500,
             detail=f"An unexpected error occurred: {e}",
         )
+
+
+# --- 스트리밍 (NDJSON) ---
+# 카테고리 배열 기준 경로: (i,) 카테고리, (i, "메뉴명") 메뉴명, (i, "과일/채소", j) 재료 하나
+def _wanted_path(path: tuple) -> bool:
+    return (
+        len(path) == 1
+        or (len(path) == 2 and path[1] == "메뉴명")
+        or (len(path) == 3 and isinstance(path[2], int))
+    )
+
+
+def ingredient_event(path: tuple, value) -> dict | None:
+    """스트리밍 파서가 완성한 값을 검증해서 이벤트로. 검증에 실패한 조각은 건너뜀 (최종 done 에서 복구된 결과를 보냄)"""
+    try:
+        if len(path) == 1:
+            category = IngredientCategory.model_validate(value)
+            return {"type": "category", "index": path[0], "category": category.model_dump(by_alias=True)}
+        if len(path) == 2:
+            return {"type": "menu", "index": path[0], "메뉴명": value} if isinstance(value, str) else None
+        item = Ingredient.model_validate(value)
+        return {"type": "ingredient", "index": path[0], "category": path[1], "item": item.model_dump()}
+    except ValidationError as e:
+        logger.debug(f"Skipping invalid streamed fragment at {path}: {e}")
+        return None
+
+
+class IngredientStream:
+    """Gemini 가 내보내는 JSON 조각을 받아 완성된 재료/카테고리를 바로 emit (root 는 카테고리 배열까지의 경로)"""
+
+    def __init__(self, emit: Callable[[dict], None], root: tuple = ()):
+        self.emit = emit
+        self.root = root
+        self.parser = StreamingJSONParser(
+            lambda path: path[:len(root)] == root and _wanted_path(path[len(root):])
+        )
+
+    def feed(self, text: str):
+        for path, value in self.parser.feed(text):
+            event = ingredient_event(path[len(self.root):], value)
+            if event:
+                self.emit(event)
+
+    @property
+    def text(self) -> str:
+        return self.parser.text
+
+
+def _emit_categories(emit: Callable[[dict], None], categories: List[IngredientCategory], source: str):
+    """한 번에 받은 결과 (저장된 결과, 자막 기반 추출)"""
+    dumped = [category.model_dump(by_alias=True) for category in categories]
+    for index, category in enumerate(dumped):
+        emit({"type": "category", "index": index, "category": category})
+    emit({"type": "done", "source": source, "ingredients": dumped})
+
+
+async def _ndjson(produce: Callable[[Callable[[dict], None]], None]) -> AsyncIterator[bytes]:
+    """
+    produce(emit) 를 스레드에서 실행하고 emit 한 이벤트를 한 줄씩 보냄.
+    클라이언트가 끊겨도 생성은 끝까지 진행되어 결과가 저장됩니다.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    def emit(event: dict):
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def run():
+        try:
+            produce(emit)
+        except StructuredOutputError as e:
+            logger.error(f"Structured output error while streaming: {e}")
+            emit({"type": "error", "detail": str(e)})
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while streaming: {e}")
+            emit({"type": "error", "detail": f"An unexpected error occurred: {e}"})
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+    worker = asyncio.ensure_future(asyncio.to_thread(run))
+    while (event := await queue.get()) is not finished:
+        yield orjson.dumps(event) + b"\n"
+    await worker
+
+
+def _stream_response(produce) -> StreamingResponse:
+    return StreamingResponse(
+        _ndjson(produce), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/menu/stream")
+async def stream_ingredients_by_menu(request: FoodRequest):
+    """
+    /menu 와 같은 결과를 생성되는 대로 NDJSON 으로 보냅니다.
+    이벤트: menu(메뉴명), ingredient(재료 하나), category(완성된 카테고리), 마지막에 done(검증/복구된 전체 결과) 또는 error
+    """
+    menu_name = request.food_name
+    stored = await asyncio.to_thread(stored_menu_ingredients, menu_name)
+    if stored:
+        return _stream_response(lambda emit: _emit_categories(emit, stored.ingredients, "stored"))
+
+    if not get_google_ai_key():
+        raise HTTPException(status_code=500, detail="Google AI API key is not configured.")
+
+    def produce(emit):
+        logger.info(f"Streaming ingredients for menu: {menu_name}")
+        stream = IngredientStream(emit, root=("ingredients",))
+        for text in routed_stream(
+            "ingredients_menu",
+            menu_prompt(menu_name),
+            "menu_ingredients",
+            MENU_INGREDIENTS_INSTRUCTION,
+            generation_config=menu_generation_config(),
+        ):
+            stream.feed(text)
+        response = parse_menu_ingredients(stream.text)
+        dumped = response.model_dump(by_alias=True)
+        get_state_backend().put_result("ingredients_menu", search_service.menu_key(menu_name), dumped)
+        emit({"type": "done", "source": "gemini", "ingredients": dumped["ingredients"]})
+
+    return _stream_response(produce)
+
+
+@router.post("/link/stream")
+async def stream_ingredients_by_link(request: LinkRequest):
+    """
+    /link 와 같은 결과를 NDJSON 으로 보냅니다.
+    자막 기반 추출이 충분하면 그 결과를 한 번에, 아니면 stage(video) 이벤트 뒤 영상 분석 결과를 생성되는 대로 보냅니다.
+    """
+    link = request.link
+    store = get_state_backend()
+    store_key = video_cache_key(link)
+
+    cached = await asyncio.to_thread(store.get_result, "ingredients_link", store_key)
+    if cached:
+        categories = [IngredientCategory(**category) for category in cached]
+        return _stream_response(lambda emit: _emit_categories(emit, categories, "stored"))
+
+    if not get_google_ai_key():
+        raise HTTPException(status_code=500, detail="Google AI KEY is not configured.")
+
+    def produce(emit):
+        logger.info(f"Streaming ingredients for link: {link}")
+        categories = extract_link_ingredients_from_captions(link) if CAPTION_FAST_PATH else None
+        if categories is not None:
+            store.put_result("ingredients_link", store_key, [c.model_dump(by_alias=True) for c in categories])
+            _emit_categories(emit, categories, "captions")
+            return
+
+        emit({"type": "stage", "stage": "video"})
+        stream = IngredientStream(emit)
+        raw_response = recog_video(
+            LINK_INGREDIENTS_PROMPT, link, link_model(), link_generation_config(),
+            task="ingredients_link", on_chunk=stream.feed,
+        )
+        categories = parse_link_ingredients(raw_response)
+        dumped = [c.model_dump(by_alias=True) for c in categories]
+        store.put_result("ingredients_link", store_key, dumped)
+        emit({"type": "done", "source": "video", "ingredients": dumped})
+
+    return _stream_response(produce)
@@ -0,0 +1,423 @@
+# job_service.py
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from api import ingredient_service, search_service
+from utils.state_backend import get_state_backend
+from utils.video_workspace import get_workspace
+from utils.youtube_captions import CAPTION_FAST_PATH
+from utils.youtube_download import (
+    cleanup_video,
+    download_youtube,
+    generate_from_video,
+    upload_video,
+    video_cache_key,
+    wait_until_active,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+# 동시에 실행할 작업 수 / 다운로드용 프로세스 수 / 대기열 길이
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_PROCESS_WORKERS = int(os.getenv("JOB_PROCESS_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+
+FINISHED_STATUSES = ("done", "failed")
+# 다운로드 진행률은 이 간격(%)마다 한 번만 이벤트로 기록
+DOWNLOAD_PROGRESS_STEP = 5
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+)
+
+
+class YoutubeJobRequest(BaseModel):
+    video_url: str
+
+
+class LinkJobRequest(BaseModel):
+    link: str
+
+
+class JobContext:
+    """작업 하나의 단계별 실행/시간 기록과 진행 이벤트"""
+
+    def __init__(self, runner: "JobRunner", job_id: str):
+        self.runner = runner
+        self.job_id = job_id
+        self.stages: dict[str, float] = {}
+        self._last_percent = -DOWNLOAD_PROGRESS_STEP
+
+    def emit(self, event_type: str, **data):
+        """진행 이벤트 기록 (스레드에서 호출해도 됨). /jobs/{id}/events, /jobs/{id}/ws 로 전달"""
+        get_state_backend().add_job_event(self.job_id, {"type": event_type, **data})
+
+    def on_download_progress(self, downloaded: int, total: int):
+        percent = int(downloaded * 100 / total) if total else 0
+        if percent - self._last_percent >= DOWNLOAD_PROGRESS_STEP or downloaded >= total:
+            self._last_percent = percent
+            self.emit("download", downloaded=downloaded, total=total, percent=percent)
+
+    def on_processing_state(self, state: str):
+        self.emit("processing", state=state)
+
+    def on_chunk(self, text: str):
+        self.emit("chunk", text=text)
+
+    async def stage(self, name: str, func, *args, process: bool = False, progress=None):
+        """
+        func 를 실행하고 걸린 시간을 기록합니다.
+        - process=True: 다운로드처럼 CPU/디스크를 많이 쓰는 단계는 프로세스 풀에서 실행
+          progress 를 주면 func 의 마지막 인자로 진행률 콜백을 넘기고, Manager 큐로 받아 progress 로 전달
+        - 코루틴 함수: 내부에서 동기 Gemini 호출을 하므로 별도 스레드의 이벤트 루프에서 실행
+        - 그 외: 스레드 풀에서 실행
+        상태 저장소 기록도 이벤트 루프를 막지 않도록 스레드에서 실행
+        """
+        backend = get_state_backend()
+        await asyncio.to_thread(backend.update_job, self.job_id, status="running", stage=name)
+        await asyncio.to_thread(self.emit, "stage", stage=name, status="started")
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            if asyncio.iscoroutinefunction(func):
+                result = await asyncio.to_thread(asyncio.run, func(*args))
+            elif process and progress:
+                result = await self._run_with_progress(func, args, progress)
+            else:
+                executor = self.runner.process_pool() if process else None
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(executor, functools.partial(func, *args))
+            status = "finished"
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = round(elapsed, 3)
+            self.runner.stage_times[name].append(elapsed)
+            await asyncio.to_thread(backend.update_job, self.job_id, stages=self.stages)
+            await asyncio.to_thread(self.emit, "stage", stage=name, status=status, elapsed=round(elapsed, 3))
+
+    async def _run_with_progress(self, func, args: tuple, progress):
+        queue = self.runner.manager().Queue()
+        drain = asyncio.create_task(asyncio.to_thread(_drain_progress, queue, progress))
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.runner.process_pool(), functools.partial(func, *args, functools.partial(_queue_progress, queue))
+            )
+        finally:
+            # 남은 진행률을 모두 기록한 뒤 단계 종료 이벤트가 나가도록 여기서 기다림
+            queue.put(None)
+            await drain
+
+
+def _queue_progress(queue, *progress):
+    # 프로세스 풀 안에서 호출됨: 진행률을 Manager 큐로 부모 프로세스에 전달
+    queue.put(progress)
+
+
+def _drain_progress(queue, progress):
+    while (item := queue.get()) is not None:
+        progress(*item)
+
+
+async def _video_pipeline(ctx: JobContext, url: str, prompt: str, model, generation_config, task: str) -> str:
+    file_path = None
+    uploaded_file = None
+    try:
+        file_path = await ctx.stage(
+            "download", download_youtube, url, process=True, progress=ctx.on_download_progress
+        )
+        if not file_path:
+            raise ValueError("Failed to download video.")
+        uploaded_file = await ctx.stage("upload", upload_video, file_path)
+        await asyncio.to_thread(ctx.emit, "upload", file=uploaded_file.name)
+        await ctx.stage("processing", wait_until_active, uploaded_file, ctx.on_processing_state)
+        return await ctx.stage(
+            "generate", generate_from_video, prompt, uploaded_file, model, generation_config, task, ctx.on_chunk
+        )
+    finally:
+        await asyncio.to_thread(cleanup_video, uploaded_file)
+
+
+async def run_youtube_recipe(ctx: JobContext, payload: dict) -> dict:
+    """/youtube-recipe 와 같은 결과: 레시피 저장 후 recipe_id 와 예상 조리 시간"""
+    video_url = payload["video_url"]
+    backend = get_state_backend()
+
+    recipe_text = await asyncio.to_thread(backend.get_result, "recipe_video", video_cache_key(video_url))
+    if not recipe_text and CAPTION_FAST_PATH:
+        recipe_text = await ctx.stage("captions", search_service.extract_recipe_from_captions, video_url)
+    if not recipe_text:
+        # 모델 준비(처음이면 지시문 토큰 수 확인)도 네트워크 호출이므로 스레드에서
+        model = await asyncio.to_thread(search_service.recipe_model)
+        recipe_text = await _video_pipeline(
+            ctx, video_url, search_service.VIDEO_RECIPE_PROMPT, model, None, "recipe_video",
+        )
+        await asyncio.to_thread(backend.put_result, "recipe_video", video_cache_key(video_url), recipe_text)
+
+    estimated_time = await ctx.stage("estimate", search_service.estimate_cooking_time, recipe_text)
+    recipe_id = await asyncio.to_thread(
+        backend.save_recipe, recipe_text, estimated_time, source="youtube", title=video_url
+    )
+    return {"recipe_id": recipe_id, "estimated_time": estimated_time}
+
+
+async def run_ingredients_link(ctx: JobContext, payload: dict) -> list:
+    """/ingredients/link 와 같은 결과: 카테고리별 재료 목록"""
+    link = payload["link"]
+    backend = get_state_backend()
+
+    cached = await asyncio.to_thread(backend.get_result, "ingredients_link", video_cache_key(link))
+    if cached:
+        return cached
+
+    categories = None
+    if CAPTION_FAST_PATH:
+        categories = await ctx.stage(
+            "captions", ingredient_service.extract_link_ingredients_from_captions, link
+        )
+    if categories is None:
+        model = await asyncio.to_thread(ingredient_service.link_model)
+        raw_response = await _video_pipeline(
+            ctx, link, ingredient_service.LINK_INGREDIENTS_PROMPT,
+            model, ingredient_service.link_generation_config(), "ingredients_link",
+        )
+        categories = await ctx.stage("parse", ingredient_service.parse_link_ingredients, raw_response)
+    result = [category.model_dump(by_alias=True) for category in categories]
+    await asyncio.to_thread(backend.put_result, "ingredients_link", video_cache_key(link), result)
+    return result
+
+
+PIPELINES = {
+    "youtube_recipe": run_youtube_recipe,
+    "ingredients_link": run_ingredients_link,
+}
+
+
+class JobRunner:
+    """
+    프로세스 안에서 도는 작업 큐.
+    작업 상태는 상태 저장소에 기록되므로 다른 워커에서도 조회할 수 있습니다.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue | None = None
+        self.workers: list[asyncio.Task] = []
+        self.running = 0
+        self.counts = defaultdict(int)
+        self.stage_times = defaultdict(lambda: deque(maxlen=200))
+        self.waiters: dict[str, asyncio.Future] = {}
+        self._process_pool: ProcessPoolExecutor | None = None
+        self._manager = None
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # 스레드/소켓을 가진 서버 프로세스를 fork 하지 않도록 spawn 사용
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=JOB_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    def manager(self):
+        """프로세스 풀과 주고받을 큐를 만드는 Manager (처음 필요할 때 시작)"""
+        if self._manager is None:
+            self._manager = multiprocessing.get_context("spawn").Manager()
+        return self._manager
+
+    def _ensure_started(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(JOB_WORKERS)]
+            logger.info(f"Job runner started: workers={JOB_WORKERS}, processes={JOB_PROCESS_WORKERS}")
+
+    async def submit(self, kind: str, payload: dict) -> str:
+        self._ensure_started()
+        if self.queue.full():
+            raise HTTPException(status_code=503, detail="작업 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.")
+        backend = get_state_backend()
+        job_id = await asyncio.to_thread(backend.create_job, kind, payload)
+        try:
+            self.queue.put_nowait((job_id, kind, payload, time.perf_counter()))
+        except asyncio.QueueFull:
+            # 작업을 기록하는 사이 다른 요청이 대기열을 채운 경우
+            await asyncio.to_thread(backend.update_job, job_id, status="failed", error="queue full")
+            raise HTTPException(status_code=503, detail="작업 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.")
+        self.counts["submitted"] += 1
+        return job_id
+
+    async def run(self, kind: str, payload: dict):
+        """
+        작업을 등록하고 끝날 때까지 기다려 결과를 반환 (실패하면 예외).
+        작업은 다른 작업과 같은 대기열/단계로 실행되고, 기다리던 요청이 끊겨도 끝까지 실행되어 결과가 저장됩니다.
+        """
+        job_id = await self.submit(kind, payload)
+        # submit 이 반환될 때까지 작업자는 실행되지 않으므로 결과를 놓치지 않음
+        waiter = self.waiters[job_id] = asyncio.get_running_loop().create_future()
+        try:
+            return await waiter
+        finally:
+            self.waiters.pop(job_id, None)
+
+    async def _worker(self):
+        while True:
+            job_id, kind, payload, queued_at = await self.queue.get()
+            self.stage_times["queue_wait"].append(time.perf_counter() - queued_at)
+            self.running += 1
+            backend = get_state_backend()
+            ctx = JobContext(self, job_id)
+            result = error = None
+            try:
+                result = await PIPELINES[kind](ctx, payload)
+                await asyncio.to_thread(backend.update_job, job_id, status="done", stage=None, result=result)
+                self.counts["done"] += 1
+            except Exception as e:
+                error = e
+                logger.error(f"Job {job_id} ({kind}) failed: {e}")
+                await asyncio.to_thread(backend.update_job, job_id, status="failed", error=str(e))
+                self.counts["failed"] += 1
+            finally:
+                self.running -= 1
+                self.queue.task_done()
+                waiter = self.waiters.get(job_id)
+                if waiter and not waiter.done():
+                    if error:
+                        waiter.set_exception(error)
+                    else:
+                        waiter.set_result(result)
+
+    def metrics(self) -> dict:
+        def _summary(samples):
+            ordered = sorted(samples)
+            return {
+                "count": len(ordered),
+                "avg": round(sum(ordered) / len(ordered), 3),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                "max": round(ordered[-1], 3),
+            }
+
+        return {
+            "pid": os.getpid(),
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_capacity": JOB_QUEUE_SIZE,
+            "running": self.running,
+            "workers": JOB_WORKERS,
+            "counts": dict(self.counts),
+            "stages": {name: _summary(samples) for name, samples in self.stage_times.items() if samples},
+            "video_workspace": get_workspace().usage(),
+        }
+
+
+runner = JobRunner()
+
+
+@router.post("/youtube-recipe")
+async def submit_youtube_recipe(request: YoutubeJobRequest):
+    """유튜브 레시피 생성을 백그라운드 작업으로 등록하고 job_id 를 바로 반환"""
+    job_id = await runner.submit("youtube_recipe", {"video_url": request.video_url})
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.post("/ingredients-link")
+async def submit_ingredients_link(request: LinkJobRequest):
+    """영상 재료 추출을 백그라운드 작업으로 등록하고 job_id 를 바로 반환"""
+    job_id = await runner.submit("ingredients_link", {"link": request.link})
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/metrics")
+async def job_metrics():
+    """이 워커 프로세스의 대기열 길이, 실행 중 작업 수, 단계별 소요 시간"""
+    return runner.metrics()
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(get_state_backend().get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+def _poll(backend, job_id: str, after: int) -> tuple[dict | None, list[dict]]:
+    # 상태를 먼저 읽어야 종료 직전에 쌓인 이벤트를 놓치지 않음. 스레드에서 실행 (asyncio.to_thread)
+    return backend.get_job(job_id), backend.job_events(job_id, after=after)
+
+
+def _sse(event_type: str, data: dict, seq: int | None = None) -> bytes:
+    head = f"id: {seq}\n" if seq is not None else ""
+    return f"{head}event: {event_type}\ndata: ".encode() + orjson.dumps(data) + b"\n\n"
+
+
+@router.get("/{job_id}/events")
+async def job_event_stream(job_id: str, request: Request, after: int = 0):
+    """
+    진행 이벤트를 Server-Sent Events 로 전달합니다.
+    - download: downloaded/total/percent, upload, processing: state, chunk: 생성 중인 텍스트 조각
+    - stage: 단계 시작/종료, 마지막에 job: 최종 상태와 결과
+    재연결 시 Last-Event-ID 헤더(또는 ?after=)부터 이어서 받습니다.
+    끝난 지 JOB_EVENT_TTL_SECONDS 가 지난 작업은 진행 이벤트 없이 job 만 받습니다.
+    """
+    backend = get_state_backend()
+    if not await asyncio.to_thread(backend.get_job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found.")
+    last_event_id = request.headers.get("last-event-id")
+    last_seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else after
+
+    async def _stream():
+        nonlocal last_seq
+        while True:
+            job, events = await asyncio.to_thread(_poll, backend, job_id, last_seq)
+            for event in events:
+                last_seq = event["seq"]
+                yield _sse(event["type"], event, last_seq)
+            if job["status"] in FINISHED_STATUSES:
+                yield _sse("job", job)
+                return
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    return StreamingResponse(
+        _stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/{job_id}/ws")
+async def job_updates(websocket: WebSocket, job_id: str, after: int = 0):
+    """작업 상태가 바뀌거나 진행 이벤트가 생길 때마다 push, 끝나면 연결 종료"""
+    await websocket.accept()
+    backend = get_state_backend()
+    last_update = None
+    last_seq = after
+    try:
+        while True:
+            job, events = await asyncio.to_thread(_poll, backend, job_id, last_seq)
+            if not job:
+                await websocket.send_json({"type": "error", "message": "Job not found."})
+                break
+            for event in events:
+                last_seq = event["seq"]
+                await websocket.send_json({"type": "event", "event": event})
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                await websocket.send_json({"type": "job", "job": job})
+            if job["status"] in FINISHED_STATUSES:
+                break
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
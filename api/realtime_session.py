@@ -0,0 +1,1126 @@
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+from typing import Optional
+
+import numpy as np
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from utils.admission import get_admission
+from utils.audio_codec import PCM16, make_decoder
+from utils.conversation_context import (
+    CONTEXT_MANAGEMENT,
+    RECIPE_ITEM_ID,
+    RESTORE_ITEM_ID,
+    ConversationContext,
+)
+from utils.latency_tracer import LatencyTracer
+from utils.replay_buffer import ReplayBuffer, RepeatRequest, detect_repeat
+from utils.session_capture import CapturedClient, CapturedUpstream, open_recorder
+from utils.state_backend import get_state_backend
+
+# replay_session.py 는 이 주소를 로컬 가짜 서버로 바꿔서 세션을 재현함
+OPENAI_REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"
+)
+
+# 클라이언트 프레임이 이 시간(초) 동안 없으면 종료 (타이머가 돌고 있는 동안은 제외), 0 이면 끔
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "300"))
+# 세션 최대 길이(초), 0 이면 끔
+SESSION_MAX_DURATION = float(os.getenv("SESSION_MAX_DURATION", str(2 * 60 * 60)))
+# 정리 단계에서 태스크 취소/업스트림 종료를 기다리는 시간(초). 넘기면 누수로 집계
+SESSION_CLOSE_TIMEOUT = float(os.getenv("SESSION_CLOSE_TIMEOUT", "5"))
+WATCHDOG_INTERVAL = 1.0
+
+# OpenAI 연결이 끊기면 이 횟수만큼 재연결 시도 (0.5초부터 두 배씩, 최대 8초 간격)
+RECONNECT_ATTEMPTS = int(os.getenv("RECONNECT_ATTEMPTS", "5"))
+RECONNECT_BASE_DELAY = 0.5
+RECONNECT_MAX_DELAY = 8.0
+# 재연결 중에 모아 둘 마이크 오디오 길이(초). 넘으면 오래된 것부터 버림
+RECONNECT_BUFFER_SECONDS = float(os.getenv("RECONNECT_BUFFER_SECONDS", "15"))
+SAMPLE_RATE = 24000
+# 재연결 시 요약에 넣을 최근 대화 수와 발화당 최대 길이
+RESTORE_HISTORY_TURNS = 8
+RESTORE_TURN_CHARS = 200
+
+# 한 세션(업스트림 연결 하나)에 /ws?session=<id> 로 함께 붙을 수 있는 기기 수
+MAX_DEVICES_PER_SESSION = int(os.getenv("MAX_DEVICES_PER_SESSION", "4"))
+# 마이크 중재: 이 RMS(int16) 이상인 프레임을 말소리로 보고,
+# 마이크를 가진 기기가 MIC_FLOOR_HOLD 초 동안 조용하면 다른 기기가 말하는 순간 넘겨받음
+MIC_VOICE_RMS = float(os.getenv("MIC_VOICE_RMS", "500"))
+MIC_FLOOR_HOLD = float(os.getenv("MIC_FLOOR_HOLD", "1.0"))
+
+# 세션 참가 실패 종료 코드 (utils/admission.py 의 CLOSE_* 와 같은 영역)
+CLOSE_SESSION_NOT_FOUND = 4004
+CLOSE_SESSION_FULL = 4005
+CLOSE_SESSION_ELSEWHERE = 4006  # 세션이 다른 워커 프로세스에 있음 (sticky 라우팅 필요)
+
+router = APIRouter(
+    prefix="/realtime",
+    tags=["realtime"],
+)
+
+NO_RECIPE_TEXT = """
+            [재료] 아직 레시피가 선택되지 않았습니다.
+            [조리 단계]
+            1. /recipe 엔드포인트로 레시피를 먼저 요청해주세요.
+            """
+
+# --- [핵심 수정 1] 세션 설정: 노이즈 필터링 & 확인 절차 ---
+SESSION_UPDATE = {
+    "type": "session.update",
+    "session": {
+        "modalities": ["audio", "text"],
+        "instructions": """
+         [행동 규칙]
+        1. 레시피를 한 단계씩 친절하게 설명하세요.
+         1) 단계 번호는 항상 **서수 형태**로만 표현합니다.
+        - "첫 번째 단계"
+        - "두 번째 단계"
+        - "세 번째 단계"
+        - "네 번째 단계"
+        - 이런 식으로 서수만 사용합니다. (1단계, 2단계처럼 말하지 않음)
+
+
+        2. **[타이머 확인 절차]**
+        - 레시피 단계에 '시간(예: "~분간", "~분 동안", "~분 더","약 ~분", "~분", "~분 끓이기", "~분 볶기", "몇 분")'이 포함되어 있다면, **절대로 바로 타이머 도구를 실행하지 마세요.**
+        - 먼저 반드시 이렇게 물어보세요:
+            - "타이머를 시작할까요?"
+        - 사용자가 "응", "그래", "시작해", "네" 등으로 **명확하게 동의했을 때만** `start_timer` 도구를 실행하세요.
+        
+        - 사용자가 "아니", "아니요", "필요 없어","아녀", "안 해", "괜찮아", "넘어가", "노노", "안해", "싫어", "노", "no"와 같이 명확히 거부하면:
+            - 타이머는 실행하지 않습니다.
+            - 하지만 '그 단계의 조리 과정'은 그대로 진행해야 합니다.
+            - 절대로 다음 단계로 자동으로 넘어가지 마세요.
+            - 예: "알겠습니다. 타이머 없이 진행할게요. 이제 X분 동안 조리해 주세요. 준비되면 말씀해 주시겠어요?."
+
+
+        3. 타이머가 돌아가는 동안에는 잡담을 하지 말고 조용히 기다리세요.
+
+
+        4. 사용자가 요리 단계 이외의 질문(재료 대체, 팁, 조리 관련 궁금증 등)을 하면
+        - 단계 진행을 잠시 멈추고 질문에 대답한 뒤
+        - 다시 현재 단계부터 이어서 설명하세요.
+
+
+        5. **[중요: "다시" 요청 처리 규칙]**
+        사용자가 다음과 같은 표현을 말하면, 이것은 '반복 요청'입니다:
+        - "다시 말해줘"
+        - "방금 단계 다시 말해줘"
+        - "전 단계 뭐였어?"
+        - "조금 전 설명 다시"
+        - "다시 설명해줘"
+        - "한 번만 더 말해줘"
+        - "방금 거 잘 못 들었어"
+        - 그 밖에 "다시"라는 단어가 포함된 비슷한 문장들
+
+
+        이 경우에는 **절대로 다음 단계로 넘어가면 안 됩니다.**
+        - 새로운 단계 번호(예: "이제 2단계입니다", "다음으로", "그 다음에는")를 말하지 마세요.
+        - 오직 '직전 단계'만 다시 설명하세요.
+        - 형식 예:
+            - "방금 단계는 두 번째 단계였습니다. 팬에 기름을 두르고 중불에서 양파를 3분간 볶아주는 단계였어요."
+        - 마지막에 꼭 이렇게 물어보세요:
+            - "이 단계를 한 번 더 설명해 드릴까요, 아니면 다음 단계로 넘어갈까요?"
+
+
+        6. 사용자가 "처음부터 다시", "처음 단계부터 차근차근 알려줘"라고 말하면:
+        - 1단계부터 순서대로 다시 설명을 시작하세요.
+        - 각 단계 뒤에 항상 이렇게 물어보세요:
+            - "다음 단계로 넘어갈까요, 아니면 이 단계 다시 설명해 드릴까요?"
+
+
+        7. 전체 대화에서 가장 중요한 우선순위는:
+        - (1) 사용자의 이해도에 맞춰 설명하는 것
+        - (2) 사용자가 요청한 것을 정확하게 수행하는 것입니다.
+        - 사용자가 "다시", "전 단계" 같은 말을 하면, **새로운 정보를 주거나 다음 단계로 진행하는 것보다 '반복 설명'이 항상 더 우선입니다.**
+       
+        8. **[특정 단계 번호 요청 처리 규칙]**
+        사용자가 다음과 같은 표현을 말하면:
+        - "첫 번째 단계 알려줘", "두 번째 단계가 뭐였지?"
+        - "지금 세 번재 단계인데 첫 번째 단계 다시 말해줘"
+        - "앞 단계(전 단계 말고 그 앞 단계) 뭐였어?"
+        - "처음 두 단계만 알려줘"
+        - "몇 단계까지 있는지 말해줘"
+			
+        아래 기준으로 행동하세요:
+
+
+        - 사용자가 특정 '단계 번호'를 언급했다면,
+            → 현재 단계와 상관없이 **요청한 단계 번호만 정확하게 설명**합니다.
+
+
+        - 예시:
+            사용자: "지금 네 번째 단계지? 근데 두 번째 단계 다시 말해줘."
+            보이스셰프: "두 번째 단계는 김치를 넣기 전에 돼지고기를 먼저 볶는 과정이었어요. 충분히 익혀주면 풍미가 살아나요."
+
+
+        - 단계 번호를 설명한 후에는 반드시 이렇게 물어보세요:
+            - "현재 진행 중인 단계(예: 네 번째 단계)로 돌아가서 계속할까요?"
+            - (또는)
+            - "이전에 설명한 단계를 더 듣고 싶으신가요?"
+
+
+        - 절대로 단계 번호를 혼동하거나, 잘못된 단계로 넘어가면 안 됩니다.
+
+
+
+
+        9. **[중간 질문 처리 규칙]**
+            사용자가 요리 과정과 직접 무관한 질문을 하면 (예: 재료 대체, 맛 변형, 불 세기, 위생, 도구 추천 등),
+           
+            1) 현재 단계 진행을 잠시 '정지'하고  
+            2) 질문에 대해 친절하고 정확하게 답변한 뒤  
+            3) 다시 원래 단계로 자연스럽게 돌아옵니다.
+
+
+            - 예시:
+                사용자: "이거 삼겹살로 바꿔도 돼?"
+                보이스셰프:
+                    - "네, 삼겹살을 사용해도 괜찮아요. 기름이 조금 더 나와서 더 고소해질 수 있어요."
+                    - "그럼 다시 현재 단계로 돌아갈게요. 우리는 지금 3단계를 진행하고 있었어요."
+
+
+            4) 질문에 답한 후에는 반드시 이렇게 마무리하세요:
+                - "지금 단계 설명을 계속할까요?"
+                - "이 단계를 다시 설명해드릴까요?"
+                - "다음 단계로 넘어갈까요?"
+
+
+        10. **[속도 조절 처리 규칙]**
+            1)사용자가  "천천히 말해줘","차근차근 말해줘","더 세부적으로 말해줘", "초보야"라고 말하면 천천히, 자세하게 설명.
+            2) 사용자가  "빨리 말해줘","요약해서 말해줘","짧게 말해줘", "고수야" 라고 말하면 핵심만 빠르게 설명.
+
+
+        """,
+        "voice": "alloy",
+        "input_audio_format": "pcm16",
+        "output_audio_format": "pcm16",
+        # 사용자 발화 자막 (반복 요청을 서버에서 감지해 캐시된 응답으로 바로 재생)
+        "input_audio_transcription": {"model": "whisper-1"},
+        "turn_detection": {
+            "type": "server_vad",
+            # ▼▼▼ [여기를 수정했습니다] ▼▼▼
+            # 0.5 (기본값) -> 0.6 ~ 0.8 (노이즈 무시)
+            # 주변이 시끄러우면 0.7~0.8로 올리세요.
+            "threshold": 0.8,  
+            "prefix_padding_ms": 300,
+            "silence_duration_ms": 500
+        },
+        "tools": [
+            {
+                "type": "function",
+                "name": "start_timer",
+                "description": "Starts a countdown timer. Only execute this AFTER the user explicitly confirms (says 'yes').",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "seconds": {
+                            "type": "integer",
+                            "description": "Duration in seconds"
+                        }
+                    },
+                    "required": ["seconds"]
+                }
+            }
+        ],
+        "tool_choice": "auto"
+    }
+}
+
+
+class SessionRegistry:
+    """이 워커 프로세스의 실시간 세션 목록과 종료/누수 집계"""
+
+    def __init__(self):
+        self.live: dict[str, "RealtimeSession"] = {}
+        self.counts = defaultdict(int)
+        self.close_reasons = defaultdict(int)
+        self.leaked_tasks = 0
+        self.leaked_upstreams = 0
+        self.recovery_seconds = deque(maxlen=200)
+        self.decode_totals = defaultdict(float)  # 압축 업링크 디코딩 누적 (나간 기기)
+
+    def opened(self, session: "RealtimeSession"):
+        self.live[session.session_id] = session
+        self.counts["opened"] += 1
+
+    def find(self, session_id: str) -> Optional["RealtimeSession"]:
+        """기기가 참가할 수 있는 이 워커의 세션 (종료 중이면 None)"""
+        session = self.live.get(session_id)
+        return session if session and not session.closing else None
+
+    def device_left(self, device: "Device"):
+        if device.decoder:
+            self.decode_totals["devices"] += 1
+            self.decode_totals["audio_seconds"] += device.decoder.samples_out / SAMPLE_RATE
+            self.decode_totals["cpu_seconds"] += device.decoder.cpu_seconds
+
+    def closed(self, session: "RealtimeSession", reason: str, leaked_tasks: int, leaked_upstream: bool):
+        self.live.pop(session.session_id, None)
+        self.counts["closed"] += 1
+        self.close_reasons[reason] += 1
+        self.leaked_tasks += leaked_tasks
+        self.leaked_upstreams += int(leaked_upstream)
+        self.recovery_seconds.extend(session.recoveries)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        sessions = [
+            {
+                "session_id": s.session_id,
+                "age_seconds": round(now - s.started_at, 1),
+                "idle_seconds": round(now - s.last_activity, 1),
+                "timers": len(s.timers),
+                "upstream_open": s.upstream_open,
+                "reconnecting": not s.upstream_ready.is_set(),
+                "reconnects": len(s.recoveries),
+                "latency_ms": s.tracer.summary(),
+                "replay": s.replay.stats(),
+                "context": s.context.stats(),
+                "mic_floor": s.mic_floor,
+                "devices": [device.stats() for device in s.devices.values()],
+            }
+            for s in self.live.values()
+        ]
+        return {
+            "pid": os.getpid(),
+            "live_sessions": len(sessions),
+            "live_upstreams": sum(1 for s in sessions if s["upstream_open"]),
+            "live_devices": sum(len(s["devices"]) for s in sessions),
+            "live_timers": sum(s["timers"] for s in sessions),
+            "asyncio_tasks": len(asyncio.all_tasks()),
+            "counts": dict(self.counts),
+            "close_reasons": dict(self.close_reasons),
+            "leaked_tasks": self.leaked_tasks,
+            "leaked_upstreams": self.leaked_upstreams,
+            "reconnect": self._recovery_summary(),
+            "audio_decode": self._decode_summary(),
+            "admission": get_admission().stats(),
+            "limits": {
+                "idle_timeout": SESSION_IDLE_TIMEOUT,
+                "max_duration": SESSION_MAX_DURATION,
+                "max_devices": MAX_DEVICES_PER_SESSION,
+            },
+            "sessions": sessions,
+        }
+
+    def _recovery_summary(self) -> dict:
+        samples = sorted([*self.recovery_seconds, *(r for s in self.live.values() for r in s.recoveries)])
+        summary = {
+            "succeeded": self.counts["reconnect_succeeded"],
+            "failed": self.counts["reconnect_failed"],
+        }
+        if samples:
+            summary["recovery_ms"] = {
+                "avg": round(sum(samples) / len(samples) * 1000, 1),
+                "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+                "max": round(samples[-1] * 1000, 1),
+            }
+        return summary
+
+
+    def _decode_summary(self) -> dict:
+        totals = dict(self.decode_totals)
+        if totals.get("audio_seconds"):
+            totals["cpu_percent"] = round(totals["cpu_seconds"] / totals["audio_seconds"] * 100, 2)
+        return {key: round(value, 3) for key, value in totals.items()}
+
+
+registry = SessionRegistry()
+
+
+def voice_rms(pcm: bytes) -> float:
+    """PCM16 프레임의 RMS (마이크 중재용 말소리 판단)"""
+    samples = np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+
+def parse_control(text: str) -> dict:
+    """
+    기기가 보낸 텍스트 프레임(제어 메시지)을 검증합니다. 형식이 잘못되면 ValueError (연결은 유지하고 error 로 응답).
+    repeat 의 step 은 양의 정수로 바꿔 둠 ("2" → 2, 없으면 직전 응답)
+    """
+    try:
+        message = json.loads(text)
+    except (ValueError, RecursionError):
+        raise ValueError("control message is not valid JSON")
+    if not isinstance(message, dict):
+        raise ValueError("control message must be a JSON object")
+    if message.get("type") == "repeat" and message.get("step") is not None:
+        step = message["step"]
+        try:
+            if isinstance(step, bool):
+                raise TypeError
+            step = int(step)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid step: {step!r}")
+        if step < 1:
+            raise ValueError(f"invalid step: {step!r}")
+        message["step"] = step
+    return message
+
+
+class Device:
+    """
+    세션에 붙은 클라이언트 소켓 하나 (레인지 옆 휴대폰, 조리대 위 태블릿 등).
+    업링크 형식과 Ogg/Opus 디코더는 기기마다 따로 가집니다.
+    """
+
+    def __init__(self, websocket, audio_format: str = PCM16):
+        self.device_id = uuid.uuid4().hex[:8]
+        self.ws = websocket
+        self.audio_format = audio_format
+        self.decoder = make_decoder(audio_format)
+        self.joined_at = time.monotonic()
+        self.closed = False
+        self.frames = Counter()  # forwarded / dropped (마이크가 다른 기기에 있어서 버린 프레임)
+
+    async def send_text(self, text: str):
+        """보내기 실패는 연결이 끊긴 것으로 보고 이후 전송을 건너뜀 (정리는 수신 루프가 함)"""
+        if self.closed:
+            return
+        try:
+            await self.ws.send_text(text)
+        except Exception:
+            self.closed = True
+
+    async def send_json(self, data: dict):
+        await self.send_text(json.dumps(data, ensure_ascii=False))
+
+    def stats(self) -> dict:
+        return {
+            "device_id": self.device_id,
+            "age_seconds": round(time.monotonic() - self.joined_at, 1),
+            "audio_format": self.audio_format,
+            "frames": dict(self.frames),
+            "audio_decode": self.decoder.stats() if self.decoder else None,
+        }
+
+
+class RealtimeSession:
+    """
+    요리 세션 하나 (기기들 ↔ 서버 ↔ OpenAI Realtime).
+    run() 이 업스트림 수신 루프, 첫 기기의 수신 루프와 감시 루프를 띄우고, 업스트림이 끝나거나 마지막 기기가 나가면
+    타이머를 포함한 모든 태스크를 취소하고 양쪽 연결을 닫습니다.
+
+    다른 기기는 /ws?session=<session_id> 로 같은 세션에 참가(attach)해 업스트림 연결 하나를 함께 씁니다.
+    - 오디오/자막/타이머 이벤트는 모든 기기로 전송
+    - 마이크는 한 번에 한 기기만 (mic_floor). 가진 기기가 MIC_FLOOR_HOLD 초 조용하면 말하는 기기가 넘겨받고,
+      {"type": "mic", "action": "take" | "release"} 로 직접 가져오거나 놓을 수도 있음
+    - 녹화(REALTIME_CAPTURE_DIR)에는 첫 기기의 프레임만 기록 (replay_session.py 는 기기 하나로 재현)
+    """
+
+    def __init__(self, client_ws: WebSocket, recipe: dict | None, session_id: str, audio_format: str = PCM16):
+        self.recipe = recipe
+        self.session_id = session_id
+        self.openai_ws = None
+        self._upstream = None  # 녹화 래퍼를 벗긴 실제 연결 (종료/상태 확인용)
+        self.started_at = time.monotonic()
+        self.last_activity = self.started_at
+        self.timers: dict[asyncio.Task, tuple[float, int]] = {}  # 태스크 → (시작 시각, 초)
+        self.closing = False
+
+        # 업스트림 재연결: 끊긴 동안 보낼 이벤트를 모아 두고, 다시 연결되면 대화 요약과 함께 복원
+        self.upstream_ready = asyncio.Event()
+        self.pending_events: deque[dict] = deque()
+        self.pending_audio_chars = 0
+        self.history: deque[tuple[str, str]] = deque(maxlen=RESTORE_HISTORY_TURNS)
+        self.recoveries: list[float] = []
+        self._connection_closed = Exception  # run() 에서 websockets 예외로 교체
+
+        # 턴별 지연 시간 (발화 종료 → 첫 오디오 등), REALTIME_TRACE_FILE 로 내보냄
+        self.tracer = LatencyTracer(session_id)
+
+        # 업스트림 대화 항목 추적: 길어지면 오래된 항목을 요약 메모로 바꾸고 삭제
+        self.context = ConversationContext()
+
+        # 최근 어시스턴트 응답(오디오+자막) 보관: "다시 말해줘"는 OpenAI 호출 없이 바로 재생
+        self.replay = ReplayBuffer()
+        self.active_response_id = None
+        self.suppressed = set()  # 재생으로 대체해서 클라이언트로 보내지 않을 응답
+        self.suppress_next_response = False
+        self.responded_since_speech = False
+
+        # REALTIME_CAPTURE_DIR 가 설정되어 있으면 세션의 모든 프레임을 녹화
+        self.recorder = open_recorder(session_id)
+        if self.recorder:
+            client_ws = CapturedClient(client_ws, self.recorder)
+
+        # 참가한 기기들. 압축 업링크(ogg_opus)면 기기별로 받은 페이지를 24kHz PCM16 으로 풀어서 OpenAI 로 전달
+        self.primary = Device(client_ws, audio_format)
+        self.devices: dict[str, Device] = {self.primary.device_id: self.primary}
+        self.no_devices = asyncio.Event()
+        self.mic_floor: Optional[str] = None  # 마이크를 가진 기기
+        self.floor_voice_at = 0.0  # 마이크를 가진 기기에서 마지막으로 말소리가 들어온 시각
+
+    @property
+    def upstream_open(self) -> bool:
+        return self._upstream is not None and self._upstream.state.name != "CLOSED"
+
+    async def send_to_client(self, data: dict):
+        """모든 기기로 전송. JSON 은 한 번만 직렬화하고, 느린 기기가 다른 기기를 막지 않도록 동시에 보냄"""
+        text = json.dumps(data, ensure_ascii=False)
+        devices = [device for device in self.devices.values() if not device.closed]
+        if len(devices) == 1:
+            await devices[0].send_text(text)
+        elif devices:
+            await asyncio.gather(*(device.send_text(text) for device in devices))
+
+    async def send_upstream(self, event: dict):
+        """연결이 끊겨 재연결 중이면 보내지 않고 모아 두었다가 복원 후 전송"""
+        if self.upstream_ready.is_set():
+            try:
+                await self.openai_ws.send(json.dumps(event))
+                return
+            except self._connection_closed:
+                self.upstream_ready.clear()
+        self._buffer_event(event)
+
+    def _buffer_event(self, event: dict):
+        self.pending_events.append(event)
+        if event.get("type") != "input_audio_buffer.append":
+            return
+        self.pending_audio_chars += len(event["audio"])
+        # base64 는 원본의 4/3 배, PCM16 은 샘플당 2바이트
+        limit = RECONNECT_BUFFER_SECONDS * SAMPLE_RATE * 2 * 4 / 3
+        while self.pending_audio_chars > limit:
+            for i, old in enumerate(self.pending_events):
+                if old.get("type") == "input_audio_buffer.append":
+                    del self.pending_events[i]
+                    self.pending_audio_chars -= len(old["audio"])
+                    break
+
+    async def _send_now(self, event: dict):
+        await self.openai_ws.send(json.dumps(event))
+
+    async def _flush_pending(self):
+        """
+        모아 둔 이벤트를 순서대로 전송. 보내기에 성공한 이벤트만 빼므로 도중에 끊기면 나머지는 다음 재연결 때 전송.
+        전송 중에 들어온 이벤트도 뒤에 붙으므로 함께 보냄
+        """
+        while self.pending_events:
+            event = self.pending_events[0]
+            await self._send_now(event)
+            # 전송하는 동안 버퍼 한도 초과로 이미 빠졌을 수 있음
+            if self.pending_events and self.pending_events[0] is event:
+                self.pending_events.popleft()
+                if event.get("type") == "input_audio_buffer.append":
+                    self.pending_audio_chars -= len(event["audio"])
+
+    # --- 세션 수명 관리 ---
+    async def run(self):
+        import websockets  # 실시간 세션에서만 필요하므로 서버 시작 시에는 로드하지 않음
+
+        self._connection_closed = websockets.exceptions.ConnectionClosed
+        registry.opened(self)
+        reason = "error"
+        tasks: dict[asyncio.Task, str | None] = {}
+        receiver: Optional[asyncio.Task] = None
+        try:
+            # 협상된 업링크 형식과 세션 ID 를 먼저 알려 줌 (다른 기기는 이 ID 로 참가)
+            await self.greet(self.primary)
+            await self.connect_upstream()
+            print("Connected to OpenAI Realtime API")
+
+            await self.start_conversation()
+            self.upstream_ready.set()
+
+            # 업스트림이 끝나거나 마지막 기기가 나가면 세션 전체 종료
+            # (첫 기기가 나가도 다른 기기가 남아 있으면 계속 진행)
+            receiver = asyncio.create_task(self.receive_from_device(self.primary))
+            tasks = {
+                asyncio.create_task(self.no_devices.wait()): "client_closed",
+                asyncio.create_task(self.receive_from_openai()): "upstream_closed",
+                asyncio.create_task(self.watchdog()): None,
+            }
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finished = done.pop()
+            reason = tasks[finished] or finished.result()
+
+        except Exception as e:
+            print(f"Connection error: {e}")
+        finally:
+            await self.close(reason, [*tasks, *([receiver] if receiver else [])])
+
+    # --- 기기 참가/퇴장 ---
+    async def attach(self, client_ws: WebSocket, audio_format: str = PCM16):
+        """/ws?session=<id> 로 들어온 기기를 이 세션에 붙이고, 그 기기가 나갈 때까지 수신"""
+        device = Device(client_ws, audio_format)
+        self.devices[device.device_id] = device
+        registry.counts["devices_joined"] += 1
+        print(f"📱 [Session] {self.session_id} 기기 참가: {device.device_id} ({len(self.devices)}대)")
+        await self.greet(device)
+        await self.broadcast_devices()
+        await self.receive_from_device(device)
+
+    async def greet(self, device: Device):
+        """새 기기에 업링크 형식, 세션 정보, 진행 중인 타이머를 알림"""
+        await device.send_json({"type": "audio_format", "format": device.audio_format})
+        await device.send_json({
+            "type": "session",
+            "session_id": self.session_id,
+            "device_id": device.device_id,
+            "devices": len(self.devices),
+            "mic_floor": self.mic_floor,
+        })
+        now = time.monotonic()
+        for started, seconds in list(self.timers.values()):
+            # 늦게 참가한 기기도 남은 시간으로 타이머를 표시
+            await device.send_json({"type": "timer_start", "seconds": max(0, round(seconds - (now - started)))})
+
+    async def broadcast_devices(self):
+        await self.send_to_client({
+            "type": "devices",
+            "devices": list(self.devices),
+            "mic_floor": self.mic_floor,
+        })
+
+    async def detach(self, device: Device):
+        device.closed = True
+        if self.devices.pop(device.device_id, None) is None:
+            return
+        registry.device_left(device)
+        if not self.devices:
+            self.no_devices.set()
+            return
+        if self.closing:
+            return
+        print(f"📱 [Session] {self.session_id} 기기 퇴장: {device.device_id} ({len(self.devices)}대 남음)")
+        if self.mic_floor == device.device_id:
+            await self.set_mic_floor(None, "left")
+        await self.broadcast_devices()
+
+    # --- 마이크 중재 ---
+    async def set_mic_floor(self, device_id: Optional[str], reason: str):
+        if self.mic_floor == device_id:
+            return
+        self.mic_floor = device_id
+        self.floor_voice_at = time.monotonic()
+        registry.counts["mic_handoffs"] += 1
+        await self.send_to_client({"type": "mic_floor", "device_id": device_id, "reason": reason})
+
+    async def grant_mic(self, device: Device, pcm: bytes) -> bool:
+        """이 기기의 마이크 오디오를 업스트림으로 보낼지. 기기가 하나뿐이면 항상 보냄"""
+        if len(self.devices) == 1:
+            self.mic_floor = device.device_id
+            return True
+        loud = voice_rms(pcm) >= MIC_VOICE_RMS
+        if self.mic_floor == device.device_id:
+            if loud:
+                self.floor_voice_at = time.monotonic()
+            return True
+        holder_quiet = self.mic_floor is None or time.monotonic() - self.floor_voice_at > MIC_FLOOR_HOLD
+        if loud and holder_quiet:
+            await self.set_mic_floor(device.device_id, "voice")
+            return True
+        return False
+
+    async def connect_upstream(self):
+        import websockets
+
+        headers = {
+            "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+            "OpenAI-Beta": "realtime=v1"
+        }
+        self._upstream = await websockets.connect(OPENAI_REALTIME_URL, additional_headers=headers)
+        self.openai_ws = CapturedUpstream(self._upstream, self.recorder) if self.recorder else self._upstream
+
+    async def reconnect(self) -> bool:
+        """
+        끊긴 OpenAI 연결을 백오프로 다시 맺고 대화 상태를 복원합니다.
+        그동안 들어온 마이크 오디오와 타이머 알림은 pending_events 에 모였다가 복원 직후 전송됩니다.
+        """
+        self.upstream_ready.clear()
+        dropped_at = time.monotonic()
+        self.active_response_id = None
+        self.suppressed.clear()
+        self.suppress_next_response = False
+        await self._notify_client({"type": "upstream_reconnecting"})
+
+        delay = RECONNECT_BASE_DELAY
+        for attempt in range(1, RECONNECT_ATTEMPTS + 1):
+            await self.close_upstream()
+            try:
+                await self.connect_upstream()
+                await self.start_conversation(restore=True)
+                await self._flush_pending()
+                self.upstream_ready.set()
+            except Exception as e:
+                print(f"🔌 [Reconnect] {attempt}/{RECONNECT_ATTEMPTS} 실패: {e}")
+                await asyncio.sleep(min(delay, RECONNECT_MAX_DELAY) * random.uniform(0.8, 1.2))
+                delay *= 2
+                continue
+
+            recovery = time.monotonic() - dropped_at
+            self.recoveries.append(recovery)
+            registry.counts["reconnect_succeeded"] += 1
+            print(f"🔌 [Reconnect] 복구 완료 ({recovery * 1000:.0f}ms, {attempt}번째 시도)")
+            await self._notify_client({"type": "upstream_restored", "recovery_ms": round(recovery * 1000)})
+            return True
+
+        registry.counts["reconnect_failed"] += 1
+        return False
+
+    async def close_upstream(self):
+        if self._upstream is None:
+            return
+        try:
+            await asyncio.wait_for(self._upstream.close(), SESSION_CLOSE_TIMEOUT)
+        except Exception as e:
+            print(f"Upstream close error: {e}")
+
+    async def _notify_client(self, data: dict):
+        try:
+            await self.send_to_client(data)
+        except Exception:
+            pass
+
+    async def watchdog(self) -> str:
+        """유휴/최대 시간 제한. 넘으면 종료 사유를 반환"""
+        while True:
+            await asyncio.sleep(WATCHDOG_INTERVAL)
+            now = time.monotonic()
+            if SESSION_MAX_DURATION and now - self.started_at > SESSION_MAX_DURATION:
+                return "max_duration"
+            if SESSION_IDLE_TIMEOUT and not self.timers and now - self.last_activity > SESSION_IDLE_TIMEOUT:
+                return "idle_timeout"
+
+    async def close(self, reason: str, tasks: list[asyncio.Task]):
+        self.closing = True
+        print(f"🔚 [Session] {self.session_id} 종료: {reason}")
+        # 수신 루프를 취소하면 기기가 세션에서 빠지므로 알림 보낼 기기를 먼저 기억
+        remaining = [device for device in self.devices.values() if not device.closed]
+        pending = [t for t in (*tasks, *self.timers) if not t.done()]
+        for task in pending:
+            task.cancel()
+        leaked_tasks = 0
+        if pending:
+            _, still_running = await asyncio.wait(pending, timeout=SESSION_CLOSE_TIMEOUT)
+            leaked_tasks = len(still_running)
+
+        await self.close_upstream()
+
+        # 서버 쪽에서 끝낸 경우 남아 있는 기기에 이유를 알리고 연결을 닫음 (참가한 기기의 수신 루프도 여기서 끝남)
+        end = json.dumps({"type": "session_end", "reason": reason})
+        for device in remaining:
+            try:
+                await device.ws.send_text(end)
+                await device.ws.close()
+            except Exception:
+                pass
+
+        await asyncio.to_thread(get_state_backend().close_session, self.session_id)
+        self.tracer.close()
+        print(f"⏱️ [Latency] {self.tracer.summary()}")
+        if self.recorder:
+            self.recorder.close()
+        print(f"🔁 [Replay] {self.replay.stats()}")
+        registry.closed(self, reason, leaked_tasks, self.upstream_open)
+        if leaked_tasks or self.upstream_open:
+            print(f"⚠️ [Session] {self.session_id} 정리 실패: tasks={leaked_tasks}, upstream_open={self.upstream_open}")
+
+    # --- 대화 시작 ---
+    async def start_conversation(self, restore: bool = False):
+        await self._send_now(SESSION_UPDATE)
+
+        recipe_text = (self.recipe or {}).get("recipe_text") or NO_RECIPE_TEXT
+
+        # [디버그] 현재 적용된 레시피 확인
+        if not restore:
+            print(f"\n📢 [WebSocket] 적용된 레시피:\n{recipe_text[:100]}...\n")
+
+        recipe_prompt = f""" 
+             [레시피]
+             {recipe_text}
+             
+             위 레시피로 요리를 도와줘. 
+             - 한 번에 한 단계씩 설명해.
+             - 시간이 필요한 단계에서는 **반드시 먼저 "타이머를 시작할까요?"라고 물어봐.**
+             - 내가 "응"이라고 하면 그때 타이머를 켜.
+             """
+
+        # 새 연결은 빈 대화로 시작하므로 추적 중인 항목도 비움 (요약한 내용은 유지)
+        self.context.reset()
+        await self._send_now({
+            "type": "conversation.item.create",
+            "item": {
+                "id": RECIPE_ITEM_ID,
+                "type": "message",
+                "role": "user",
+                "content": [{ "type": "input_text", "text": recipe_prompt }]
+            }
+        })
+
+        if restore:
+            # 새 연결은 대화 기록이 없으므로 진행 상황을 요약해서 넘김 (응답은 만들지 않음)
+            await self._send_now({
+                "type": "conversation.item.create",
+                "item": {
+                    "id": RESTORE_ITEM_ID,
+                    "type": "message",
+                    "role": "user",
+                    "content": [{"type": "input_text", "text": self.conversation_summary()}]
+                }
+            })
+
+    def conversation_summary(self) -> str:
+        """재연결 시 새 세션에 넘길 진행 상황: 현재 단계, 실행 중인 타이머, 최근 대화"""
+        lines = ["[진행 상황] 연결이 잠시 끊겼다가 다시 연결되었습니다. 처음부터 다시 시작하지 말고 아래 상황에서 이어서 진행하세요."]
+        if self.replay.current_step:
+            lines.append(f"- 현재 단계: {self.replay.current_step}번째 단계")
+        now = time.monotonic()
+        for started, seconds in self.timers.values():
+            remaining = max(0, int(seconds - (now - started)))
+            lines.append(f"- 실행 중인 타이머: {seconds}초 중 {remaining}초 남음 (이미 실행 중이므로 다시 켜지 마세요)")
+        summarized = self.context.note_lines()
+        if summarized:
+            lines.append("- 앞부분 대화 요약:")
+            lines.extend(f"  {line}" for line in summarized)
+        if self.history:
+            lines.append("- 최근 대화:")
+            for role, text in self.history:
+                speaker = "사용자" if role == "user" else "보이스셰프"
+                lines.append(f"  {speaker}: {text[:RESTORE_TURN_CHARS]}")
+        lines.append("사용자가 말할 때까지 기다리세요.")
+        return "\n".join(lines)
+
+    # --- 타이머 ---
+    def start_timer(self, seconds: int):
+        """세션이 끝나면 함께 취소되도록 타이머 태스크를 세션에 등록"""
+        task = asyncio.create_task(self.timer_task(seconds))
+        self.timers[task] = (time.monotonic(), seconds)
+        task.add_done_callback(lambda t: self.timers.pop(t, None))
+
+    async def timer_task(self, seconds: int):
+        print(f"[Timer] {seconds}초 타이머 시작")
+        backend = get_state_backend()
+        timer_id = await asyncio.to_thread(backend.start_timer, self.session_id, seconds)
+        status = "failed"
+        try:
+            # 1. 화면에 타이머 표시 신호
+            await self.send_to_client({
+                "type": "timer_start",
+                "seconds": seconds
+            })
+
+            # 2. 실제 대기
+            await asyncio.sleep(seconds)
+
+            # 3. 종료 알림
+            print("[Timer] 종료! 클라이언트로 알림 전송")
+            self.tracer.start_turn("timer", "timer_done")
+            await self.send_to_client({
+                "type": "timer_done",
+                "message": "타이머가 종료되었습니다!"
+            })
+
+            await self.send_upstream({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": "user",
+                    "content": [
+                        {"type": "input_text", "text": "타이머가 종료되었습니다. 다음 단계로 진행해주세요."}
+                    ]
+                }
+            })
+
+            try:
+                await self.send_upstream({
+                    "type": "response.create",
+                    "response": {
+                        "modalities": ["text", "audio"], # 텍스트와 오디오로 응답
+                        "instructions": "타이머 종료를 알리고 다음 단계를 안내해주세요." # (선택) 지시사항 추가 가능
+                    }
+                })
+            except Exception as ws_e:
+                print(f"[Timer] OpenAI 메시지 전송 실패 (연결 종료됨?): {ws_e}")
+            status = "done"
+
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as e:
+            print(f"[Timer] 에러 발생: {e}")
+        finally:
+            # 스레드로 넘긴 뒤에는 취소되어도 기록은 끝까지 실행됨
+            await asyncio.to_thread(backend.finish_timer, timer_id, status)
+
+    # --- 반복 요청 재생 ---
+    async def replay_response(self, entry):
+        """캐시된 응답을 OpenAI 호출 없이 바로 재생"""
+        print(f"🔁 [Replay] {entry.step or '-'}번째 단계 응답 재생 ({len(entry.audio)} chunks)")
+        self.tracer.start_turn("replay", "repeat_request")
+        # 클라이언트는 replay 를 받으면 재생 대기 중인 오디오를 비우고 이어지는 audio 를 재생
+        await self.send_to_client({"type": "replay", "step": entry.step})
+        for chunk in entry.audio:
+            await self.send_to_client({"type": "audio", "data": chunk})
+            self.tracer.mark("first_audio")
+        await self.send_to_client({"type": "text", "data": entry.transcript})
+        # 모델도 같은 내용을 다시 말한 것으로 알도록 대화에 기록
+        await self.send_upstream({
+            "type": "conversation.item.create",
+            "item": {
+                "type": "message",
+                "role": "assistant",
+                "content": [{"type": "text", "text": entry.transcript}]
+            }
+        })
+
+    async def handle_repeat(self, request: RepeatRequest) -> bool:
+        """재생할 응답이 있으면 진행 중인 응답을 취소하고 재생. 없으면 False"""
+        entry = self.replay.lookup(request)
+        if not entry:
+            return False
+        if self.active_response_id:
+            self.suppressed.add(self.active_response_id)
+            await self.send_upstream({"type": "response.cancel"})
+        else:
+            # server VAD 가 곧 만들 응답도 재생으로 대체
+            self.suppress_next_response = True
+        await self.replay_response(entry)
+        return True
+
+    async def handle_client_control(self, message: dict, device: Device):
+        if message.get("type") == "mic":
+            # 기기 화면에서 마이크를 직접 가져오거나 놓음
+            if message.get("action") == "take":
+                await self.set_mic_floor(device.device_id, "take")
+            elif message.get("action") == "release" and self.mic_floor == device.device_id:
+                await self.set_mic_floor(None, "release")
+            return
+        if message.get("type") != "repeat":
+            return
+        request = RepeatRequest(step=message.get("step"))  # parse_control 에서 검증한 값
+        if await self.handle_repeat(request):
+            return
+        # 캐시에 없으면 모델에게 다시 설명을 요청
+        await self.send_to_client({"type": "replay_miss", "step": request.step})
+        ask = f"{request.step}번째 단계 다시 설명해줘" if request.step else "방금 단계 다시 말해줘"
+        await self.send_upstream({
+            "type": "conversation.item.create",
+            "item": {
+                "type": "message",
+                "role": "user",
+                "content": [{"type": "input_text", "text": ask}]
+            }
+        })
+        await self.send_upstream({"type": "response.create"})
+
+    # --- 대화 컨텍스트 정리 ---
+    async def compact_context(self):
+        """
+        응답이 끝난 뒤 대화가 길어졌으면 오래된 항목을 지우고 요약 메모로 대신합니다.
+        새 메모를 레시피 프롬프트 바로 뒤에 먼저 넣고 이전 메모와 오래된 항목을 conversation.item.delete 로 지움
+        """
+        if not CONTEXT_MANAGEMENT or self.active_response_id or not self.upstream_ready.is_set():
+            return
+        if not self.context.needs_compaction():
+            return
+        input_tokens = self.context.last_input_tokens
+        item_ids, note = self.context.plan_compaction()
+        if not item_ids:
+            return
+        note_id = self.context.next_note_id()
+        create = {
+            "type": "conversation.item.create",
+            "item": {
+                "id": note_id,
+                "type": "message",
+                "role": "user",
+                "content": [{"type": "input_text", "text": note}]
+            }
+        }
+        if RECIPE_ITEM_ID in self.context.items:
+            create["previous_item_id"] = RECIPE_ITEM_ID
+        await self.send_upstream(create)
+        stale = [self.context.note_id] if self.context.note_id else []
+        self.context.note_id = note_id
+        for item_id in [*stale, *item_ids]:
+            await self.send_upstream({"type": "conversation.item.delete", "item_id": item_id})
+        print(f"🧹 [Context] 항목 {len(item_ids)}개를 요약으로 대체 (입력 토큰 {input_tokens}, 남은 항목 {len(self.context.items)})")
+
+    # --- 수신 루프 ---
+    async def receive_from_device(self, device: Device):
+        """기기 하나의 수신 루프. 끝나면 세션에서 빠짐 (마지막 기기면 세션 종료)"""
+        import websockets
+
+        try:
+            while True:
+                message = await device.ws.receive()
+                self.last_activity = time.monotonic()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                if message.get("text") is not None:
+                    # 텍스트 프레임은 제어 메시지 (예: {"type": "repeat", "step": 2}). 잘못된 메시지는 그 기기에만 알리고 계속 받음
+                    try:
+                        control = parse_control(message["text"])
+                    except ValueError as e:
+                        await device.send_json({"type": "error", "message": str(e)})
+                        continue
+                    await self.handle_client_control(control, device)
+                    continue
+                audio = message["bytes"]
+                if device.decoder:
+                    # 디코딩(묶음당 수 ms)은 이벤트 루프 밖에서. 페이지가 덜 모였으면 다음 프레임까지 기다림
+                    audio = await asyncio.to_thread(device.decoder.feed, audio)
+                    if not audio:
+                        continue
+                await self.forward_audio(device, audio)
+        except (WebSocketDisconnect, websockets.exceptions.ConnectionClosed):
+            print(f"Client disconnected. ({device.device_id})")
+            await self.flush_device(device)
+        except Exception as e:
+            print(f"Client receive error: {e}")
+        finally:
+            await self.detach(device)
+
+    async def forward_audio(self, device: Device, audio: bytes):
+        # 마이크는 한 기기만: 다른 기기가 가지고 있으면 버림
+        if not await self.grant_mic(device, audio):
+            device.frames["dropped"] += 1
+            return
+        device.frames["forwarded"] += 1
+        b64_audio = base64.b64encode(audio).decode('utf-8')
+        event = {
+            "type": "input_audio_buffer.append",
+            "audio": b64_audio
+        }
+        await self.send_upstream(event)
+
+    async def flush_device(self, device: Device):
+        """기기가 나갈 때 디코더에 남은 마지막 묶음(말끝)도 OpenAI 로 보냄"""
+        if not device.decoder or self.closing:
+            return
+        try:
+            audio = await asyncio.to_thread(device.decoder.flush)
+            if audio:
+                await self.forward_audio(device, audio)
+        except Exception as e:
+            print(f"Decoder flush error: {e}")
+
+    async def receive_from_openai(self):
+        """연결이 끊기면 재연결해서 계속 받음. 재연결에 실패하면 반환 (세션 종료)"""
+        while True:
+            await self.pump_upstream()
+            if self.closing or not await self.reconnect():
+                return
+
+    async def pump_upstream(self):
+        try:
+            async for message in self.openai_ws:
+                event = json.loads(message)
+                event_type = event.get("type")
+
+                if event_type == "response.created":
+                    self.tracer.mark("response_created")
+                    self.active_response_id = event["response"]["id"]
+                    if self.suppress_next_response:
+                        self.suppress_next_response = False
+                        self.suppressed.add(self.active_response_id)
+                        await self.send_upstream({"type": "response.cancel"})
+
+                elif event_type == "response.done":
+                    self.tracer.mark("response_done")
+                    response = event.get("response", {})
+                    if response.get("status") == "completed":
+                        self.responded_since_speech = True
+                    else:
+                        self.replay.discard(response.get("id"))
+                    self.suppressed.discard(response.get("id"))
+                    self.active_response_id = None
+                    usage = response.get("usage") or {}
+                    self.tracer.record_usage(usage)
+                    self.context.observe_usage(usage)
+                    await self.compact_context()
+
+                elif event_type == "conversation.item.created":
+                    self.context.item_created(event.get("item") or {})
+
+                elif event_type == "conversation.item.deleted":
+                    self.context.item_deleted(event.get("item_id"))
+
+                elif event_type == "input_audio_buffer.speech_started":
+                    self.responded_since_speech = False
+
+                elif event_type == "input_audio_buffer.speech_stopped":
+                    # 사용자 발화가 끝난 시점부터 새 턴
+                    self.tracer.start_turn("speech", "speech_stopped")
+
+                elif event_type == "conversation.item.input_audio_transcription.completed":
+                    self.history.append(("user", event.get("transcript") or ""))
+                    self.context.set_transcript(event.get("item_id"), event.get("transcript"))
+                    # 이미 답한 발화는 건너뜀 (자막이 응답보다 늦게 도착할 수 있음)
+                    request = detect_repeat(event.get("transcript") or "")
+                    if request and not self.responded_since_speech:
+                        await self.handle_repeat(request)
+
+                elif event_type == "response.audio.delta":
+                    b64_data = event.get("delta")
+                    response_id = event.get("response_id")
+                    if b64_data and response_id not in self.suppressed:
+                        await self.send_to_client({"type": "audio", "data": b64_data})
+                        self.tracer.mark("first_audio")
+                        self.replay.add_audio(response_id, b64_data)
+
+                elif event_type == "response.audio_transcript.done":
+                    transcript = event.get("transcript")
+                    response_id = event.get("response_id")
+                    self.context.set_transcript(event.get("item_id"), transcript)
+                    if response_id not in self.suppressed:
+                        await self.send_to_client({"type": "text", "data": transcript})
+                        self.tracer.mark("transcript_done")
+                        self.replay.finish(response_id, transcript)
+                        self.history.append(("assistant", transcript or ""))
+
+                elif event_type == "response.function_call_arguments.done":
+                    self.tracer.mark("tool_call")
+                    call_id = event.get("call_id")
+                    name = event.get("name")
+                    arguments = event.get("arguments")
+
+                    if name == "start_timer":
+                        try:
+                            args = json.loads(arguments)
+                            seconds = args.get("seconds", 0)
+
+                            # 타이머 시작 메시지
+                            await self.send_to_client({
+                                "type": "text",
+                                "data": f"(타이머 {seconds}초 설정됨)"
+                            })
+
+                            self.start_timer(seconds)
+
+                            func_resp = {
+                                "type": "conversation.item.create",
+                                "item": {
+                                    "type": "function_call_output",
+                                    "call_id": call_id,
+                                    "output": json.dumps({"status": "timer_started"})
+                                }
+                            }
+                            await self.send_upstream(func_resp)
+                            self.tracer.mark("tool_output_sent")
+
+                        except Exception as e:
+                            print(f"Timer parsing error: {e}")
+
+                elif event_type == "error":
+                    print(f"OpenAI Error: {event}")
+
+        except Exception as e:
+            print(f"OpenAI receive error: {e}")
+        self.upstream_ready.clear()
+
+
+@router.get("/sessions")
+async def session_stats():
+    """이 워커의 실시간 세션 수, 열린 업스트림/타이머 수, 종료 사유와 누수 집계"""
+    return registry.stats()
@@ -1,23 +1,28 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import google.generativeai as genai
+import asyncio
 import json
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GOOGLE_AI_KEY = os.getenv("GOOGLE_AI_KEY")
-genai.configure(api_key=GOOGLE_AI_KEY)
+from utils.model_router import routed_generate, routed_generate_async, task_model
+from utils.youtube_download import recog_video, video_cache_key
+from utils.state_backend import get_state_backend, text_key
+from utils.youtube_captions import CAPTION_FAST_PATH, fetch_video_text, format_video_text, score_recipe_text
+from utils.recipe_corpus import lookup_local_recipe
 
 # 검색 도구 없이 일반 모델 사용 (API 호환성 문제로 인해)
-model = genai.GenerativeModel('gemini-2.5-flash')
+# 작업별 모델은 model_router 의 티어 설정을 따름 (레시피 작성은 strong, 조리 시간 추정은 lite)
 
 # FastAPI 애플리케이션 인스턴스 생성 (새로 추가)
 app = FastAPI()
 
-# 레시피 저장용 전역 변수 (main.py에서 접근 가능)
-current_recipe = None
+
+def menu_key(menu_name: str) -> str:
+    return "".join(menu_name.split())
+
+
+def get_cached_recipe(menu_name: str) -> str | None:
+    """이미 생성해 둔 메뉴 레시피 텍스트가 있으면 반환 (ingredient_service 에서 재료 분류에 재사용)"""
+    return get_state_backend().get_result("recipe_text", menu_key(menu_name))
 
 # Pydantic 모델 정의 (새로 추가)
 class MenuRequest(BaseModel):
@@ -31,80 +36,133 @@ class RecipeResponse(BaseModel):
     steps: list[str]
     tips: list[str] = []
 
-from utils.youtube_download import recog_video
 
 async def search_recipe_text(menu_name: str) -> str:
     """
     레시피를 검색하여 텍스트 형식으로 반환하는 함수
     (test1.py 등에서 직접 호출 가능)
     """
+    # 상태 저장소(SQLite) 호출은 이벤트 루프를 막지 않도록 스레드에서
+    cached = await asyncio.to_thread(get_cached_recipe, menu_name)
+    if cached:
+        return cached
+
+    # 로컬 코퍼스에 확실히 같은 메뉴가 있으면 생성 없이 바로 사용 ("김치 찌개", "김치찌게" → 김치찌개)
+    match = lookup_local_recipe(menu_name)
+    if match:
+        print(f"📚 로컬 레시피 사용: {menu_name} → {match.name} (similarity={match.similarity}, typo={match.typo_similarity})")
+        await asyncio.to_thread(get_state_backend().put_result, "recipe_text", menu_key(menu_name), match.recipe)
+        return match.recipe
+
     try:
-        # 1. 검색 및 정리를 위한 프롬프트
-        prompt = f"""
-        다음 요리의 레시피를 구글에서 검색해서 가장 대중적이고 맛있는 방법으로 정리해줘: "{menu_name}"
-        
-        [조건]
-        1. 재료는 정확한 계량(큰술, 컵, g 등)을 포함해서 적어줘.
-        2. 조리 순서는 따라하기 쉽게 번호를 매겨서 단계별로 명확히 작성해.
-        3. 팁은 포함하지 마.
-        
-        [출력 포맷]
-        반드시 아래와 같은 텍스트 형식으로 출력해:
-        
-        [재료]
-        - 재료1
-        - 재료2
-        ...
-        
-        [조리 단계]
-        1. 단계1
-        2. 단계2
-        ...
-        """
+        # 1. 고정 형식 지시문은 recipe_model() 에 묶여 있으므로 메뉴명만 보냄
+        prompt = f'다음 요리의 레시피를 구글에서 검색해서 가장 대중적이고 맛있는 방법으로 정리해줘: "{menu_name}"'
 
         # 2. Gemini 호출 (내부적으로 구글 검색 수행됨)
-        response = model.generate_content(prompt)
+        response = await routed_generate_async("recipe_text", prompt, "recipe_format", RECIPE_FORMAT_INSTRUCTION)
         
-        # 3. 응답 텍스트 반환
+        # 3. 응답 텍스트 반환 (재료 분류/재요청에 재사용할 수 있도록 보관)
+        await asyncio.to_thread(get_state_backend().put_result, "recipe_text", menu_key(menu_name), response.text)
         return response.text
 
     except Exception as e:
         return f"❌ 에러 발생: {str(e)}"
 
 
+# 텍스트/영상/자막 레시피 요청이 공통으로 쓰는 고정 지시문 (prompt_cache 로 한 번만 묶어 둠)
+RECIPE_FORMAT_INSTRUCTION = """
+    너는 요리 레시피를 정리하는 도우미야. 요청받은 요리의 레시피를 아래 조건과 형식에 맞춰 정리해.
+    
+    [조건]
+    1. 재료는 정확한 계량(큰술, 컵, g 등)을 포함해서 적어줘.
+    2. 조리 순서는 따라하기 쉽게 번호를 매겨서 단계별로 명확히 작성해.
+    3. 팁은 포함하지 마.
+    
+    [출력 포맷]
+    반드시 아래와 같은 텍스트 형식으로 출력해:
+    
+    [재료]
+    - 재료1
+    - 재료2
+    ...
+    
+    [조리 단계]
+    1. 단계1
+    2. 단계2
+    ...
+    """
+
+# 영상 레시피 요청 (job_service 의 백그라운드 작업에서도 사용, recipe_model() 과 함께)
+VIDEO_RECIPE_PROMPT = "이 영상의 요리 레시피를 정리해줘."
+
+# 자막 기반 추출 요청 (뒤에 영상 제목/설명/자막이 붙음)
+CAPTION_RECIPE_RULE = """
+    아래 영상 정보의 요리 레시피를 정리해줘.
+    아래 [영상 제목], [영상 설명], [자막]에 나온 내용만 사용해.
+    재료나 조리 순서가 나와 있지 않으면 추측하지 말고 그 섹션을 비워 둬.
+    """
+
+COOKING_TIME_INSTRUCTION = """
+    주어진 레시피를 보고 예상 조리 시간을 추정해줘.
+    답변은 군더더기 없이 **분 단위의 숫자만** 딱 말해줘.
+    (예시: 1시간 30분 -> 90, 45분 -> 45)
+    """
+
+
+def recipe_model(task: str = "recipe_video"):
+    return task_model(task, "recipe_format", RECIPE_FORMAT_INSTRUCTION)
+
+
+def extract_recipe_from_captions(video_url: str) -> str | None:
+    """
+    영상을 받지 않고 제목/설명/자막만으로 레시피를 만들어 봅니다.
+    재료와 번호 매긴 단계가 충분하면 레시피 텍스트, 아니면 None (영상 분석으로 넘어감)
+    """
+    video_text = fetch_video_text(video_url)
+    if not video_text:
+        return None
+
+    prompt = CAPTION_RECIPE_RULE + "\n" + format_video_text(video_text)
+    try:
+        response = routed_generate("recipe_captions", prompt, "recipe_format", RECIPE_FORMAT_INSTRUCTION)
+        score = score_recipe_text(response.text)
+    except Exception as e:
+        # 자막 경로 실패는 영상 분석으로 넘어감 (fetch_video_text 와 같은 처리)
+        print(f"⚠️ 자막 기반 레시피 추출 실패, 영상 분석으로 진행: {e}")
+        return None
+
+    print(f"📝 자막 기반 레시피 점수: {score}")
+    return response.text if score["complete"] else None
+
+
 # 유튜브 영상에서 레시피 추출하는 함수 (새로 추가)
 async def search_recipe_video(video_url: str) -> str:
     """
     유튜브 URL을 받아서 영상을 분석하고 레시피를 텍스트로 반환
     """
+    cached = await asyncio.to_thread(get_state_backend().get_result, "recipe_video", video_cache_key(video_url))
+    if cached:
+        return cached
+
     try:
         print(f"🎥 유튜브 링크 감지: {video_url}")
+
+        # 자막/설명만으로 충분하면 영상 다운로드/업로드 없이 텍스트 호출 한 번으로 끝냄
+        if CAPTION_FAST_PATH:
+            response_text = await asyncio.to_thread(extract_recipe_from_captions, video_url)
+            if response_text:
+                await asyncio.to_thread(
+                    get_state_backend().put_result, "recipe_video", video_cache_key(video_url), response_text
+                )
+                return response_text
         
-        prompt = """
-        이 영상의 요리 레시피를 정리해줘.
-        
-        [조건]
-        1. 재료는 정확한 계량(큰술, 컵, g 등)을 포함해서 적어줘.
-        2. 조리 순서는 따라하기 쉽게 번호를 매겨서 단계별로 명확히 작성해.
-        3. 팁은 포함하지 마.
-        
-        [출력 포맷]
-        반드시 아래와 같은 텍스트 형식으로 출력해:
-        
-        [재료]
-        - 재료1
-        - 재료2
-        ...
-        
-        [조리 단계]
-        1. 단계1
-        2. 단계2
-        ...
-        """
-        
-        # recog_video는 동기 함수이므로, 여기서 호출
+        # recog_video는 동기 함수이므로 스레드에서 호출
         # (주의: 파일 다운로드/업로드로 인해 시간이 좀 걸림)
-        response_text = recog_video(prompt, video_url, model, generation_config=None)
+        model = await asyncio.to_thread(recipe_model)  # 처음이면 지시문 토큰 수 확인(네트워크)
+        response_text = await asyncio.to_thread(
+            recog_video, VIDEO_RECIPE_PROMPT, video_url, model, generation_config=None, task="recipe_video"
+        )
+        await asyncio.to_thread(get_state_backend().put_result, "recipe_video", video_cache_key(video_url), response_text)
         return response_text
         
     except Exception as e:
@@ -116,24 +174,23 @@ async def estimate_cooking_time(recipe_text: str) -> int:
     """
     레시피 텍스트를 분석하여 예상 조리 시간을 분 단위 정수로 반환 (예: 30)
     """
+    cached = await asyncio.to_thread(get_state_backend().get_result, "cooking_time", text_key(recipe_text))
+    if cached is not None:
+        return cached
+
     try:
-        prompt = f"""
-        다음 레시피를 보고 예상 조리 시간을 추정해줘.
-        답변은 군더더기 없이 **분 단위의 숫자만** 딱 말해줘.
-        (예시: 1시간 30분 -> 90, 45분 -> 45)
-        
-        [레시피]
-        {recipe_text}
-        """
+        prompt = f"[레시피]\n{recipe_text}"
         
-        response = model.generate_content(prompt)
+        response = await routed_generate_async("cooking_time", prompt, "cooking_time", COOKING_TIME_INSTRUCTION)
         # 숫자만 추출 (혹시 모를 공백 제거)
         time_str = response.text.strip()
         # 숫자 외의 문자가 섞여있을 경우를 대비해 숫자만 필터링하거나 int 변환 시도
         import re
         numbers = re.findall(r'\d+', time_str)
         if numbers:
-            return int(numbers[0])
+            minutes = int(numbers[0])
+            await asyncio.to_thread(get_state_backend().put_result, "cooking_time", text_key(recipe_text), minutes)
+            return minutes
         return 0 # 알 수 없음
         
     except Exception as e:
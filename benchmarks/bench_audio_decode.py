@@ -0,0 +1,181 @@
+"""
+/ws 압축 업링크(Ogg/Opus, WebM/Opus) 디코딩 비용을 측정하는 CLI
+
+    python -m benchmarks.bench_audio_decode                          # 합성 음성 10초, 60ms 페이지
+    python -m benchmarks.bench_audio_decode speech.wav --page-ms 20  # 실제 녹음 파일, 브라우저처럼 작은 페이지
+    python -m benchmarks.bench_audio_decode --container webm         # Chrome/Edge MediaRecorder 처럼 WebM
+    python -m benchmarks.bench_audio_decode --sessions 20 --json     # 동시 20세션 분량
+
+입력을 libsndfile 로 Ogg/Opus 인코딩한 뒤 브라우저 녹음기처럼 --page-ms 단위 페이지로 다시 나누거나(WebM 이면 패킷마다 SimpleBlock),
+--chunk-bytes 씩 잘라 디코더(make_decoder)에 넣습니다. 세션당 디코딩 CPU(오디오 1초당 CPU 시간), 한 코어로
+버틸 수 있는 세션 수, 업링크 대역폭(PCM16 24kHz = 384kbps 대비), 전체 파일 디코딩과의 차이(SNR)를 출력합니다.
+"""
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+import soundfile as sf
+
+from utils.audio_codec import (OGG_OPUS, TARGET_RATE, WEBM_OPUS, OggPageParser, make_decoder, make_page,
+                               opus_packet_samples)
+
+PCM16_KBPS = TARGET_RATE * 16 / 1000
+
+
+def synthetic_speech(seconds: float) -> np.ndarray:
+    """음절처럼 켜졌다 꺼지는 유성음 (피치가 천천히 바뀌는 하모닉 + 약한 잡음)"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * TARGET_RATE)) / TARGET_RATE
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / TARGET_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None) ** 0.5
+    return (0.2 * voiced * envelope + 0.01 * rng.standard_normal(len(t))).astype("float32")
+
+
+def encode_packets(audio: np.ndarray) -> list[bytes]:
+    """libsndfile 로 인코딩한 Ogg/Opus 의 패킷들 (OpusHead, OpusTags, 오디오 패킷 순)"""
+    buffer = io.BytesIO()
+    with sf.SoundFile(buffer, "w", samplerate=TARGET_RATE, channels=1, format="OGG", subtype="OPUS") as f:
+        f.write(audio)
+
+    packets, current = [], b""
+    for page in OggPageParser().feed(buffer.getvalue()):
+        offset = 0
+        for value in page.lacing:
+            current += page.body[offset:offset + value]
+            offset += value
+            if value < 255:
+                packets.append(current)
+                current = b""
+    return packets
+
+
+def ogg_stream(packets: list[bytes], page_ms: int) -> bytes:
+    """page_ms 단위 페이지로 다시 나눈 Ogg/Opus 스트림"""
+    pages = [make_page([packets[0]], 0, 0, 0x02), make_page([packets[1]], 0, 1, 0)]
+    granule, group, group_samples = 0, [], 0
+    for index, packet in enumerate(packets[2:]):
+        group.append(packet)
+        group_samples += opus_packet_samples(packet)
+        last = index == len(packets) - 3
+        if group_samples >= page_ms * 48 or last:
+            granule += group_samples
+            pages.append(make_page(group, granule, len(pages), 0x04 if last else 0))
+            group, group_samples = [], 0
+    return b"".join(pages)
+
+
+def ebml(element_id: int, payload: bytes = b"", *, unknown_size: bool = False) -> bytes:
+    size = b"\x01\xff\xff\xff\xff\xff\xff\xff" if unknown_size else b"\x01" + len(payload).to_bytes(7, "big")
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + size + payload
+
+
+def webm_stream(packets: list[bytes]) -> bytes:
+    """MediaRecorder 처럼 Segment/Cluster 크기를 모르는 WebM/Opus 스트림 (패킷마다 SimpleBlock, 1초마다 Cluster)"""
+    track = ebml(0xAE, ebml(0xD7, b"\x01") + ebml(0x86, b"A_OPUS") + ebml(0x63A2, packets[0])
+                 + ebml(0xE1, ebml(0x9F, b"\x01")))
+    stream = [ebml(0x1A45DFA3, ebml(0x4282, b"webm")), ebml(0x18538067, unknown_size=True), ebml(0x1654AE6B, track)]
+    elapsed_ms = cluster_ms = 0
+    for packet in packets[2:]:
+        if not elapsed_ms or elapsed_ms - cluster_ms >= 1000:
+            cluster_ms = elapsed_ms
+            stream += [ebml(0x1F43B675, unknown_size=True), ebml(0xE7, cluster_ms.to_bytes(4, "big"))]
+        stream.append(ebml(0xA3, b"\x81" + (elapsed_ms - cluster_ms).to_bytes(2, "big") + b"\x80" + packet))
+        elapsed_ms += opus_packet_samples(packet) // 48
+    return b"".join(stream)
+
+
+def run(audio: np.ndarray, page_ms: int, chunk_bytes: int, sessions: int, container: str = "ogg") -> dict:
+    packets = encode_packets(audio)
+    reference, _ = sf.read(io.BytesIO(ogg_stream(packets, page_ms)), dtype="int16")
+    stream = webm_stream(packets) if container == "webm" else ogg_stream(packets, page_ms)
+
+    decoders, outputs, batch_ms = [], [], []
+    wall = time.perf_counter()
+    for _ in range(sessions):
+        decoder = make_decoder(WEBM_OPUS if container == "webm" else OGG_OPUS)
+        pcm = []
+        for start in range(0, len(stream), chunk_bytes):
+            before = time.perf_counter()
+            out = decoder.feed(stream[start:start + chunk_bytes])
+            if out:
+                batch_ms.append((time.perf_counter() - before) * 1000)
+            pcm.append(out)
+        pcm.append(decoder.flush())
+        decoders.append(decoder)
+        outputs.append(np.frombuffer(b"".join(pcm), dtype=np.int16))
+    wall = time.perf_counter() - wall
+
+    decoded = outputs[0]
+    length = min(len(decoded), len(reference))
+    noise = (decoded[:length].astype(np.float64) - reference[:length]) ** 2
+    signal = reference[:length].astype(np.float64) ** 2
+    snr = 10 * np.log10(signal.sum() / noise.sum()) if noise.sum() else float("inf")
+
+    stats = decoders[0].stats()
+    cpu = sum(d.cpu_seconds for d in decoders)
+    audio_seconds = len(audio) / TARGET_RATE
+    batch_ms.sort()
+    return {
+        "audio_seconds": round(audio_seconds, 2),
+        "container": container,
+        "page_ms": page_ms,
+        "sessions": sessions,
+        "uplink_kbps": stats["kbps"],
+        "pcm16_kbps": PCM16_KBPS,
+        "batches_per_session": stats["batches"],
+        "decode_errors": sum(d.errors for d in decoders),
+        "samples": {"decoded": len(decoded), "reference": len(reference)},
+        "snr_vs_full_decode_db": round(snr, 1),
+        "cpu_seconds_per_audio_second": round(cpu / sessions / audio_seconds, 5),
+        "sessions_per_core": int(sessions * audio_seconds / cpu) if cpu else None,
+        "batch_decode_ms": {
+            "p50": round(batch_ms[len(batch_ms) // 2], 3),
+            "p95": round(batch_ms[min(len(batch_ms) - 1, int(len(batch_ms) * 0.95))], 3),
+            "max": round(batch_ms[-1], 3),
+        } if batch_ms else {},
+        "wall_seconds": round(wall, 3),
+    }
+
+
+def load_audio(path: str) -> np.ndarray:
+    audio, rate = sf.read(path, dtype="float32", always_2d=True)
+    audio = audio.mean(axis=1)
+    if rate != TARGET_RATE:
+        from scipy.signal import resample_poly
+
+        audio = resample_poly(audio, TARGET_RATE, rate).astype("float32")
+    return audio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming Ogg/Opus and WebM/Opus uplink decoding.")
+    parser.add_argument("input", nargs="?", help="측정할 음성 파일 (생략하면 합성 음성)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="합성 음성 길이 (초)")
+    parser.add_argument("--page-ms", type=int, default=60, help="Ogg 페이지 길이 (ms)")
+    parser.add_argument("--container", choices=("ogg", "webm"), default="ogg", help="업링크 컨테이너")
+    parser.add_argument("--chunk-bytes", type=int, default=512, help="WebSocket 프레임 하나의 크기")
+    parser.add_argument("--sessions", type=int, default=1, help="디코딩할 세션 수")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+    args = parser.parse_args()
+
+    audio = load_audio(args.input) if args.input else synthetic_speech(args.seconds)
+    report = run(audio, args.page_ms, args.chunk_bytes, args.sessions, args.container)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    print(f"🎙️ {report['audio_seconds']}s × {report['sessions']} sessions, {report['container']} ({report['page_ms']}ms pages)")
+    print(f"   uplink: {report['uplink_kbps']} kbps (PCM16 {report['pcm16_kbps']:.0f} kbps)")
+    print(f"   decode cpu: {report['cpu_seconds_per_audio_second'] * 1000:.2f} ms per audio second "
+          f"→ ~{report['sessions_per_core']} sessions per core")
+    print(f"   batch decode: {report['batch_decode_ms']} ({report['batches_per_session']} batches/session)")
+    print(f"   SNR vs full-file decode: {report['snr_vs_full_decode_db']} dB, "
+          f"samples {report['samples']}, errors={report['decode_errors']}")
+
+
+if __name__ == "__main__":
+    main()
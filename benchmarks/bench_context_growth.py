@@ -0,0 +1,134 @@
+"""
+세션 길이에 따른 Realtime 응답 지연과 컨텍스트 크기를 보는 CLI
+
+    REALTIME_TRACE_FILE=traces.jsonl python main.py                       # 세션 기록
+    python -m benchmarks.bench_context_growth traces.jsonl                # 세션 경과 시간 10분 단위로 집계
+    python -m benchmarks.bench_context_growth off.jsonl on.jsonl --bucket-minutes 5
+    python -m benchmarks.bench_context_growth --simulate 300              # 기록 없이 정리 정책만 시뮬레이션
+
+기록 파일은 LatencyTracer 가 내보낸 턴 기록(age_s, metrics_ms, input_tokens, cached_tokens)입니다.
+CONTEXT_MANAGEMENT=0 / 1 로 각각 기록한 파일을 함께 넘기면 파일별로 구간마다 입력 토큰(p50/max), 캐시 비율,
+--metric 지연(p50/p95)과 첫 구간 대비 증가율을 출력합니다.
+--simulate 는 턴마다 사용자 발화/응답/타이머 항목을 ConversationContext 에 넣고, 항목별 추정 토큰
+(사용자 오디오 초당 10, 어시스턴트 오디오 초당 20, 텍스트 2글자당 1)으로 정리 전후 컨텍스트 크기를 비교합니다.
+"""
+import argparse
+import json
+import random
+from collections import defaultdict
+
+from utils.conversation_context import ConversationContext, RECIPE_ITEM_ID
+from utils.latency_tracer import percentiles
+
+# 시뮬레이션: 세션 지시문 + 레시피 프롬프트 (매 턴 고정)
+BASE_TOKENS = 2500
+STEPS = ["첫", "두", "세", "네", "다섯", "여섯", "일곱", "여덟"]
+
+
+def read_turns(path: str) -> list[dict]:
+    turns = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("record") == "turn":
+                turns.append(record)
+    return turns
+
+
+def report_trace(path: str, bucket_minutes: float, metric: str):
+    turns = read_turns(path)
+    buckets = defaultdict(list)
+    for turn in turns:
+        buckets[int(turn.get("age_s", 0) // (bucket_minutes * 60))].append(turn)
+
+    print(f"\n{path}: {len(turns)} turns, {len({t['session_id'] for t in turns})} sessions")
+    print(f"{'minutes':>9} {'turns':>6} {'in_tok p50':>11} {'max':>7} {'cached':>7} {metric + ' p50':>28} {'p95':>8}")
+    first = None
+    for bucket in sorted(buckets):
+        rows = buckets[bucket]
+        tokens = [t["input_tokens"] for t in rows if t.get("input_tokens") is not None]
+        cached = sum(t.get("cached_tokens", 0) for t in rows if t.get("input_tokens") is not None)
+        latency = [t["metrics_ms"][metric] for t in rows if metric in t.get("metrics_ms", {})]
+        token_stats = percentiles(tokens) if tokens else None
+        latency_stats = percentiles(latency) if latency else None
+        if first is None and latency_stats:
+            first = latency_stats["p50"]
+        label = f"{bucket * bucket_minutes:g}-{(bucket + 1) * bucket_minutes:g}"
+        print(
+            f"{label:>9} {len(rows):>6} "
+            f"{token_stats['p50'] if token_stats else '-':>11} {token_stats['max'] if token_stats else '-':>7} "
+            f"{f'{cached / sum(tokens) * 100:.0f}%' if tokens else '-':>7} "
+            f"{latency_stats['p50'] if latency_stats else '-':>28} {latency_stats['p95'] if latency_stats else '-':>8}"
+            + (f"  ({latency_stats['p50'] / first:.2f}x)" if latency_stats and first else "")
+        )
+
+
+def simulate(turns: int, managed: bool, seed: int = 0) -> list[tuple[int, int, int]]:
+    """턴마다 (턴 번호, 남은 항목 수, 추정 입력 토큰)"""
+    rng = random.Random(seed)
+    context = ConversationContext()
+    tokens: dict[str, int] = {}
+    counter = 0
+
+    def add(role: str, text: str, item_tokens: int, kind: str = "message", item_id: str = None):
+        nonlocal counter
+        counter += 1
+        item_id = item_id or f"item_{counter}"
+        item = {"id": item_id, "type": kind, "role": role, "content": [{"type": "input_text", "text": text}]}
+        if kind == "function_call":
+            item = {"id": item_id, "type": kind, "name": "start_timer", "call_id": f"call_{counter}", "arguments": text}
+        context.item_created(item)
+        tokens[item_id] = item_tokens
+
+    add("user", "[레시피] ...", 0, item_id=RECIPE_ITEM_ID)
+    step = 0
+    rows = []
+    for turn in range(1, turns + 1):
+        add("user", "다음 단계 알려줘", int(rng.uniform(2, 5) * 10))
+        if rng.random() < 0.3 and step < len(STEPS):
+            step += 1
+        answer = f"{STEPS[max(step - 1, 0)]} 번째 단계입니다. 팬에 기름을 두르고 양파를 볶아 주세요. " * 2
+        add("assistant", answer, int(rng.uniform(8, 16) * 20) + len(answer) // 2)
+        if rng.random() < 0.15:
+            add(None, '{"seconds": 180}', 15, kind="function_call")
+            add("user", "타이머가 종료되었습니다. 다음 단계로 진행해주세요.", 20)
+        size = BASE_TOKENS + sum(tokens.get(item_id, 0) for item_id in context.items)
+        if context.note_id:
+            size += len(context.note_text()) // 2
+        rows.append((turn, len(context.items), size))
+        context.observe_usage({"input_tokens": size})
+        if managed and context.needs_compaction():
+            context.plan_compaction()
+            context.note_id = context.next_note_id()
+    return rows
+
+
+def report_simulation(turns: int, every: int):
+    off = simulate(turns, managed=False)
+    on = simulate(turns, managed=True)
+    print(f"{'turn':>6} {'items off':>10} {'tokens off':>11} {'items on':>9} {'tokens on':>10}")
+    for (turn, items_off, tokens_off), (_, items_on, tokens_on) in zip(off, on):
+        if turn % every == 0 or turn == turns:
+            print(f"{turn:>6} {items_off:>10} {tokens_off:>11} {items_on:>9} {tokens_on:>10}")
+    print(f"max tokens: off {max(r[2] for r in off)}, on {max(r[2] for r in on)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("traces", nargs="*", help="REALTIME_TRACE_FILE 로 기록한 JSONL")
+    parser.add_argument("--bucket-minutes", type=float, default=10)
+    parser.add_argument("--metric", default="speech_to_first_audio")
+    parser.add_argument("--simulate", type=int, default=0, help="기록 대신 이 턴 수만큼 정리 정책을 시뮬레이션")
+    parser.add_argument("--every", type=int, default=20, help="시뮬레이션 출력 간격(턴)")
+    args = parser.parse_args()
+
+    if args.simulate or not args.traces:
+        report_simulation(args.simulate or 200, args.every)
+    for path in args.traces:
+        report_trace(path, args.bucket_minutes, args.metric)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+서버 콜드 스타트(import main) 시간 벤치마크
+
+    python -m benchmarks.bench_import_time [--runs 5] [--module main]
+
+새 파이썬 프로세스에서 모듈을 import 하는 시간을 여러 번 재고,
+-X importtime 결과에서 누적 시간이 큰 모듈과 무거운 SDK 가 로드됐는지를 함께 출력합니다.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("google.generativeai", "pytubefix", "websockets", "openai")
+
+
+def measure_once(module: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def top_imports(module: str, limit: int) -> list[tuple[int, str]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative.strip()), name.rstrip()))
+    # 대상 모듈이 직접 import 한 모듈(들여쓰기 한 단계 아래)만 추려서 정렬
+    direct = [(us, name.strip()) for us, name in rows if (len(name) - len(name.lstrip())) // 2 == 1]
+    return sorted(direct, reverse=True)[:limit]
+
+
+def loaded_heavy_modules(module: str) -> list[str]:
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    # 모듈이 import 중에 stdout 으로 출력하는 경고가 있을 수 있으므로 마지막 줄만 사용
+    last_line = proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else ""
+    return [m for m in last_line.split(",") if m in HEAVY_MODULES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark module import (cold start) time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    samples = [measure_once(args.module) for _ in range(args.runs)]
+    print(f"import {args.module}: median {statistics.median(samples) * 1000:.0f} ms "
+          f"(min {min(samples) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms, runs={args.runs})")
+
+    print(f"imports made by {args.module}, by cumulative time:")
+    for us, name in top_imports(args.module, args.top):
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    heavy = loaded_heavy_modules(args.module)
+    print(f"heavy SDKs loaded at import: {', '.join(heavy) if heavy else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+로컬 재료 사전(trie) 분류 벤치마크
+
+    python -m benchmarks.bench_ingredient_lexicon [--repeat 2000]
+
+샘플 레시피 코퍼스의 [재료] 섹션을 반복 분류해서
+레시피당 평균 처리 시간과 사전 적중률(LLM 호출 없이 끝나는 비율)을 출력합니다.
+재료명/수량 분리 사례(SPLIT_CASES)의 정답 수도 함께 출력합니다.
+"""
+import argparse
+import time
+
+from utils.ingredient_lexicon import IngredientLexicon, categorize_recipe_ingredients, split_quantity
+
+SAMPLE_CORPUS = [
+    """[재료]
+- 신김치 2컵
+- 돼지고기 앞다리살 200g
+- 두부 1/2모
+- 대파 1대
+- 고춧가루 1큰술
+- 국간장 1큰술
+- 다진 마늘 1작은술
+- 물 500ml
+[조리 단계]
+1. 김치와 고기를 썬다.""",
+    """[재료]
+- 된장 2큰술
+- 애호박 1/3개
+- 감자 1개
+- 양파 1/2개
+- 두부 1/2모
+- 청양고추 1개
+- 멸치육수 600ml
+- 다진마늘 1작은술
+[조리 단계]
+1. 육수를 끓인다.""",
+    """[재료]
+- 스파게티 면 100g
+- 베이컨 3줄
+- 계란 노른자 2개
+- 파마산치즈 30g
+- 통후추 약간
+- 올리브오일 1큰술
+- 소금 약간
+[조리 단계]
+1. 면을 삶는다.""",
+    """[재료]
+- 떡볶이떡 300g
+- 어묵 2장
+- 대파 1대
+- 고추장 2큰술, 고춧가루 1큰술, 설탕 1큰술, 진간장 1큰술
+- 물엿 1큰술
+- 삶은 계란 2개
+[조리 단계]
+1. 양념을 푼다.""",
+    """[재료]
+- 닭다리살 400g
+- 감자 2개
+- 당근 1/2개
+- 양파 1개
+- 양념: 간장 4큰술, 설탕 2큰술, 맛술 2큰술, 다진 마늘 1큰술
+- 참기름 약간
+- 당면 50g
+[조리 단계]
+1. 닭을 데친다.""",
+    """[재료]
+- 바지락 300g
+- 칼국수면 2인분
+- 애호박 1/4개
+- 대파 1/2대
+- 국간장 1큰술
+- 소금 약간
+- 후춧가루 약간
+[조리 단계]
+1. 바지락을 해감한다.""",
+    """[재료]
+- 밥 1공기
+- 계란 2개
+- 스팸 1/2캔
+- 쪽파 2줄기
+- 굴소스 1큰술
+- 버터 1큰술
+- 깨소금 약간
+[조리 단계]
+1. 스팸을 깍둑썬다.""",
+    """[재료]
+- 소고기 양지 200g
+- 무 1/4개
+- 미역 20g
+- 국간장 2큰술
+- 참기름 1큰술
+- 퀴노아 1/2컵
+- 트러플오일 약간
+[조리 단계]
+1. 미역을 불린다.""",
+]
+
+# (재료 줄, 기대하는 (재료명, 수량))
+SPLIT_CASES = [
+    ("돼지고기 200g", ("돼지고기", "200g")),
+    ("간장2큰술", ("간장", "2큰술")),
+    ("간장두스푼", ("간장", "두스푼")),
+    ("고추장반컵", ("고추장", "반컵")),
+    ("2큰술 간장", ("간장", "2큰술")),
+    ("약 200g 돼지고기", ("돼지고기", "약 200g")),
+    ("설탕 한큰술", ("설탕", "한큰술")),
+    ("두반장 2큰술", ("두반장", "2큰술")),
+    ("한우 300g", ("한우", "300g")),
+    ("소금 약간", ("소금", "약간")),
+    ("계란", ("계란", "적당량")),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local ingredient categorization.")
+    parser.add_argument("--repeat", type=int, default=2000, help="코퍼스 반복 횟수")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    IngredientLexicon()
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    # 첫 호출에서 기본 사전이 컴파일되므로 미리 한 번 돌려 둠
+    categorize_recipe_ingredients(SAMPLE_CORPUS[0])
+
+    known = unknown = 0
+    for recipe in SAMPLE_CORPUS:
+        categorized, missed = categorize_recipe_ingredients(recipe)
+        known += sum(len(items) for items in categorized.values())
+        unknown += len(missed)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for recipe in SAMPLE_CORPUS:
+            categorize_recipe_ingredients(recipe)
+    elapsed = time.perf_counter() - start
+    per_recipe_us = elapsed / (args.repeat * len(SAMPLE_CORPUS)) * 1_000_000
+
+    print(f"lexicon compile: {compile_ms:.2f} ms")
+    print(f"recipes: {len(SAMPLE_CORPUS)} x {args.repeat}")
+    print(f"per recipe: {per_recipe_us:.1f} us")
+    print(f"lexicon hit rate: {known}/{known + unknown} ({known / (known + unknown):.1%})")
+    print(f"recipes needing LLM fallback: "
+          f"{sum(1 for r in SAMPLE_CORPUS if categorize_recipe_ingredients(r)[1])}/{len(SAMPLE_CORPUS)}")
+
+    wrong = [(line, split_quantity(line), expected) for line, expected in SPLIT_CASES
+             if split_quantity(line) != expected]
+    print(f"quantity split: correct {len(SPLIT_CASES) - len(wrong)}/{len(SPLIT_CASES)}")
+    for line, got, expected in wrong:
+        print(f"  {line!r}: {got} (expected {expected})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+로컬 레시피 코퍼스 검색 벤치마크
+
+    python -m benchmarks.bench_recipe_corpus [--repeat 200] [--scale 50]
+
+띄어쓰기/오타/별칭 변형과 코퍼스에 없는 메뉴로 검색해서
+질의당 처리 시간(p50/p95), 색인 생성 시간, 확신 일치율과 잘못된 일치 수를 출력합니다.
+--scale 배로 이름을 바꾼 복제 레시피를 추가해 큰 코퍼스에서의 시간도 볼 수 있습니다.
+"""
+import argparse
+import time
+
+from utils.recipe_corpus import CorpusRecipe, RecipeCorpus
+
+# (질의, 기대하는 레시피 이름 또는 None = 생성으로 넘어가야 함)
+QUERIES = [
+    ("김치찌개", "김치찌개"),
+    ("김치 찌개", "김치찌개"),
+    ("김치찌게", "김치찌개"),
+    ("된장 찌게", "된장찌개"),
+    ("된장국", "된장국"),
+    ("달걀말이", "계란말이"),
+    ("떡복이", "떡볶이"),
+    ("부대찌게", "부대찌개"),
+    ("소고기 미역국", "미역국"),
+    ("알리오올리오", "알리오 올리오"),
+    ("미역국수", None),
+    ("김치찜", None),
+    ("잡채밥", None),
+    ("제육덮밥", None),
+    ("짜장면", None),
+    ("계란국", None),
+    ("미역죽", None),
+    ("된장죽", None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--scale", type=int, default=1, help="코퍼스를 이 배수로 복제 (이름에 번호를 붙임)")
+    args = parser.parse_args()
+
+    base = RecipeCorpus.load().recipes
+    recipes = list(base)
+    for copy in range(1, args.scale):
+        recipes += [CorpusRecipe(f"{r.name}{copy}호", r.recipe, [], "bench") for r in base]
+
+    start = time.perf_counter()
+    corpus = RecipeCorpus(recipes)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    correct = wrong = missed = 0
+    for query, expected in QUERIES:
+        top = corpus.search(query, k=2)
+        hit = top[0] if top and top[0].confident else None
+        if hit and hit.name == expected:
+            correct += 1
+        elif hit:
+            wrong += 1
+            print(f"  ✗ {query} → {hit.name} ({hit.similarity}/{hit.typo_similarity}), expected {expected}")
+        elif expected is None:
+            correct += 1
+        else:
+            missed += 1
+            print(f"  - {query} missed {expected} (best {top[0].name if top else None})")
+
+    samples = []
+    for _ in range(args.repeat):
+        for query, _ in QUERIES:
+            start = time.perf_counter()
+            corpus.search(query, k=2)
+            samples.append((time.perf_counter() - start) * 1_000_000)
+    samples.sort()
+
+    print(f"corpus: {len(recipes)} recipes, {len(corpus.entries)} names, index build {build_ms:.1f} ms")
+    print(f"queries: {len(QUERIES)} x {args.repeat}")
+    print(f"per query: p50 {samples[len(samples) // 2]:.0f} us, p95 {samples[int(len(samples) * 0.95)]:.0f} us")
+    print(f"decisions: correct {correct}/{len(QUERIES)}, wrong match {wrong}, missed {missed}")
+
+
+if __name__ == "__main__":
+    main()
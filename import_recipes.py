@@ -0,0 +1,85 @@
+"""
+로컬 레시피 코퍼스(data/recipes.jsonl)에 레시피를 추가하는 CLI
+
+    python import_recipes.py new_recipes.jsonl             # 같은 이름이 있으면 건너뜀
+    python import_recipes.py new_recipes.jsonl --replace   # 같은 이름이면 교체
+    python import_recipes.py new_recipes.jsonl --dry-run   # 검증 결과만 출력
+
+입력은 한 줄에 {"name": "김치찌개", "aliases": ["김치 찌개"], "recipe": "[재료]\\n- ...\\n\\n[조리 단계]\\n1. ..."} 하나.
+recipe 는 /recipe 가 생성하는 것과 같은 [재료]/[조리 단계] 텍스트여야 하며,
+재료 MIN_INGREDIENTS 개, 번호 매긴 단계 MIN_STEPS 개 이상인 것만 추가합니다. 이름은 띄어쓰기/기호를 무시하고 비교합니다.
+"""
+import argparse
+import json
+import os
+
+from utils.recipe_corpus import RECIPE_CORPUS_PATH, CorpusRecipe, RecipeCorpus, normalize_name
+from utils.youtube_captions import score_recipe_text
+
+
+def read_recipes(path: str) -> tuple[list[CorpusRecipe], list[str]]:
+    recipes, errors = [], []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                recipe = CorpusRecipe(
+                    name=data["name"].strip(),
+                    recipe=data["recipe"].strip(),
+                    aliases=[alias.strip() for alias in data.get("aliases", []) if alias.strip()],
+                    source=data.get("source", os.path.basename(path)),
+                )
+            except (json.JSONDecodeError, KeyError, AttributeError, TypeError) as e:
+                errors.append(f"line {line_no}: {e}")
+                continue
+            score = score_recipe_text(recipe.recipe)
+            if not score["complete"]:
+                errors.append(f"line {line_no} ({recipe.name}): incomplete recipe {score}")
+                continue
+            recipes.append(recipe)
+    return recipes, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import recipes into the local recipe corpus.")
+    parser.add_argument("inputs", nargs="+", help="추가할 JSONL 파일")
+    parser.add_argument("--corpus", default=RECIPE_CORPUS_PATH, help="코퍼스 파일 (기본값 RECIPE_CORPUS_PATH)")
+    parser.add_argument("--replace", action="store_true", help="같은 이름이 있으면 교체")
+    parser.add_argument("--dry-run", action="store_true", help="파일을 쓰지 않고 결과만 출력")
+    args = parser.parse_args()
+
+    corpus = RecipeCorpus.load(args.corpus).recipes
+    index = {normalize_name(recipe.name): i for i, recipe in enumerate(corpus)}
+    added = replaced = skipped = 0
+    for path in args.inputs:
+        recipes, errors = read_recipes(path)
+        for error in errors:
+            print(f"⚠️ {path} {error}")
+        for recipe in recipes:
+            key = normalize_name(recipe.name)
+            if key in index:
+                if not args.replace:
+                    skipped += 1
+                    continue
+                corpus[index[key]] = recipe
+                replaced += 1
+            else:
+                index[key] = len(corpus)
+                corpus.append(recipe)
+                added += 1
+
+    print(f"📚 added={added} replaced={replaced} skipped={skipped} total={len(corpus)}")
+    if args.dry_run:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(args.corpus)), exist_ok=True)
+    tmp_path = args.corpus + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for recipe in corpus:
+            f.write(json.dumps(recipe.__dict__, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, args.corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,33 @@
-import os
-import json
-import base64
 import asyncio
-import websockets
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse, JSONResponse
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 import uvicorn
-from api.search_service import app as recipe_app  # search_service의 FastAPI app import
-from api import search_service  # 전역 변수 접근용
+from utils.state_backend import STATE_PRUNE_INTERVAL, get_state_backend, prune_state
 from pydantic import BaseModel
 from api.ingredient_service import router as ingredients_router 
+from api.job_service import router as jobs_router, runner as job_runner
+from api.realtime_session import (
+    CLOSE_SESSION_ELSEWHERE,
+    CLOSE_SESSION_FULL,
+    CLOSE_SESSION_NOT_FOUND,
+    MAX_DEVICES_PER_SESSION,
+    RealtimeSession,
+    registry as realtime_registry,
+    router as realtime_router,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from utils.video_workspace import get_workspace
+from utils.admission import AdmissionRejected, get_admission
+from utils.loop_monitor import get_loop_monitor
+from utils.audio_codec import negotiate_format
+from utils.prompt_cache import prompt_cache
+from utils.model_router import get_router
+from utils.usage import usage_snapshot
+from utils.recipe_corpus import get_corpus
+from utils.profiler import ProfileMiddleware, get_profiler
 
 load_dotenv()
 
@@ -20,9 +36,32 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     print("Warning: OPENAI_API_KEY not found in .env file")
 
-app = FastAPI()
+async def prune_state_periodically():
+    # 오래된 결과 캐시 삭제 (SQLite 호출이므로 스레드에서)
+    while True:
+        try:
+            await asyncio.to_thread(prune_state)
+        except Exception as e:
+            print(f"⚠️ 상태 정리 실패: {e}")
+        await asyncio.sleep(STATE_PRUNE_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 이전 프로세스가 비정상 종료하며 남긴 반쪽짜리 영상 정리
+    get_workspace().cleanup_partials()
+    # 실시간 세션 입장 제어에 쓰는 이벤트 루프 지연/CPU 측정
+    get_loop_monitor().start()
+    pruner = asyncio.create_task(prune_state_periodically())
+    yield
+    pruner.cancel()
+    # 만들어 둔 Gemini 컨텍스트 캐시는 TTL 까지 저장 비용이 나가므로 종료 시 삭제
+    await asyncio.to_thread(prompt_cache.close)
+
+app = FastAPI(lifespan=lifespan)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 app.include_router(ingredients_router)
+app.include_router(jobs_router)
+app.include_router(realtime_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,7 +69,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id"],
 )
+# PROFILING=1 일 때 ?profile=1 / X-Profile: 1 요청만 샘플링 프로파일링 (결과는 /debug/profiles)
+app.add_middleware(ProfileMiddleware)
 
 # Audio Configuration
 SAMPLE_RATE = 24000
@@ -43,6 +85,42 @@ async def get():
 async def check_api():
     return JSONResponse({"success": True, "message": "API Key Present"})
 
+@app.get("/usage")
+async def get_usage():
+    """작업별 Gemini 토큰(캐시 적중 포함)/응답 시간 누적, 모델별 비용/hedge 통계, 고정 지시문 캐시 상태"""
+    return {
+        "tasks": usage_snapshot(),
+        "routing": get_router().stats(),
+        "prompt_cache": prompt_cache.stats(),
+        "recipe_corpus": get_corpus().stats(),
+    }
+
+@app.get("/recipes/search")
+async def search_local_recipes(q: str, k: int = 5):
+    """로컬 레시피 코퍼스 검색 결과와 점수 (confident 인 1위만 /recipe 에서 생성 대신 사용)"""
+    return {"query": q, "matches": [match.to_dict() for match in get_corpus().search(q, k)]}
+
+@app.get("/debug/loop")
+async def debug_loop(limit: int = 20):
+    """이벤트 루프 지연 통계와 최근 멈춤(LOOP_STALL_MS 이상)의 스택, 멈춘 코드 위치별 누적 시간"""
+    monitor = get_loop_monitor()
+    return {"loop": monitor.stats(), "stalls": monitor.stall_report(limit)}
+
+@app.get("/debug/profiles")
+async def debug_profiles():
+    """진행 중/최근 프로파일 목록 (PROFILING=1 일 때만 생성됨)"""
+    return get_profiler().stats()
+
+@app.get("/debug/profiles/{profile_id}")
+async def debug_profile(profile_id: str, format: str = "json"):
+    """프로파일 요약과 함수별 샘플 수. format=collapsed 면 flamegraph/speedscope 용 collapsed stack 텍스트"""
+    profile = get_profiler().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    return profile.to_dict()
+
 
 class RecipeRequest(BaseModel):
     menu_name: str
@@ -67,8 +145,10 @@ async def get_recipe(request: RecipeRequest):
         # 예상 시간 계산
         estimated_time = await estimate_cooking_time(recipe_text)
         
-        # search_service의 전역 변수에 저장
-        search_service.current_recipe = recipe_text
+        # 공유 상태 저장소에 저장 (다른 워커의 /ws 세션도 recipe_id 로 조회 가능)
+        recipe_id = await asyncio.to_thread(
+            get_state_backend().save_recipe, recipe_text, estimated_time, source="menu", title=request.menu_name
+        )
         
         # 서버에서 출력
         print(f"\n[레시피 결과]\n{recipe_text}\n")
@@ -77,6 +157,7 @@ async def get_recipe(request: RecipeRequest):
         
         return JSONResponse({
             "success": True,
+            "recipe_id": recipe_id,
             "estimated_time": estimated_time
         })
         
@@ -88,35 +169,30 @@ async def get_recipe(request: RecipeRequest):
         )
 
 @app.post("/youtube-recipe")
-async def get_youtube_recipe(request: YoutubeRequest):
+async def get_youtube_recipe(request: YoutubeRequest, wait: bool = False):
     """
-    유튜브 URL로 레시피 생성하고 전역 변수에 저장
+    유튜브 URL 레시피 생성을 백그라운드 작업으로 등록하고 job_id 를 바로 반환 (/jobs/youtube-recipe 와 같음)
+    ?wait=true 면 작업이 끝날 때까지 기다려 예전처럼 recipe_id 와 예상 조리 시간을 반환
+    (다운로드/업로드/생성은 작업 단계에서 이벤트 루프 밖으로 실행됨)
     """
     try:
         print(f"\n{'='*60}")
         print(f"🎥 유튜브 레시피 요청: {request.video_url}")
         print(f"{'='*60}")
-        
-        # search_service의 함수 호출
-        from api.search_service import search_recipe_video, estimate_cooking_time
-        recipe_text = await search_recipe_video(request.video_url)
-        
-        # 예상 시간 계산
-        estimated_time = await estimate_cooking_time(recipe_text)
-        
-        # search_service의 전역 변수에 저장
-        search_service.current_recipe = recipe_text
-        
-        # 서버에서 출력
-        print(f"\n[유튜브 레시피 결과]\n{recipe_text}\n")
-        print(f"⏱️ 예상 조리 시간: {estimated_time}분")
+
+        payload = {"video_url": request.video_url}
+        if not wait:
+            job_id = await job_runner.submit("youtube_recipe", payload)
+            return JSONResponse({"success": True, "job_id": job_id, "status": "queued"})
+
+        result = await job_runner.run("youtube_recipe", payload)
+        print(f"⏱️ 예상 조리 시간: {result['estimated_time']}분")
         print(f"{'='*60}\n")
-        
-        return JSONResponse({
-            "success": True,
-            "estimated_time": estimated_time
-        })
-        
+
+        return JSONResponse({"success": True, **result})
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error: {e}")
         return JSONResponse(
@@ -127,328 +203,143 @@ async def get_youtube_recipe(request: YoutubeRequest):
 
 
 
-# --- 타이머 비동기 함수 ---
-async def timer_task(seconds: int, client_ws: WebSocket, openai_ws):
-    print(f"[Timer] {seconds}초 타이머 시작")
+async def reject_client(client_ws: WebSocket, code: int, reason: str, **extra):
     try:
-        # 1. 화면에 타이머 표시 신호
-        await client_ws.send_json({
-            "type": "timer_start",
-            "seconds": seconds
-        })
-        
-        # 2. 실제 대기
-        await asyncio.sleep(seconds)
-        
-        # 3. 종료 알림
-        print("[Timer] 종료! 클라이언트로 알림 전송")
-        await client_ws.send_json({
-            "type": "timer_done",
-            "message": "타이머가 종료되었습니다!"
-        })
+        await client_ws.send_json({"type": "rejected", "reason": reason, **extra})
+        await client_ws.close(code=code, reason=reason)
+    except Exception:
+        pass
 
-        await openai_ws.send(json.dumps({
-            "type": "conversation.item.create",
-            "item": {
-                "type": "message",
-                "role": "user",
-                "content": [
-                    {"type": "input_text", "text": "타이머가 종료되었습니다. 다음 단계로 진행해주세요."}
-                ]
-            }
-        }))
 
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+async def join_rejection(join_id: str) -> tuple[int, str, dict] | None:
+    """?session=<id> 로 참가할 수 없으면 (종료 코드, 이유, 추가 필드), 참가할 수 있으면 None"""
+    session = realtime_registry.find(join_id)
+    if session is not None:
+        if len(session.devices) >= MAX_DEVICES_PER_SESSION:
+            return CLOSE_SESSION_FULL, "session_full", {}
+        return None
+    # 세션은 연 워커 프로세스에만 있음. 다른 워커가 열었으면 sticky 라우팅이 필요하다고 알려 줌
+    record = await asyncio.to_thread(get_state_backend().get_session, join_id)
+    if record and record["ended_at"] is None and record["pid"] != os.getpid() and _pid_alive(record["pid"]):
+        return CLOSE_SESSION_ELSEWHERE, "session_on_other_worker", {"worker_pid": record["pid"]}
+    return CLOSE_SESSION_NOT_FOUND, "session_not_found", {}
+
+
+async def wait_for_admission(client_ws: WebSocket) -> bool:
+    """
+    동시 연결 수 제한: 자리가 없으면 대기열 순번을 알려주고, 과부하/대기열 초과면 종료 코드로 거절.
+    입장하면 True (호출한 쪽에서 admission.release), 거절되거나 대기 중 나가면 False
+    """
+    admission = get_admission()
+    left = asyncio.Event()
+    watcher: asyncio.Task | None = None
+
+    async def watch_disconnect():
+        # 대기 중에는 세션이 없으므로 받은 프레임은 버리고 연결이 끊기는지만 봄
         try:
-            await openai_ws.send(json.dumps({
-                "type": "response.create",
-                "response": {
-                    "modalities": ["text", "audio"], # 텍스트와 오디오로 응답
-                    "instructions": "타이머 종료를 알리고 다음 단계를 안내해주세요." # (선택) 지시사항 추가 가능
-                }
-            }))
-        except Exception as ws_e:
-            print(f"[Timer] OpenAI 메시지 전송 실패 (연결 종료됨?): {ws_e}")
-        
-    except Exception as e:
-        print(f"[Timer] 에러 발생: {e}")
+            while (await client_ws.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            left.set()
+
+    async def send_position(position: int):
+        nonlocal watcher
+        await client_ws.send_json({"type": "queued", "position": position})
+        if watcher is None:
+            watcher = asyncio.create_task(watch_disconnect())
+
+    waiting = asyncio.create_task(admission.acquire(send_position))
+    gone = asyncio.create_task(left.wait())
+    await asyncio.wait({waiting, gone}, return_when=asyncio.FIRST_COMPLETED)
+    client_left = left.is_set()
+    gone.cancel()
+    if watcher:
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+    if client_left:
+        # 순번이 그대로라 알림 전송이 실패하지 않아도, 끊긴 연결로 OpenAI 세션을 열지 않음
+        if not waiting.done():
+            waiting.cancel()
+        outcome = (await asyncio.gather(waiting, return_exceptions=True))[0]
+        if outcome is None:
+            await admission.release()  # 끊기는 순간 입장된 경우
+        print("🚪 [Admission] 대기 중 클라이언트 나감")
+        return False
+    try:
+        waiting.result()
+    except AdmissionRejected as e:
+        print(f"🚫 [Admission] 거절: {e.reason}")
+        await reject_client(client_ws, e.code, e.reason, retry_after=e.retry_after)
+        return False
+    except Exception:
+        return False  # 대기 중 클라이언트가 나감
+    return True
+
 
 @app.websocket("/ws")
 async def websocket_endpoint(client_ws: WebSocket):
     await client_ws.accept()
     print("Client connected")
-
-    url = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "OpenAI-Beta": "realtime=v1"
-    }
-
+    # ?audio=webm_opus,ogg_opus,pcm16 처럼 선호 순서대로 요청하면 서버가 디코딩할 수 있는 첫 형식 사용 (기본 pcm16)
+    audio_format = negotiate_format(client_ws.query_params.get("audio"))
+    admission = get_admission()
+
+    # ?session=<id> 면 진행 중인 세션에 기기로 참가. 업스트림 연결은 함께 쓰지만 기기마다 디코딩/전송 비용이 있으므로
+    # 새 세션과 똑같이 입장 제어 자리를 하나 차지함
+    join_id = client_ws.query_params.get("session")
+    if join_id:
+        rejection = await join_rejection(join_id)
+        if rejection is None:
+            if not await wait_for_admission(client_ws):
+                return
+            try:
+                # 대기하는 동안 세션이 끝났거나 가득 찼을 수 있음
+                rejection = await join_rejection(join_id)
+                if rejection is None:
+                    await realtime_registry.find(join_id).attach(client_ws, audio_format)
+                    return
+            finally:
+                await admission.release()
+        code, reason, extra = rejection
+        print(f"🚫 [Session] 참가 거절: {join_id} ({reason})")
+        await reject_client(client_ws, code, reason, **extra)
+        return
+
+    if not await wait_for_admission(client_ws):
+        return
+
+    # 입장한 뒤에는 어디서 실패하든 자리를 돌려줌 (레시피/세션 조회 실패 포함)
     try:
-        async with websockets.connect(url, additional_headers=headers) as openai_ws:
-            print("Connected to OpenAI Realtime API")
-            
-            # --- [핵심 수정 1] 세션 설정: 노이즈 필터링 & 확인 절차 ---
-            session_update = {
-                "type": "session.update",
-                "session": {
-                    "modalities": ["audio", "text"],
-                    "instructions": """
-                     [행동 규칙]
-                    1. 레시피를 한 단계씩 친절하게 설명하세요.
-                     1) 단계 번호는 항상 **서수 형태**로만 표현합니다.
-                    - "첫 번째 단계"
-                    - "두 번째 단계"
-                    - "세 번째 단계"
-                    - "네 번째 단계"
-                    - 이런 식으로 서수만 사용합니다. (1단계, 2단계처럼 말하지 않음)
-
-
-                    2. **[타이머 확인 절차]**
-                    - 레시피 단계에 '시간(예: "~분간", "~분 동안", "~분 더","약 ~분", "~분", "~분 끓이기", "~분 볶기", "몇 분")'이 포함되어 있다면, **절대로 바로 타이머 도구를 실행하지 마세요.**
-                    - 먼저 반드시 이렇게 물어보세요:
-                        - "타이머를 시작할까요?"
-                    - 사용자가 "응", "그래", "시작해", "네" 등으로 **명확하게 동의했을 때만** `start_timer` 도구를 실행하세요.
-                    
-                    - 사용자가 "아니", "아니요", "필요 없어","아녀", "안 해", "괜찮아", "넘어가", "노노", "안해", "싫어", "노", "no"와 같이 명확히 거부하면:
-                        - 타이머는 실행하지 않습니다.
-                        - 하지만 '그 단계의 조리 과정'은 그대로 진행해야 합니다.
-                        - 절대로 다음 단계로 자동으로 넘어가지 마세요.
-                        - 예: "알겠습니다. 타이머 없이 진행할게요. 이제 X분 동안 조리해 주세요. 준비되면 말씀해 주시겠어요?."
-
-
-                    3. 타이머가 돌아가는 동안에는 잡담을 하지 말고 조용히 기다리세요.
-
-
-                    4. 사용자가 요리 단계 이외의 질문(재료 대체, 팁, 조리 관련 궁금증 등)을 하면
-                    - 단계 진행을 잠시 멈추고 질문에 대답한 뒤
-                    - 다시 현재 단계부터 이어서 설명하세요.
-
-
-                    5. **[중요: "다시" 요청 처리 규칙]**
-                    사용자가 다음과 같은 표현을 말하면, 이것은 '반복 요청'입니다:
-                    - "다시 말해줘"
-                    - "방금 단계 다시 말해줘"
-                    - "전 단계 뭐였어?"
-                    - "조금 전 설명 다시"
-                    - "다시 설명해줘"
-                    - "한 번만 더 말해줘"
-                    - "방금 거 잘 못 들었어"
-                    - 그 밖에 "다시"라는 단어가 포함된 비슷한 문장들
-
-
-                    이 경우에는 **절대로 다음 단계로 넘어가면 안 됩니다.**
-                    - 새로운 단계 번호(예: "이제 2단계입니다", "다음으로", "그 다음에는")를 말하지 마세요.
-                    - 오직 '직전 단계'만 다시 설명하세요.
-                    - 형식 예:
-                        - "방금 단계는 두 번째 단계였습니다. 팬에 기름을 두르고 중불에서 양파를 3분간 볶아주는 단계였어요."
-                    - 마지막에 꼭 이렇게 물어보세요:
-                        - "이 단계를 한 번 더 설명해 드릴까요, 아니면 다음 단계로 넘어갈까요?"
-
-
-                    6. 사용자가 "처음부터 다시", "처음 단계부터 차근차근 알려줘"라고 말하면:
-                    - 1단계부터 순서대로 다시 설명을 시작하세요.
-                    - 각 단계 뒤에 항상 이렇게 물어보세요:
-                        - "다음 단계로 넘어갈까요, 아니면 이 단계 다시 설명해 드릴까요?"
-
-
-                    7. 전체 대화에서 가장 중요한 우선순위는:
-                    - (1) 사용자의 이해도에 맞춰 설명하는 것
-                    - (2) 사용자가 요청한 것을 정확하게 수행하는 것입니다.
-                    - 사용자가 "다시", "전 단계" 같은 말을 하면, **새로운 정보를 주거나 다음 단계로 진행하는 것보다 '반복 설명'이 항상 더 우선입니다.**
-                   
-                    8. **[특정 단계 번호 요청 처리 규칙]**
-                    사용자가 다음과 같은 표현을 말하면:
-                    - "첫 번째 단계 알려줘", "두 번째 단계가 뭐였지?"
-                    - "지금 세 번재 단계인데 첫 번째 단계 다시 말해줘"
-                    - "앞 단계(전 단계 말고 그 앞 단계) 뭐였어?"
-                    - "처음 두 단계만 알려줘"
-                    - "몇 단계까지 있는지 말해줘"
-			
-                    아래 기준으로 행동하세요:
-
-
-                    - 사용자가 특정 '단계 번호'를 언급했다면,
-                        → 현재 단계와 상관없이 **요청한 단계 번호만 정확하게 설명**합니다.
-
-
-                    - 예시:
-                        사용자: "지금 네 번째 단계지? 근데 두 번째 단계 다시 말해줘."
-                        보이스셰프: "두 번째 단계는 김치를 넣기 전에 돼지고기를 먼저 볶는 과정이었어요. 충분히 익혀주면 풍미가 살아나요."
-
-
-                    - 단계 번호를 설명한 후에는 반드시 이렇게 물어보세요:
-                        - "현재 진행 중인 단계(예: 네 번째 단계)로 돌아가서 계속할까요?"
-                        - (또는)
-                        - "이전에 설명한 단계를 더 듣고 싶으신가요?"
-
-
-                    - 절대로 단계 번호를 혼동하거나, 잘못된 단계로 넘어가면 안 됩니다.
-
-
-
-
-                    9. **[중간 질문 처리 규칙]**
-                        사용자가 요리 과정과 직접 무관한 질문을 하면 (예: 재료 대체, 맛 변형, 불 세기, 위생, 도구 추천 등),
-                       
-                        1) 현재 단계 진행을 잠시 '정지'하고  
-                        2) 질문에 대해 친절하고 정확하게 답변한 뒤  
-                        3) 다시 원래 단계로 자연스럽게 돌아옵니다.
-
-
-                        - 예시:
-                            사용자: "이거 삼겹살로 바꿔도 돼?"
-                            보이스셰프:
-                                - "네, 삼겹살을 사용해도 괜찮아요. 기름이 조금 더 나와서 더 고소해질 수 있어요."
-                                - "그럼 다시 현재 단계로 돌아갈게요. 우리는 지금 3단계를 진행하고 있었어요."
-
-
-                        4) 질문에 답한 후에는 반드시 이렇게 마무리하세요:
-                            - "지금 단계 설명을 계속할까요?"
-                            - "이 단계를 다시 설명해드릴까요?"
-                            - "다음 단계로 넘어갈까요?"
-
-
-                    10. **[속도 조절 처리 규칙]**
-                        1)사용자가  "천천히 말해줘","차근차근 말해줘","더 세부적으로 말해줘", "초보야"라고 말하면 천천히, 자세하게 설명.
-                        2) 사용자가  "빨리 말해줘","요약해서 말해줘","짧게 말해줘", "고수야" 라고 말하면 핵심만 빠르게 설명.
-
-
-                    """,
-                    "voice": "alloy",
-                    "input_audio_format": "pcm16",
-                    "output_audio_format": "pcm16",
-                    "turn_detection": {
-                        "type": "server_vad",
-                        # ▼▼▼ [여기를 수정했습니다] ▼▼▼
-                        # 0.5 (기본값) -> 0.6 ~ 0.8 (노이즈 무시)
-                        # 주변이 시끄러우면 0.7~0.8로 올리세요.
-                        "threshold": 0.8,  
-                        "prefix_padding_ms": 300,
-                        "silence_duration_ms": 500
-                    },
-                    "tools": [
-                        {
-                            "type": "function",
-                            "name": "start_timer",
-                            "description": "Starts a countdown timer. Only execute this AFTER the user explicitly confirms (says 'yes').",
-                            "parameters": {
-                                "type": "object",
-                                "properties": {
-                                    "seconds": {
-                                        "type": "integer",
-                                        "description": "Duration in seconds"
-                                    }
-                                },
-                                "required": ["seconds"]
-                            }
-                        }
-                    ],
-                    "tool_choice": "auto"
-                }
-            }
-            await openai_ws.send(json.dumps(session_update))
-            
-            # 전역 변수에서 레시피 가져오기
-            recipe_text = search_service.current_recipe or """
-            [재료] 아직 레시피가 선택되지 않았습니다.
-            [조리 단계]
-            1. /recipe 엔드포인트로 레시피를 먼저 요청해주세요.
-            """
-            
-            # [디버그] 현재 적용된 레시피 확인
-            print(f"\n📢 [WebSocket] 적용된 레시피:\n{recipe_text[:100]}...\n")
-            
-            recipe_prompt = f""" 
-             [레시피]
-             {recipe_text}
-             
-             위 레시피로 요리를 도와줘. 
-             - 한 번에 한 단계씩 설명해.
-             - 시간이 필요한 단계에서는 **반드시 먼저 "타이머를 시작할까요?"라고 물어봐.**
-             - 내가 "응"이라고 하면 그때 타이머를 켜.
-             """
-
-            await openai_ws.send(json.dumps({
-                "type": "conversation.item.create",
-                "item": {
-                    "type": "message",
-                    "role": "user",
-                    "content": [{ "type": "input_text", "text": recipe_prompt }]
-                }
-            }))
-
-            async def receive_from_client():
-                try:
-                    while True:
-                        data = await client_ws.receive_bytes()
-                        b64_audio = base64.b64encode(data).decode('utf-8')
-                        event = {
-                            "type": "input_audio_buffer.append",
-                            "audio": b64_audio
-                        }
-                        await openai_ws.send(json.dumps(event))
-                except (WebSocketDisconnect, websockets.exceptions.ConnectionClosed):
-                    print("Client disconnected.")
-                except Exception as e:
-                    print(f"Client receive error: {e}")
-
-            async def receive_from_openai():
-                try:
-                    async for message in openai_ws:
-                        event = json.loads(message)
-                        event_type = event.get("type")
-                        
-                        if event_type == "response.audio.delta":
-                            b64_data = event.get("delta")
-                            if b64_data:
-                                await client_ws.send_json({"type": "audio", "data": b64_data})
-                        
-                        elif event_type == "response.audio_transcript.done":
-                            transcript = event.get("transcript")
-                            await client_ws.send_json({"type": "text", "data": transcript})
-
-                        elif event_type == "response.function_call_arguments.done":
-                            call_id = event.get("call_id")
-                            name = event.get("name")
-                            arguments = event.get("arguments")
-
-                            if name == "start_timer":
-                                try:
-                                    args = json.loads(arguments)
-                                    seconds = args.get("seconds", 0)
-                                    
-                                    # 타이머 시작 메시지
-                                    await client_ws.send_json({
-                                        "type": "text", 
-                                        "data": f"(타이머 {seconds}초 설정됨)"
-                                    })
-                                    
-                                    asyncio.create_task(timer_task(seconds, client_ws, openai_ws))
-
-                                    func_resp = {
-                                        "type": "conversation.item.create",
-                                        "item": {
-                                            "type": "function_call_output",
-                                            "call_id": call_id,
-                                            "output": json.dumps({"status": "timer_started"})
-                                        }
-                                    }
-                                    await openai_ws.send(json.dumps(func_resp))
-                                    
-                                except Exception as e:
-                                    print(f"Timer parsing error: {e}")
-
-                        elif event_type == "error":
-                            print(f"OpenAI Error: {event}")
-
-                except Exception as e:
-                    print(f"OpenAI receive error: {e}")
-
-            await asyncio.gather(receive_from_client(), receive_from_openai())
-
-    except Exception as e:
-        print(f"Connection error: {e}")
-        await client_ws.close()
+        # 레시피는 공유 상태 저장소에서 조회 (다른 워커에서 만든 레시피도 찾을 수 있음)
+        backend = get_state_backend()
+        recipe_id = client_ws.query_params.get("recipe_id")
+        if recipe_id:
+            recipe = await asyncio.to_thread(backend.get_recipe, recipe_id)
+        else:
+            recipe = await asyncio.to_thread(backend.get_latest_recipe)
+        session_id = await asyncio.to_thread(backend.open_session, recipe["recipe_id"] if recipe else None)
+
+        # 한쪽 연결이 끊기거나 유휴/최대 시간을 넘기면 타이머까지 모두 정리
+        await RealtimeSession(client_ws, recipe, session_id, audio_format).run()
+    finally:
+        await admission.release()
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8002)
+    # 상태는 STATE_BACKEND(기본 sqlite)로 공유되므로 워커를 여러 개 띄울 수 있음
+    workers = int(os.getenv("UVICORN_WORKERS", "1"))
+    if workers > 1 and os.getenv("STATE_BACKEND", "sqlite").lower() == "memory":
+        print("Warning: STATE_BACKEND=memory 는 워커끼리 상태를 공유하지 않습니다.")
+    if workers > 1:
+        # 실시간 세션은 연 워커에만 있으므로 다른 워커로 간 ?session= 참가는 4006 으로 거절됨
+        print("Warning: 여러 기기 참가(/ws?session=)는 session 값 기준 sticky 라우팅이 필요합니다.")
+    uvicorn.run("main:app", host="127.0.0.1", port=8002, workers=workers)
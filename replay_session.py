@@ -0,0 +1,269 @@
+"""
+녹화한 /ws 세션을 로컬에서 그대로 재현해 relay 성능을 측정하는 CLI
+
+    REALTIME_CAPTURE_DIR=captures python main.py        # 실제 세션 녹화
+    python replay_session.py captures/*.rtcap             # 원래 속도로 재현
+    python replay_session.py captures/*.rtcap --speed 4   # 4배속
+    python replay_session.py captures/*.rtcap --speed 0   # 대기 없이 최대 속도
+
+서버(main:app)는 별도 프로세스로 띄우고 OPENAI_REALTIME_URL 을 로컬 가짜 Realtime 서버로 바꿉니다.
+가짜 서버는 녹화된 OpenAI 이벤트를, 클라이언트는 녹화된 마이크/제어 프레임을 원래 시각에 맞춰 보내고
+세션마다 relay 지연(가짜 서버 송신 → 클라이언트 수신), 서버 CPU 시간, 메모리(RSS)를 출력합니다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+from utils.session_capture import (
+    CLIENT_AUDIO,
+    CLIENT_OUT,
+    CLIENT_TEXT,
+    KIND_NAMES,
+    UPSTREAM_IN,
+    UPSTREAM_OUT,
+    read_capture,
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 마지막 프레임 이후 남은 응답을 받기 위해 기다리는 시간 (초)
+DRAIN_SECONDS = 1.0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def relay_key(message: dict):
+    """가짜 서버가 보낸 이벤트와 클라이언트가 받은 메시지를 짝짓는 키"""
+    if message.get("type") == "response.audio.delta":
+        return "audio", message.get("delta")
+    if message.get("type") == "response.audio_transcript.done":
+        return "text", message.get("transcript")
+    if message.get("type") in ("audio", "text"):
+        return message["type"], message.get("data")
+    return None
+
+
+def process_stats(pid: int) -> dict:
+    """서버 프로세스 CPU 시간(초)과 메모리(MB). /proc 가 없는 환경에서는 빈 dict"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return {}
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {
+        "cpu": (int(fields[11]) + int(fields[12])) / ticks,
+        "rss_mb": int(status["VmRSS"].split()[0]) / 1024,
+        "peak_rss_mb": int(status["VmHWM"].split()[0]) / 1024,
+    }
+
+
+def summarize(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+class ReplaySession:
+    """capture 파일 하나의 재현 상태"""
+
+    def __init__(self, path: str, speed: float):
+        self.path = path
+        self.speed = speed
+        self.records = list(read_capture(path))
+        self.start = 0.0
+        self.sent_at: dict = {}
+        self.latencies: dict[str, list[float]] = {"audio": [], "text": []}
+        self.unmatched = 0
+        self.upstream_received = 0
+        self.upstream_done = asyncio.Event()
+
+    async def wait_until(self, offset: float):
+        if self.speed > 0:
+            delay = self.start + offset / self.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def audio_format(self) -> str:
+        """녹화 당시 협상된 업링크 형식 (서버가 보낸 audio_format 메시지, 없으면 pcm16)"""
+        for _, kind, payload in self.records:
+            if kind == CLIENT_OUT and b'"audio_format"' in payload:
+                message = json.loads(payload)
+                if message.get("type") == "audio_format":
+                    return message["format"]
+        return "pcm16"
+
+    def counts(self) -> dict:
+        counts: dict[str, int] = {}
+        for _, kind, _ in self.records:
+            counts[KIND_NAMES[kind]] = counts.get(KIND_NAMES[kind], 0) + 1
+        return counts
+
+
+async def fake_upstream(session_ref: list, connection):
+    """녹화된 OpenAI 이벤트를 원래 시각에 맞춰 보내는 가짜 Realtime 서버"""
+    session: ReplaySession = session_ref[0]
+
+    async def _drain():
+        async for _ in connection:
+            session.upstream_received += 1
+
+    drain = asyncio.create_task(_drain())
+    try:
+        for offset, kind, payload in session.records:
+            if kind != UPSTREAM_IN:
+                continue
+            await session.wait_until(offset)
+            key = relay_key(json.loads(payload))
+            if key:
+                session.sent_at.setdefault(key, time.perf_counter())
+            await connection.send(payload.decode("utf-8"))
+        session.upstream_done.set()
+        await drain
+    except websockets.exceptions.ConnectionClosed:
+        pass
+    finally:
+        session.upstream_done.set()
+        drain.cancel()
+
+
+async def run_client(session: ReplaySession, server_url: str):
+    async with websockets.connect(server_url, max_size=None) as ws:
+
+        async def _send():
+            for offset, kind, payload in session.records:
+                if kind not in (CLIENT_AUDIO, CLIENT_TEXT):
+                    continue
+                await session.wait_until(offset)
+                await ws.send(payload if kind == CLIENT_AUDIO else payload.decode("utf-8"))
+
+        async def _receive():
+            async for message in ws:
+                received = time.perf_counter()
+                key = relay_key(json.loads(message))
+                if key is None:
+                    continue
+                sent = session.sent_at.pop(key, None)
+                if sent is None:
+                    session.unmatched += 1
+                else:
+                    session.latencies[key[0]].append(received - sent)
+
+        receiver = asyncio.create_task(_receive())
+        await _send()
+        await session.upstream_done.wait()
+        await asyncio.sleep(DRAIN_SECONDS)
+        receiver.cancel()
+
+
+def start_server(port: int, upstream_port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_REALTIME_URL": f"ws://127.0.0.1:{upstream_port}/v1/realtime",
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY") or "replay",
+        "STATE_BACKEND": "memory",
+    })
+    env.pop("REALTIME_CAPTURE_DIR", None)  # 재현 세션을 다시 녹화하지 않음
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    for _ in range(200):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/check-api", timeout=1)
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("Server exited during startup.")
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Server did not start in time.")
+
+
+async def replay_all(paths: list[str], speed: float) -> list[dict]:
+    port, upstream_port = free_port(), free_port()
+    session_ref: list = [None]
+    reports = []
+    server = start_server(port, upstream_port)
+    try:
+        async with websockets.serve(lambda conn: fake_upstream(session_ref, conn), "127.0.0.1", upstream_port, max_size=None):
+            for path in paths:
+                session = ReplaySession(path, speed)
+                session_ref[0] = session
+                before = process_stats(server.pid)
+                session.start = time.perf_counter()
+                await run_client(session, f"ws://127.0.0.1:{port}/ws?audio={session.audio_format()}")
+                wall = time.perf_counter() - session.start - DRAIN_SECONDS
+                after = process_stats(server.pid)
+
+                original = session.records[-1][0] if session.records else 0.0
+                report = {
+                    "capture": os.path.basename(path),
+                    "frames": session.counts(),
+                    "audio_format": session.audio_format(),
+                    "original_seconds": round(original, 2),
+                    "replay_seconds": round(wall, 2),
+                    "relay_audio": summarize(session.latencies["audio"]),
+                    "relay_text": summarize(session.latencies["text"]),
+                    "unmatched": session.unmatched,
+                    "not_relayed": len(session.sent_at),
+                    "upstream_received": session.upstream_received,
+                    "upstream_expected": session.counts().get(KIND_NAMES[UPSTREAM_OUT], 0),
+                }
+                if before and after:
+                    report["server_cpu_seconds"] = round(after["cpu"] - before["cpu"], 3)
+                    report["server_rss_mb"] = round(after["rss_mb"], 1)
+                    report["server_rss_delta_mb"] = round(after["rss_mb"] - before["rss_mb"], 1)
+                    report["server_peak_rss_mb"] = round(after["peak_rss_mb"], 1)
+                reports.append(report)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured /ws sessions against a local fake Realtime upstream.")
+    parser.add_argument("captures", nargs="+", help="REALTIME_CAPTURE_DIR 에 저장된 .rtcap 파일")
+    parser.add_argument("--speed", type=float, default=1.0, help="재생 배속 (0 이면 대기 없이 최대 속도)")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+    args = parser.parse_args()
+
+    reports = asyncio.run(replay_all(args.captures, args.speed))
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+        return
+
+    for report in reports:
+        print(f"\n🎧 {report['capture']}  ({report['original_seconds']}s → {report['replay_seconds']}s)")
+        print(f"   frames: {report['frames']}")
+        print(f"   relay audio: {report['relay_audio']}")
+        print(f"   relay text : {report['relay_text']}")
+        print(f"   unmatched={report['unmatched']} not_relayed={report['not_relayed']} "
+              f"upstream_received={report['upstream_received']}/{report['upstream_expected']}")
+        if "server_cpu_seconds" in report:
+            print(f"   server cpu={report['server_cpu_seconds']}s rss={report['server_rss_mb']}MB "
+                  f"(Δ{report['server_rss_delta_mb']}MB, peak {report['server_peak_rss_mb']}MB)")
+
+
+if __name__ == "__main__":
+    main()
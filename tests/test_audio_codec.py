@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from utils.audio_codec import WEBM_OPUS, SUPPORTED_FORMATS, WebmOpusDemuxer, make_decoder
+
+pytestmark = pytest.mark.skipif(WEBM_OPUS not in SUPPORTED_FORMATS, reason="libsndfile without Opus")
+
+
+def _packets():
+    from benchmarks.bench_audio_decode import encode_packets, synthetic_speech
+
+    return encode_packets(synthetic_speech(2.0))
+
+
+def _decode(fmt, stream, chunk_bytes=333):
+    decoder = make_decoder(fmt)
+    pcm = [decoder.feed(stream[i:i + chunk_bytes]) for i in range(0, len(stream), chunk_bytes)]
+    pcm.append(decoder.flush())
+    assert decoder.errors == 0
+    return np.frombuffer(b"".join(pcm), dtype=np.int16)
+
+
+def test_webm_decodes_like_ogg():
+    from benchmarks.bench_audio_decode import ogg_stream, webm_stream
+
+    packets = _packets()
+    ogg = _decode("ogg_opus", ogg_stream(packets, 60))
+    webm = _decode(WEBM_OPUS, webm_stream(packets))
+    assert len(webm) == len(ogg)
+    assert np.abs(webm.astype(np.int32) - ogg).max() < 64
+
+
+@pytest.mark.parametrize("flags, lacing", [
+    (0x82, b"\x02" + bytes([5, 7])),            # Xiph
+    (0x84, b"\x02"),                             # 고정 크기
+    (0x86, b"\x02" + b"\x85" + b"\xc1"),         # EBML (5, 5 + 2)
+])
+def test_webm_block_lacing(flags, lacing):
+    from benchmarks.bench_audio_decode import ebml
+
+    frames = [b"\x08" * 5, b"\x08" * 7, b"\x08" * 9] if flags != 0x84 else [b"\x08" * 6] * 3
+    head = b"OpusHead\x01\x01" + bytes(9)
+    track = ebml(0xAE, ebml(0xD7, b"\x01") + ebml(0x86, b"A_OPUS") + ebml(0x63A2, head))
+    block = b"\x81\x00\x00" + bytes([flags]) + lacing + b"".join(frames)
+    stream = ebml(0x1A45DFA3) + ebml(0x18538067, unknown_size=True) + ebml(0x1654AE6B, track) \
+        + ebml(0x1F43B675, unknown_size=True) + ebml(0xA3, block)
+
+    pages = WebmOpusDemuxer().feed(stream)
+    assert [page.body for page in pages[2:]] == frames
+    # TOC 0x08: SILK 20ms 한 프레임
+    assert [page.granule for page in pages[2:]] == [960, 1920, 2880]
+
+
+def test_webm_without_codec_private_builds_opus_head():
+    from benchmarks.bench_audio_decode import ebml
+
+    track = ebml(0xAE, ebml(0xD7, b"\x01") + ebml(0x86, b"A_OPUS") + ebml(0x56AA, (6_500_000).to_bytes(4, "big")))
+    pages = WebmOpusDemuxer().feed(ebml(0x1A45DFA3) + ebml(0x18538067, unknown_size=True)
+                                   + ebml(0x1654AE6B, track) + ebml(0x1F43B675, unknown_size=True))
+    assert pages[0].body.startswith(b"OpusHead") and int.from_bytes(pages[0].body[10:12], "little") == 312
+
+
+def test_non_webm_rejected():
+    with pytest.raises(ValueError):
+        WebmOpusDemuxer().feed(b"OggS\x00\x02" + bytes(40))
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import pytest
+import websockets.exceptions  # receive_from_device 는 run() 이 먼저 import 해 둔 것을 씀
+
+from api.realtime_session import RealtimeSession, parse_control
+
+
+class FakeDevice:
+    """정해진 프레임을 차례로 주고, 보낸 텍스트를 모아 두는 기기 소켓"""
+
+    def __init__(self, frames):
+        self.frames = [{"type": "websocket.receive", "text": text} for text in frames]
+        self.frames.append({"type": "websocket.disconnect", "code": 1000})
+        self.sent = []
+
+    async def receive(self):
+        return self.frames.pop(0)
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, *args, **kwargs):
+        pass
+
+
+@pytest.mark.parametrize("text", ["not json", '"2"', "[1, 2]", '{"type": "repeat", "step": "two"}',
+                                  '{"type": "repeat", "step": 0}', '{"type": "repeat", "step": true}'])
+def test_parse_control_rejects_malformed(text):
+    with pytest.raises(ValueError):
+        parse_control(text)
+
+
+def test_parse_control_coerces_step():
+    assert parse_control('{"type": "repeat", "step": "2"}')["step"] == 2
+    assert parse_control('{"type": "repeat"}') == {"type": "repeat"}
+    assert parse_control('{"type": "mic", "action": "take"}') == {"type": "mic", "action": "take"}
+
+
+def test_malformed_control_frame_keeps_device(capsys):
+    malformed = ["not json", '"2"', '{"type": "repeat", "step": "two"}']
+    ws = FakeDevice(malformed)
+    session = RealtimeSession(ws, None, "test")
+
+    asyncio.run(session.receive_from_device(session.primary))
+
+    # 잘못된 프레임마다 error 로 답하고, 연결은 클라이언트가 끊을 때까지 유지
+    assert [message["type"] for message in ws.sent] == ["error"] * len(malformed)
+    out = capsys.readouterr().out
+    assert "Client receive error" not in out
+    assert "Client disconnected" in out
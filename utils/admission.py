@@ -0,0 +1,149 @@
+import asyncio
+import os
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Optional
+
+from utils.loop_monitor import get_loop_monitor
+
+# 프론트엔드가 구분해서 처리할 수 있는 종료 코드 (4000~4999 는 애플리케이션 정의 영역)
+CLOSE_FULL = 4001  # 동시 세션과 대기열이 모두 가득 참
+CLOSE_QUEUE_TIMEOUT = 4002  # 대기열에서 기다리다 시간 초과
+CLOSE_OVERLOADED = 4003  # CPU/이벤트 루프 지연이 높아 새 세션을 받지 않음
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.code = code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    실시간 세션 입장 제어.
+    - 동시 세션이 max_sessions 이하일 때만 입장, 넘으면 queue_size 만큼 순서대로 대기
+    - 이벤트 루프 지연이나 CPU 가 한도를 넘으면 새 세션은 바로 거절하고 대기열 입장도 멈춤
+      (이미 진행 중인 세션의 오디오 품질을 지키기 위해 새로 오는 쪽을 거절)
+    """
+
+    def __init__(self, max_sessions: int, queue_size: int, queue_timeout: float,
+                 max_loop_lag_ms: float, max_cpu_percent: float):
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.max_cpu_percent = max_cpu_percent
+        self.active = 0
+        self.waiters: deque[object] = deque()
+        self.counts = defaultdict(int)
+        self.wait_seconds: deque[float] = deque(maxlen=200)
+        self._cond: Optional[asyncio.Condition] = None
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_sessions=int(os.getenv("REALTIME_MAX_SESSIONS", "20")),
+            queue_size=int(os.getenv("REALTIME_QUEUE_SIZE", "10")),
+            queue_timeout=float(os.getenv("REALTIME_QUEUE_TIMEOUT", "30")),
+            max_loop_lag_ms=float(os.getenv("SHED_LOOP_LAG_MS", "200")),
+            max_cpu_percent=float(os.getenv("SHED_CPU_PERCENT", "90")),
+        )
+
+    def overload_reason(self) -> Optional[str]:
+        """부하 한도를 넘었으면 이유, 아니면 None (한도 0 은 검사 안 함)"""
+        monitor = get_loop_monitor()
+        lag = monitor.recent_lag_ms()
+        if self.max_loop_lag_ms and lag > self.max_loop_lag_ms:
+            return f"event loop lag {lag:.0f}ms"
+        if self.max_cpu_percent and monitor.cpu_percent > self.max_cpu_percent:
+            return f"cpu {monitor.cpu_percent:.0f}%"
+        return None
+
+    def _reject(self, code: int, reason: str, retry_after: float):
+        self.counts[f"rejected_{reason}"] += 1
+        raise AdmissionRejected(code, reason, retry_after)
+
+    async def acquire(self, on_position: Optional[Callable[[int], Awaitable[None]]] = None):
+        """
+        입장할 때까지 기다립니다. 대기 순번이 바뀔 때마다 on_position(순번, 1부터) 호출.
+        거절되면 AdmissionRejected (code 는 CLOSE_*).
+        """
+        get_loop_monitor().start()
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+
+        if self.overload_reason():
+            self._reject(CLOSE_OVERLOADED, "overloaded", 5)
+        if self.active < self.max_sessions and not self.waiters:
+            self.active += 1
+            self.counts["admitted"] += 1
+            return
+        if len(self.waiters) >= self.queue_size:
+            self._reject(CLOSE_FULL, "full", 30)
+
+        me = object()
+        self.waiters.append(me)
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        last_position = None
+        try:
+            while True:
+                position = self.waiters.index(me) + 1
+                if position == 1 and self.active < self.max_sessions and not self.overload_reason():
+                    break
+                if position != last_position and on_position:
+                    last_position = position
+                    await on_position(position)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._reject(CLOSE_QUEUE_TIMEOUT, "queue_timeout", 10)
+                async with self._cond:
+                    try:
+                        # 알림을 놓치거나 부하로 입장이 막혀 있을 때도 주기적으로 다시 확인
+                        await asyncio.wait_for(self._cond.wait(), min(remaining, 1.0))
+                    except asyncio.TimeoutError:
+                        pass
+            self.active += 1
+            self.counts["admitted"] += 1
+            self.counts["admitted_after_wait"] += 1
+            self.wait_seconds.append(time.monotonic() - started)
+        finally:
+            self.waiters.remove(me)
+            # 순번이 바뀌었으므로 다른 대기자에게 알림 (Condition 안에서만 notify 가능)
+            asyncio.get_running_loop().create_task(self._notify())
+
+    async def release(self):
+        self.active -= 1
+        await self._notify()
+
+    async def _notify(self):
+        if self._cond is None:
+            return
+        async with self._cond:
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        waits = sorted(self.wait_seconds)
+        return {
+            "active": self.active,
+            "waiting": len(self.waiters),
+            "max_sessions": self.max_sessions,
+            "queue_size": self.queue_size,
+            "overloaded": self.overload_reason(),
+            "counts": dict(self.counts),
+            "queue_wait_p95_seconds": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else 0.0,
+            "loop": get_loop_monitor().stats(),
+        }
+
+
+_admission: Optional[AdmissionController] = None
+
+
+def get_admission() -> AdmissionController:
+    """REALTIME_MAX_SESSIONS, REALTIME_QUEUE_SIZE, REALTIME_QUEUE_TIMEOUT, SHED_LOOP_LAG_MS, SHED_CPU_PERCENT"""
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController.from_env()
+    return _admission
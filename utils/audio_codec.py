@@ -0,0 +1,464 @@
+import io
+import logging
+import os
+import struct
+import time
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# /ws 업링크 오디오 형식 (?audio=webm_opus,ogg_opus,pcm16 처럼 선호 순서대로 요청)
+PCM16 = "pcm16"
+OGG_OPUS = "ogg_opus"
+# Chrome/Edge MediaRecorder 의 audio/webm;codecs=opus. Opus 패킷만 꺼내 Ogg 페이지로 다시 싸서 같은 디코더로 풀어냄
+WEBM_OPUS = "webm_opus"
+# OpenAI Realtime input_audio_format=pcm16 은 24kHz mono
+TARGET_RATE = 24000
+# 페이지가 이만큼(48kHz 기준 샘플) 모이면 한 번에 디코딩 (작을수록 지연이 짧고 호출 오버헤드가 큼)
+MIN_BATCH_SAMPLES = 48000 // 10
+# 묶음마다 디코더를 새로 시작하므로, 직전 묶음 끝을 이만큼 다시 디코딩해 상태를 맞춘 뒤 버림.
+# RFC 7845 권장값은 80ms 지만 유성음(SILK 장기 예측)은 더 길어야 원본 디코딩과 거의 같아짐 (benchmarks/bench_audio_decode.py 참고)
+PREROLL_SAMPLES = 48 * int(os.getenv("OPUS_PREROLL_MS", "200"))
+
+def _opus_supported() -> bool:
+    try:
+        import soundfile as sf
+
+        return "OPUS" in sf.available_subtypes("OGG")
+    except (ImportError, OSError):
+        return False
+
+
+SUPPORTED_FORMATS = (PCM16, OGG_OPUS, WEBM_OPUS) if _opus_supported() else (PCM16,)
+
+
+def negotiate_format(requested: Optional[str]) -> str:
+    """클라이언트가 요청한 형식 중 서버가 디코딩할 수 있는 첫 번째 (없으면 pcm16)"""
+    for fmt in (requested or "").split(","):
+        fmt = fmt.strip().lower()
+        if fmt in SUPPORTED_FORMATS:
+            return fmt
+    return PCM16
+
+
+# --- Ogg 페이지 ---
+def _crc_table() -> list[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def ogg_crc(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[((crc >> 24) & 0xFF) ^ byte]
+    return crc
+
+
+def rewrite_page(page: bytes, *, granule: Optional[int] = None, sequence: Optional[int] = None,
+                 flags: Optional[int] = None, body: Optional[bytes] = None) -> bytes:
+    """헤더 필드(granule, 페이지 번호, 플래그)나 본문을 바꾸고 CRC 를 다시 계산한 페이지"""
+    nseg = page[26]
+    header = bytearray(page[:27 + nseg])
+    if body is None:
+        body = page[27 + nseg:]
+    elif len(body) != len(page) - len(header):
+        raise ValueError("Page body size must not change.")
+    if flags is not None:
+        header[5] = flags
+    if granule is not None:
+        struct.pack_into("<q", header, 6, granule)
+    if sequence is not None:
+        struct.pack_into("<I", header, 18, sequence)
+    struct.pack_into("<I", header, 22, 0)
+    page = bytes(header) + body
+    return page[:22] + struct.pack("<I", ogg_crc(page)) + page[26:]
+
+
+def make_page(packets: list[bytes], granule: int, sequence: int, flags: int, serial: int = 0x5EED) -> bytes:
+    """완결된 패킷들로 된 Ogg 페이지"""
+    lacing, body = b"", b""
+    for packet in packets:
+        lacing += b"\xff" * (len(packet) // 255) + bytes([len(packet) % 255])
+        body += packet
+    header = b"OggS\x00" + bytes([flags]) + struct.pack("<qII", granule, serial, sequence) + bytes(4) + bytes([len(lacing)])
+    return rewrite_page(header + lacing + body)
+
+
+def opus_packet_samples(packet: bytes) -> int:
+    """Opus 패킷 길이 (48kHz 샘플, RFC 6716 TOC 바이트)"""
+    if not packet:
+        return 0
+    config, code = packet[0] >> 3, packet[0] & 3
+    if config < 12:
+        frame = (480, 960, 1920, 2880)[config % 4]
+    elif config < 16:
+        frame = (480, 960)[config % 2]
+    else:
+        frame = (120, 240, 480, 960)[config % 4]
+    frames = 1 if code == 0 else 2 if code < 3 else (packet[1] & 0x3F if len(packet) > 1 else 0)
+    return frame * frames
+
+
+class OggPage:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.flags = data[5]
+        self.granule = struct.unpack_from("<q", data, 6)[0]
+        nseg = data[26]
+        self.lacing = data[27:27 + nseg]
+        self.body = data[27 + nseg:]
+
+    @property
+    def packets_ended(self) -> int:
+        """이 페이지에서 끝나는 패킷 수 (255 가 아닌 lacing 값마다 패킷 하나가 끝남)"""
+        return sum(1 for value in self.lacing if value < 255)
+
+    @property
+    def ends_with_complete_packet(self) -> bool:
+        return bool(self.lacing) and self.lacing[-1] < 255
+
+
+class OggPageParser:
+    """임의 크기로 잘려 들어오는 바이트에서 완성된 Ogg 페이지만 꺼냄"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[OggPage]:
+        self.buffer += data
+        pages = []
+        while True:
+            start = self.buffer.find(b"OggS")
+            if start < 0:
+                # 다음 조각과 이어 붙을 수 있는 꼬리 3바이트만 남김
+                del self.buffer[:max(0, len(self.buffer) - 3)]
+                return pages
+            if start:
+                logger.warning(f"Skipping {start} bytes of non-Ogg data.")
+                del self.buffer[:start]
+            if len(self.buffer) < 27:
+                return pages
+            nseg = self.buffer[26]
+            if len(self.buffer) < 27 + nseg:
+                return pages
+            size = 27 + nseg + sum(self.buffer[27:27 + nseg])
+            if len(self.buffer) < size:
+                return pages
+            pages.append(OggPage(bytes(self.buffer[:size])))
+            del self.buffer[:size]
+
+
+# --- WebM(Matroska) → Ogg ---
+_EBML = 0x1A45DFA3
+# 크기를 보지 않고 자식 요소로 바로 들어가는 마스터 요소. 녹음 중인 스트림은 Segment/Cluster 크기가 "알 수 없음"
+_SEGMENT, _CLUSTER, _TRACKS, _TRACK_ENTRY, _BLOCK_GROUP, _AUDIO = 0x18538067, 0x1F43B675, 0x1654AE6B, 0xAE, 0xA0, 0xE1
+_MASTERS = {_SEGMENT, _CLUSTER, _TRACKS, _TRACK_ENTRY, _BLOCK_GROUP, _AUDIO}
+_TRACK_NUMBER, _CODEC_ID, _CODEC_PRIVATE, _CHANNELS, _CODEC_DELAY = 0xD7, 0x86, 0x63A2, 0x9F, 0x56AA
+_SIMPLE_BLOCK, _BLOCK = 0xA3, 0xA1
+_TRACK_FIELDS = {_TRACK_NUMBER, _CODEC_ID, _CODEC_PRIVATE, _CHANNELS, _CODEC_DELAY}
+_OPUS_TAGS = b"OpusTags" + struct.pack("<I", 4) + b"webm" + struct.pack("<I", 0)
+
+
+def _read_vint(data, pos: int, *, keep_marker: bool = False) -> Optional[tuple[int, int, int]]:
+    """EBML 가변 길이 정수 (값, 길이, 끝 위치). 바이트가 모자라면 None"""
+    if pos >= len(data):
+        return None
+    first = data[pos]
+    if not first:
+        raise ValueError("Invalid EBML variable-length integer.")
+    length = 9 - first.bit_length()
+    if pos + length > len(data):
+        return None
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    return value, length, pos + length
+
+
+class WebmOpusDemuxer:
+    """
+    임의 크기로 잘려 들어오는 WebM(Matroska) 바이트에서 Opus 패킷을 꺼내, OggOpusDecoder 가 받는 Ogg 페이지로 다시 쌉니다.
+    (OggPageParser 와 같은 feed 인터페이스)
+
+    - Segment/Cluster 처럼 필요한 마스터 요소는 크기를 보지 않고 자식으로 바로 들어감 (녹음 중에는 크기가 "알 수 없음")
+    - 첫 Cluster 전에 Opus 트랙(CodecID A_OPUS)을 골라 OpusHead(CodecPrivate, 없으면 채널 수/CodecDelay 로 만듦)와 OpusTags 헤더 페이지를 냄
+    - SimpleBlock/Block 의 프레임(lacing 포함)마다 Ogg 페이지 하나. granule 은 패킷 길이(TOC)를 누적한 48kHz 샘플 수
+    - 그 밖의 요소(Cues, Void, 다른 트랙 블록 등)는 버퍼에 쌓지 않고 건너뜀
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.started = False
+        self._skip = 0
+        self._tracks: list[dict] = []
+        self.track: Optional[dict] = None
+        self.track_number = 0
+        self.granule = 0
+        self.sequence = 0
+
+    def feed(self, data: bytes) -> list[OggPage]:
+        self.buffer += data
+        pages = []
+        while True:
+            if self._skip:
+                skipped = min(self._skip, len(self.buffer))
+                del self.buffer[:skipped]
+                self._skip -= skipped
+                if self._skip:
+                    return pages
+            element_id = _read_vint(self.buffer, 0, keep_marker=True)
+            if element_id is None:
+                return pages
+            size = _read_vint(self.buffer, element_id[2])
+            if size is None:
+                return pages
+            element_id, (size, size_length, start) = element_id[0], size
+            unknown = size == (1 << (7 * size_length)) - 1
+            if not self.started:
+                if element_id != _EBML:
+                    raise ValueError("Stream is not WebM.")
+                self.started = True
+            if element_id in _MASTERS:
+                del self.buffer[:start]
+                if element_id == _TRACK_ENTRY:
+                    self._tracks.append({})
+                elif element_id == _CLUSTER and self.track is None:
+                    pages += self._header_pages()
+                continue
+            if unknown:
+                raise ValueError(f"WebM element 0x{element_id:X} has unknown size.")
+            if element_id not in _TRACK_FIELDS and element_id not in (_SIMPLE_BLOCK, _BLOCK):
+                del self.buffer[:start]
+                self._skip = size
+                continue
+            if len(self.buffer) < start + size:
+                return pages
+            payload = bytes(self.buffer[start:start + size])
+            del self.buffer[:start + size]
+            if element_id in _TRACK_FIELDS:
+                if self._tracks:
+                    self._tracks[-1][element_id] = payload
+            elif self.track is not None:
+                pages += self._block_pages(payload)
+
+    def _header_pages(self) -> list[OggPage]:
+        self.track = next((track for track in self._tracks if track.get(_CODEC_ID, b"").rstrip(b"\0") == b"A_OPUS"), None)
+        if self.track is None:
+            raise ValueError("WebM stream has no Opus track.")
+        head = self.track.get(_CODEC_PRIVATE)
+        if not head or not head.startswith(b"OpusHead"):
+            channels = int.from_bytes(self.track.get(_CHANNELS, b"\x01"), "big")
+            # CodecDelay 는 ns 단위. 없으면 libopus 기본 pre-skip(6.5ms)
+            delay = int.from_bytes(self.track.get(_CODEC_DELAY, b""), "big")
+            pre_skip = delay * 48000 // 1_000_000_000 if delay else 312
+            head = b"OpusHead" + struct.pack("<BBHIhB", 1, channels, pre_skip, 48000, 0, 0)
+        self.track_number = int.from_bytes(self.track.get(_TRACK_NUMBER, b"\x01"), "big")
+        return [self._page([head], 0x02), self._page([_OPUS_TAGS], 0)]
+
+    def _block_pages(self, block: bytes) -> list[OggPage]:
+        track = _read_vint(block, 0)
+        if track is None or track[0] != self.track_number or len(block) < track[2] + 3:
+            return []
+        pos = track[2] + 3
+        try:
+            packets = self._frames(block, pos, (block[pos - 1] >> 1) & 3)
+        except (IndexError, TypeError, ValueError):
+            logger.warning("Skipping malformed WebM block.")
+            return []
+        pages = []
+        for packet in packets:
+            self.granule += opus_packet_samples(packet)
+            pages.append(self._page([packet], 0))
+        return pages
+
+    @staticmethod
+    def _frames(block: bytes, pos: int, lacing: int) -> list[bytes]:
+        """블록 본문의 프레임들 (0: lacing 없음, 1: Xiph, 2: 고정 크기, 3: EBML)"""
+        if lacing == 0:
+            return [block[pos:]]
+        count = block[pos] + 1
+        pos += 1
+        if lacing == 2:
+            size = (len(block) - pos) // count
+            return [block[pos + i * size:pos + (i + 1) * size] for i in range(count)]
+        sizes = []
+        if lacing == 1:
+            for _ in range(count - 1):
+                size = 0
+                while True:
+                    size += block[pos]
+                    pos += 1
+                    if block[pos - 1] < 255:
+                        break
+                sizes.append(size)
+        else:
+            size, length, pos = _read_vint(block, pos)
+            sizes.append(size)
+            for _ in range(count - 2):
+                delta, length, pos = _read_vint(block, pos)
+                size += delta - ((1 << (7 * length - 1)) - 1)
+                sizes.append(size)
+        sizes.append(len(block) - pos - sum(sizes))
+        frames = []
+        for size in sizes:
+            frames.append(block[pos:pos + size])
+            pos += size
+        return frames
+
+    def _page(self, packets: list[bytes], flags: int) -> OggPage:
+        page = OggPage(make_page(packets, self.granule, self.sequence, flags))
+        self.sequence += 1
+        return page
+
+
+class OggOpusDecoder:
+    """
+    Ogg/Opus 스트림을 받는 대로 24kHz mono PCM16 으로 디코딩합니다.
+
+    libsndfile 은 완성된 파일만 열 수 있으므로(끝 페이지에서 길이를 읽음), 헤더 페이지(OpusHead, OpusTags)를 보관해 두고
+    새로 모인 오디오 페이지 묶음마다 "헤더 + pre-roll + 묶음"으로 된 작은 스트림을 만들어 디코딩합니다.
+    - pre-roll: 직전 묶음 끝의 PREROLL_SAMPLES(기본 200ms, OPUS_PREROLL_MS) 분량 페이지. 새 디코더 상태를 맞추는 용도로만 디코딩하고 결과에서 버림
+    - granule 은 스트림 시작을 0 으로, 페이지 번호는 헤더 뒤로 이어지게 다시 씀
+    - 두 번째 묶음부터는 pre-skip 을 0 으로 (인코더 앞부분 지연은 첫 묶음에서만 버림)
+    - OpusHead 의 입력 샘플레이트를 24kHz 로 바꿔 libsndfile 이 바로 24kHz 로 디코딩 (리샘플링 없음)
+    묶음은 패킷이 완전히 끝난 페이지에서만 자르므로 페이지를 넘는 패킷도 깨지지 않습니다.
+    """
+
+    def __init__(self):
+        import soundfile as sf
+
+        self._sf = sf
+        self.parser = OggPageParser()
+        self.header_pages: list[OggPage] = []
+        self._header_packets = 0
+        self._first_head: Optional[bytes] = None
+        self._next_head: Optional[bytes] = None
+        self.pending: list[OggPage] = []
+        self.preroll: list[OggPage] = []
+        self.preroll_start = 0
+        self.base_granule = 0
+        self.batches = 0
+        self.bytes_in = 0
+        self.samples_out = 0
+        self.cpu_seconds = 0.0
+        self.errors = 0
+
+    def _add_header(self, page: OggPage):
+        if not self.header_pages:
+            if not page.body.startswith(b"OpusHead"):
+                raise ValueError("Stream is not Ogg/Opus.")
+            body = bytearray(page.body)
+            struct.pack_into("<I", body, 12, TARGET_RATE)  # input_sample_rate → 디코딩 샘플레이트
+            self._first_head = rewrite_page(page.data, body=bytes(body))
+            struct.pack_into("<H", body, 10, 0)  # pre_skip
+            self._next_head = rewrite_page(page.data, body=bytes(body))
+        self.header_pages.append(page)
+        self._header_packets += page.packets_ended
+
+    def feed(self, data: bytes) -> bytes:
+        """받은 바이트를 넣고 새로 디코딩된 PCM16 (아직 묶음이 덜 모였으면 b"")"""
+        started = time.thread_time()
+        self.bytes_in += len(data)
+        pcm = []
+        for page in self.parser.feed(data):
+            if self._header_packets < 2:
+                self._add_header(page)
+                continue
+            self.pending.append(page)
+            # 충분히 모였거나 스트림 끝(EOS) 페이지면 디코딩
+            if (page.ends_with_complete_packet and page.granule >= 0
+                    and (page.granule - self.base_granule >= MIN_BATCH_SAMPLES or page.flags & 0x04)):
+                pcm.append(self._decode_pending())
+        self.cpu_seconds += time.thread_time() - started
+        return b"".join(pcm)
+
+    def flush(self) -> bytes:
+        """남은 페이지를 디코딩 (스트림 끝)"""
+        last = next((page for page in reversed(self.pending) if page.granule >= 0), None)
+        if last is None or not self.pending[-1].ends_with_complete_packet:
+            self.pending.clear()
+            return b""
+        started = time.thread_time()
+        pcm = self._decode_pending()
+        self.cpu_seconds += time.thread_time() - started
+        return pcm
+
+    def _decode_pending(self) -> bytes:
+        pages, self.pending = self.pending, []
+        first = self.batches == 0
+        preroll_start = self.preroll_start if self.preroll else self.base_granule
+        stream = [self._first_head if first else self._next_head] + [page.data for page in self.header_pages[1:]]
+        sequence = len(stream)
+        for page in self.preroll + pages:
+            # 첫 묶음은 pre-skip 을 포함한 원래 granule 그대로
+            granule = page.granule if first or page.granule < 0 else page.granule - preroll_start
+            stream.append(rewrite_page(page.data, granule=granule, sequence=sequence, flags=page.flags & ~0x01))
+            sequence += 1
+        skip = (self.base_granule - preroll_start) * TARGET_RATE // 48000
+        self._keep_preroll(pages, preroll_start)
+        self.base_granule = pages[-1].granule
+        self.batches += 1
+
+        try:
+            audio, _ = self._sf.read(io.BytesIO(b"".join(stream)), dtype="int16", always_2d=True)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Failed to decode Opus batch: {e}")
+            return b""
+        audio = audio[skip:]
+        if audio.shape[1] > 1:
+            audio = audio.mean(axis=1).astype(np.int16)
+        else:
+            audio = audio[:, 0]
+        self.samples_out += len(audio)
+        return audio.tobytes()
+
+    def _keep_preroll(self, pages: list[OggPage], preroll_start: int):
+        """다음 묶음 앞에 붙일 페이지: 끝에서 PREROLL_SAMPLES 이상, 완결된 패킷 경계에서 시작"""
+        candidates = self.preroll + pages
+        starts = [preroll_start] + [page.granule for page in candidates[:-1]]
+        end = candidates[-1].granule
+        keep = len(candidates) - 1
+        while keep > 0 and (end - starts[keep] < PREROLL_SAMPLES or not candidates[keep - 1].ends_with_complete_packet):
+            keep -= 1
+        self.preroll = candidates[keep:]
+        self.preroll_start = starts[keep]
+
+    def stats(self) -> dict:
+        audio_seconds = self.samples_out / TARGET_RATE
+        return {
+            "bytes_in": self.bytes_in,
+            "audio_seconds": round(audio_seconds, 2),
+            "kbps": round(self.bytes_in * 8 / audio_seconds / 1000, 1) if audio_seconds else 0.0,
+            "batches": self.batches,
+            "errors": self.errors,
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "cpu_percent": round(self.cpu_seconds / audio_seconds * 100, 2) if audio_seconds else 0.0,
+        }
+
+
+class WebmOpusDecoder(OggOpusDecoder):
+    """WebM/Opus 스트림용. WebmOpusDemuxer 가 만든 Ogg 페이지를 OggOpusDecoder 와 같은 방식으로 디코딩"""
+
+    def __init__(self):
+        super().__init__()
+        self.parser = WebmOpusDemuxer()
+
+
+def make_decoder(fmt: str) -> Optional[OggOpusDecoder]:
+    """pcm16 이면 None (그대로 전달)"""
+    if fmt == OGG_OPUS:
+        return OggOpusDecoder()
+    if fmt == WEBM_OPUS:
+        return WebmOpusDecoder()
+    return None
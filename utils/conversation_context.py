@@ -0,0 +1,208 @@
+import json
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from utils.replay_buffer import find_step
+
+# 1 이면 오래된 대화 항목을 요약 메모로 바꾸고 삭제해서 턴당 업스트림 컨텍스트 크기를 일정하게 유지 (0 이면 끔)
+CONTEXT_MANAGEMENT = os.getenv("CONTEXT_MANAGEMENT", "1") == "1"
+# 고정 항목을 뺀 대화 항목이 이 수를 넘거나, 직전 응답의 입력 토큰이 CONTEXT_MAX_TOKENS 를 넘으면 정리
+CONTEXT_MAX_ITEMS = int(os.getenv("CONTEXT_MAX_ITEMS", "40"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "8000"))
+# 정리 후 남기는 최근 항목 수. 매 턴이 아니라 한 번에 여러 개를 지우므로 정리 사이에는 대화 앞부분이 그대로 유지됨 (입력 캐시)
+CONTEXT_KEEP_ITEMS = int(os.getenv("CONTEXT_KEEP_ITEMS", "16"))
+# 요약 메모에 남기는 단계당 글자 수, 사용자 발화 수, 타이머 수
+NOTE_STEP_CHARS = 120
+NOTE_USER_TURNS = 5
+NOTE_USER_CHARS = 80
+NOTE_TIMERS = 10
+
+# 서버가 직접 만드는 항목의 ID (Realtime API 는 클라이언트가 정한 item.id 를 그대로 씀). ctx_ 로 시작하면 지우지 않음
+PINNED_PREFIX = "ctx_"
+RECIPE_ITEM_ID = "ctx_recipe"
+RESTORE_ITEM_ID = "ctx_restore"
+NOTE_ITEM_PREFIX = "ctx_note_"
+# timer_task 가 넣는 알림 (요약에서는 타이머 기록으로만 남김)
+TIMER_DONE_TEXT = "타이머가 종료되었습니다"
+
+
+@dataclass
+class ContextItem:
+    item_id: str
+    kind: str  # message | function_call | function_call_output
+    role: Optional[str] = None
+    call_id: Optional[str] = None
+    name: Optional[str] = None
+    text: str = ""
+
+    @property
+    def pinned(self) -> bool:
+        return self.item_id.startswith(PINNED_PREFIX)
+
+
+def _item_text(item: dict) -> str:
+    if item.get("type") == "function_call":
+        return item.get("arguments") or ""
+    if item.get("type") == "function_call_output":
+        return item.get("output") or ""
+    return " ".join(
+        part.get("text") or part.get("transcript") or ""
+        for part in item.get("content") or []
+    ).strip()
+
+
+def _clip(text: str, limit: int) -> str:
+    """limit 글자 안에서 마지막 문장 끝까지 (문장 끝이 없으면 잘라서 … 표시)"""
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    end = max(text.rfind(mark, 0, limit) for mark in (". ", "? ", "! "))
+    return text[:end + 1] if end > limit // 3 else text[:limit] + "…"
+
+
+class ConversationContext:
+    """
+    업스트림(OpenAI Realtime) 대화에 들어 있는 항목을 순서대로 추적합니다.
+    conversation.item.created / deleted 이벤트로 목록을 맞추고, 자막이 도착하면 항목의 텍스트를 채웁니다.
+
+    항목이 쌓이면 plan_compaction() 이 지울 항목과 새 요약 메모를 돌려줍니다.
+    - 레시피 프롬프트, 재연결 요약, 요약 메모(ID 가 ctx_ 로 시작)는 지우지 않음
+    - 지운 항목 중 어시스턴트 응답은 단계별 한 줄로, 사용자 발화는 최근 몇 개만, 타이머는 초 단위로 메모에 남김
+    - function_call 과 그 출력은 함께 지움
+    재연결하면 대화가 새로 시작되므로 reset() 으로 항목만 비우고, 요약한 내용은 재연결 요약에 이어 붙입니다.
+    """
+
+    def __init__(self, max_items: int = CONTEXT_MAX_ITEMS, keep_items: int = CONTEXT_KEEP_ITEMS,
+                 max_tokens: int = CONTEXT_MAX_TOKENS):
+        self.max_items = max_items
+        self.keep_items = min(keep_items, max_items)
+        self.max_tokens = max_tokens
+        self.items: dict[str, ContextItem] = {}  # 삽입 순서 = 대화 순서
+        self.steps: dict[int, str] = {}
+        self.user_turns: deque[str] = deque(maxlen=NOTE_USER_TURNS)
+        self.timers: deque[int] = deque(maxlen=NOTE_TIMERS)
+        self.note_id: Optional[str] = None
+        self.notes = 0
+        self.last_input_tokens: Optional[int] = None
+        self.peak_input_tokens = 0
+        self.compactions = 0
+        self.deleted = 0
+
+    # --- 업스트림 이벤트 ---
+    def item_created(self, item: dict):
+        item_id = item.get("id")
+        if not item_id:
+            return
+        self.items[item_id] = ContextItem(
+            item_id=item_id,
+            kind=item.get("type", "message"),
+            role=item.get("role"),
+            call_id=item.get("call_id"),
+            name=item.get("name"),
+            text=_item_text(item),
+        )
+
+    def item_deleted(self, item_id: str):
+        self.items.pop(item_id, None)
+
+    def set_transcript(self, item_id: Optional[str], transcript: Optional[str]):
+        """오디오 항목은 생성 시점에 자막이 없으므로 자막 이벤트가 오면 채움"""
+        item = self.items.get(item_id) if item_id else None
+        if item and transcript:
+            item.text = transcript
+
+    def observe_usage(self, usage: dict):
+        """response.done 의 usage.input_tokens = 그 응답을 만들 때 모델이 읽은 컨텍스트 크기"""
+        tokens = usage.get("input_tokens")
+        if tokens is not None:
+            self.last_input_tokens = tokens
+            self.peak_input_tokens = max(self.peak_input_tokens, tokens)
+
+    def reset(self):
+        self.items.clear()
+        self.note_id = None
+        self.last_input_tokens = None
+
+    # --- 정리 ---
+    @property
+    def unpinned(self) -> list[ContextItem]:
+        return [item for item in self.items.values() if not item.pinned]
+
+    def needs_compaction(self) -> bool:
+        count = len(self.unpinned)
+        if count > self.max_items:
+            return True
+        return bool(self.last_input_tokens and self.last_input_tokens > self.max_tokens and count > self.keep_items)
+
+    def plan_compaction(self) -> tuple[list[str], Optional[str]]:
+        """
+        최근 keep_items 개만 남기고 앞쪽 항목을 요약에 합친 뒤 (지울 항목 ID 목록, 새 요약 메모 텍스트) 를 반환.
+        목록에서는 바로 빼므로 deleted 이벤트가 늦게 와도 다시 정리하지 않음
+        """
+        items = self.unpinned
+        cut = len(items) - self.keep_items
+        if cut <= 0:
+            return [], None
+        # 남는 쪽 맨 앞이 지워질 function_call 의 출력이면 함께 지움
+        cut_calls = {item.call_id for item in items[:cut] if item.kind == "function_call"}
+        while cut < len(items) and items[cut].kind == "function_call_output" and items[cut].call_id in cut_calls:
+            cut += 1
+
+        removed = items[:cut]
+        for item in removed:
+            self._fold(item)
+            self.items.pop(item.item_id, None)
+        self.compactions += 1
+        self.deleted += len(removed)
+        return [item.item_id for item in removed], self.note_text()
+
+    def next_note_id(self) -> str:
+        self.notes += 1
+        return f"{NOTE_ITEM_PREFIX}{self.notes}"
+
+    def _fold(self, item: ContextItem):
+        if item.kind == "function_call":
+            if item.name == "start_timer":
+                try:
+                    self.timers.append(int(json.loads(item.text).get("seconds", 0)))
+                except (ValueError, TypeError, AttributeError):
+                    pass
+            return
+        if item.kind != "message" or not item.text:
+            return
+        if item.role == "assistant":
+            step = find_step(item.text)
+            # 같은 단계를 여러 번 안내했으면 처음 안내한 내용을 남김
+            if step is not None and step not in self.steps:
+                self.steps[step] = _clip(item.text, NOTE_STEP_CHARS)
+        elif item.role == "user" and TIMER_DONE_TEXT not in item.text:
+            self.user_turns.append(_clip(item.text, NOTE_USER_CHARS))
+
+    def note_lines(self) -> list[str]:
+        """요약한 내용 (재연결 요약에도 그대로 붙임)"""
+        lines = [f"- {step}번째 단계 안내: {self.steps[step]}" for step in sorted(self.steps)]
+        if self.timers:
+            lines.append(f"- 앞서 실행한 타이머: {', '.join(f'{seconds}초' for seconds in self.timers)}")
+        if self.user_turns:
+            lines.append("- 앞서 사용자가 한 말: " + " / ".join(f'"{text}"' for text in self.user_turns))
+        return lines
+
+    def note_text(self) -> str:
+        return "\n".join([
+            "[지난 대화 요약] 대화가 길어져 앞부분을 요약했습니다. 아래 단계는 이미 안내했으니 "
+            "사용자가 요청하지 않으면 다시 설명하지 말고, 최근 대화의 단계에서 이어가세요.",
+            *self.note_lines(),
+        ])
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self.items),
+            "unpinned_items": len(self.unpinned),
+            "last_input_tokens": self.last_input_tokens,
+            "peak_input_tokens": self.peak_input_tokens,
+            "compactions": self.compactions,
+            "deleted_items": self.deleted,
+            "summarized_steps": len(self.steps),
+        }
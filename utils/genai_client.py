@@ -0,0 +1,61 @@
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+# google.generativeai 는 import 만 해도 1초 가까이 걸리므로, 실제로 호출할 때 처음 한 번만 불러온다.
+_lock = threading.Lock()
+_genai = None
+_env_loaded = False
+_models: dict = {}
+
+
+def get_google_ai_key() -> Optional[str]:
+    """.env 를 (한 번만) 읽고 GOOGLE_AI_KEY 를 반환"""
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+    return os.getenv("GOOGLE_AI_KEY")
+
+
+def get_genai() -> "genai":
+    """configure 까지 끝난 google.generativeai 모듈 (프로세스당 한 번만 설정)"""
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+
+                api_key = get_google_ai_key()
+                if not api_key:
+                    logger.error("GOOGLE_AI_KEY environment variable not found.")
+                else:
+                    logger.info("GOOGLE_AI_KEY key is set.")
+                genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
+
+
+def get_model(model_name: str, system_instruction: Optional[str] = None) -> "genai.GenerativeModel":
+    """
+    모델 이름(+ 시스템 지시문)별로 GenerativeModel 을 한 번만 만들어 재사용.
+    고정 지시문은 system_instruction 으로 묶어 두고 호출마다 바뀌는 부분만 보냅니다 (prompt_cache 참고).
+    """
+    key = (model_name, system_instruction)
+    model = _models.get(key)
+    if model is None:
+        genai = get_genai()
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+                _models[key] = model
+    return model
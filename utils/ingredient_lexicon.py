@@ -0,0 +1,203 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+# IngredientCategory 필드명 → 재료명/동의어 목록
+# 같은 글자가 여러 단어에 걸리면 가장 긴 단어가 이긴다 (예: "고추장" > "고추")
+LEXICON: Dict[str, List[str]] = {
+    "fruits_veggies": [
+        "양파", "적양파", "대파", "쪽파", "실파", "파", "마늘", "다진마늘", "통마늘", "생강", "다진생강",
+        "고추", "청양고추", "홍고추", "풋고추", "꽈리고추", "감자", "고구마", "당근", "애호박", "호박",
+        "단호박", "주키니", "가지", "오이", "양배추", "배추", "알배추", "무", "콩나물", "숙주", "숙주나물",
+        "시금치", "상추", "깻잎", "부추", "미나리", "브로콜리", "파프리카", "피망", "토마토", "방울토마토",
+        "버섯", "표고버섯", "새송이버섯", "팽이버섯", "느타리버섯", "양송이버섯", "목이버섯", "양상추",
+        "청경채", "셀러리", "연근", "우엉", "아스파라거스", "옥수수", "콘", "김치", "신김치", "배추김치",
+        "묵은지", "깍두기", "사과", "배", "레몬", "라임", "바나나", "딸기", "아보카도", "고수", "바질",
+        "파슬리", "로즈마리", "쑥갓", "열무", "비트", "두부", "순두부", "연두부", "유부", "콩", "완두콩",
+        "냉동야채", "양송이", "마", "도라지", "고사리", "취나물", "시래기", "무순", "케일", "샐러드채소",
+    ],
+    "meat": [
+        "돼지고기", "돼지", "앞다리살", "뒷다리살", "목살", "삼겹살", "대패삼겹살", "항정살", "등갈비",
+        "돼지등뼈", "갈비", "소고기", "쇠고기", "한우", "차돌박이", "양지", "사태", "우둔", "홍두깨살",
+        "등심", "안심", "채끝", "불고기용", "다짐육", "다진고기", "다진돼지고기", "다진소고기", "닭고기",
+        "닭", "닭가슴살", "닭다리", "닭다리살", "닭안심", "닭봉", "닭날개", "오리고기", "훈제오리",
+        "베이컨", "햄", "스팸", "소시지", "비엔나", "비엔나소시지", "런천미트", "양고기", "차슈",
+    ],
+    "rice_noodles": [
+        "쌀", "밥", "찬밥", "공기밥", "찹쌀", "현미", "즉석밥", "햇반", "면", "국수", "소면", "중면",
+        "칼국수면", "칼국수", "우동면", "우동", "우동사리", "라면", "라면사리", "사리", "당면", "쫄면",
+        "냉면", "파스타", "스파게티", "펜네", "마카로니", "링귀니", "쌀국수", "떡", "떡국떡", "떡볶이떡",
+        "가래떡", "조랭이떡", "만두", "밀가루", "부침가루", "튀김가루", "빵가루", "전분", "감자전분",
+        "옥수수전분", "녹말", "식빵", "빵", "또띠아", "누룽지", "오트밀",
+    ],
+    "seafood": [
+        "새우", "대하", "칵테일새우", "건새우", "오징어", "한치", "낙지", "쭈꾸미", "주꾸미", "문어",
+        "조개", "바지락", "홍합", "모시조개", "가리비", "굴", "전복", "게", "꽃게", "대게", "게맛살",
+        "맛살", "멸치", "국물멸치", "잔멸치", "고등어", "갈치", "연어", "참치", "참치캔", "동태", "명태",
+        "북어", "황태", "코다리", "대구", "어묵", "오뎅", "김", "조미김", "김밥김", "미역", "다시마",
+        "톳", "파래", "매생이", "멍게", "해삼", "날치알", "명란", "명란젓", "장어", "꽁치", "삼치",
+    ],
+    "sauce": [
+        "간장", "진간장", "국간장", "양조간장", "조선간장", "된장", "고추장", "쌈장", "고춧가루", "소금",
+        "천일염", "꽃소금", "설탕", "흑설탕", "백설탕", "올리고당", "물엿", "조청", "꿀", "식초",
+        "사과식초", "참기름", "들기름", "식용유", "올리브유", "올리브오일", "카놀라유", "포도씨유",
+        "후추", "후춧가루", "통후추", "맛술", "미림", "청주", "소주", "와인", "화이트와인", "레드와인",
+        "굴소스", "케첩", "케찹", "마요네즈", "머스타드", "돈가스소스", "스테이크소스", "칠리소스",
+        "스리라차", "데리야끼소스", "액젓", "멸치액젓", "까나리액젓", "새우젓", "다시다", "치킨스톡",
+        "스톡", "육수", "멸치육수", "사골육수", "다시마육수", "미원", "깨", "통깨", "참깨", "깨소금",
+        "카레가루", "카레", "춘장", "두반장", "토마토소스", "파스타소스", "토마토페이스트", "연겨자",
+        "겨자", "와사비", "쯔유", "매실청", "매실액", "핫소스", "바베큐소스", "고추기름",
+        "고추냉이", "MSG", "맛간장", "우스터소스",
+    ],
+    "dairy": [
+        "우유", "생크림", "휘핑크림", "버터", "무염버터", "치즈", "모짜렐라치즈", "모차렐라치즈",
+        "체다치즈", "파마산치즈", "슬라이스치즈", "크림치즈", "피자치즈", "요거트", "플레인요거트",
+        "연유", "계란", "달걀", "메추리알", "노른자", "흰자", "계란노른자", "계란흰자",
+    ],
+}
+
+# 장보기 목록에 넣지 않는 재료
+IGNORED = {"물", "찬물", "뜨거운물", "끓는물", "얼음", "얼음물", "쌀뜨물"}
+
+_HANGUL_QTY = r"(한|두|세|네|반)(개|컵|큰술|작은술|스푼|숟가락|줌|모|쪽|대|장|봉|봉지|팩|공기|꼬집|T|t)"
+# 수량이 시작되는 토큰 (숫자, 분수, 한글 수사+단위, 정성적 표현)
+_QTY_START_RE = re.compile(
+    r"^(약|[0-9½⅓⅔¼¾]|(한|두|세|네|반)$"
+    rf"|{_HANGUL_QTY}"
+    r"|약간|적당량|적당히|조금|소량|넉넉히|기호에)"
+)
+# 재료명 앞에 오는 수량 ("2큰술 간장", "약 200g 돼지고기")
+_LEADING_QTY_RE = re.compile(rf"^(약$|[0-9½⅓⅔¼¾]|{_HANGUL_QTY}$)")
+# "간장2큰술" / "간장두스푼" 처럼 붙여 쓴 수량 앞에서 분리.
+# 한글 수사는 재료명 끝에 단위가 올 때만, 앞에 두 글자 이상 있을 때만 (예: "두반장" 은 그대로)
+_SPLIT_DIGIT_RE = re.compile(
+    rf"(?<=[가-힣a-zA-Z])(?=[0-9½⅓⅔¼¾])|(?<=[가-힣]{{2}})(?={_HANGUL_QTY}(?![가-힣]))"
+)
+_PAREN_RE = re.compile(r"\([^)]*\)")
+_SECTION_RE = re.compile(r"\[재료\](.*?)(?=\[조리 단계\]|\Z)", re.S)
+_COMMA_SPLIT_RE = re.compile(r",(?![^(]*\))")
+
+
+class _TrieNode:
+    __slots__ = ("children", "category", "term")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.category: Optional[str] = None
+        self.term: Optional[str] = None
+
+
+def normalize_name(name: str) -> str:
+    """괄호 설명과 공백을 제거한 비교용 재료명"""
+    name = unicodedata.normalize("NFC", name)
+    return re.sub(r"\s+", "", _PAREN_RE.sub("", name)).strip("-·•*")
+
+
+class IngredientLexicon:
+    """
+    재료명 사전을 글자 단위 trie 로 컴파일해 두고,
+    재료명 안에서 가장 긴 사전 단어를 찾아 카테고리를 돌려줍니다.
+    """
+
+    def __init__(self, lexicon: Dict[str, List[str]] = LEXICON):
+        self._root = _TrieNode()
+        self._exact: Dict[str, str] = {}
+        for category, terms in lexicon.items():
+            for term in terms:
+                key = normalize_name(term)
+                self._exact[key] = category
+                # 한 글자 단어("무", "파", "김" 등)는 오탐이 많아 완전 일치로만 인정
+                if len(key) > 1:
+                    self._insert(key, category)
+
+    def _insert(self, term: str, category: str):
+        node = self._root
+        for ch in term:
+            node = node.children.setdefault(ch, _TrieNode())
+        node.category = category
+        node.term = term
+
+    def lookup(self, name: str) -> Optional[Tuple[str, str]]:
+        """(카테고리 필드명, 매칭된 사전 단어) 또는 None"""
+        key = normalize_name(name)
+        if key in self._exact:
+            return self._exact[key], key
+
+        best: Optional[Tuple[str, str]] = None
+        for start in range(len(key)):
+            node = self._root
+            for ch in key[start:]:
+                node = node.children.get(ch)
+                if node is None:
+                    break
+                # 길이가 같으면 뒤쪽 단어(한국어 명사구의 머리말)를 우선
+                if node.term and (best is None or len(node.term) >= len(best[1])):
+                    best = (node.category, node.term)
+        return best
+
+
+def split_quantity(item: str) -> Tuple[str, str]:
+    """'돼지고기 200g' / '2큰술 간장' → (재료명, 수량), 수량이 없으면 '적당량'"""
+    tokens = _SPLIT_DIGIT_RE.sub(" ", item.strip()).split()
+    lead = 0
+    while lead < len(tokens) - 1 and _LEADING_QTY_RE.match(tokens[lead]):
+        lead += 1
+    if lead:
+        return " ".join(tokens[lead:]), " ".join(tokens[:lead])
+    for i, token in enumerate(tokens):
+        if i > 0 and _QTY_START_RE.match(token):
+            return " ".join(tokens[:i]), " ".join(tokens[i:])
+    return " ".join(tokens), "적당량"
+
+
+def extract_ingredient_lines(recipe_text: str) -> List[str]:
+    """레시피 텍스트의 [재료] 섹션을 재료 하나씩의 문자열 목록으로 분리"""
+    match = _SECTION_RE.search(recipe_text or "")
+    if not match:
+        return []
+
+    items = []
+    for line in match.group(1).splitlines():
+        line = line.strip().lstrip("-·•*").strip()
+        if not line or line.startswith("..."):
+            continue
+        # "양념: 간장 2큰술, 설탕 1큰술" 같은 소제목 제거
+        if ":" in line:
+            line = line.split(":", 1)[1]
+        for part in _COMMA_SPLIT_RE.split(line):
+            part = part.strip().rstrip(".")
+            if part:
+                items.append(part)
+    return items
+
+
+_default_lexicon: Optional[IngredientLexicon] = None
+
+
+def get_lexicon() -> IngredientLexicon:
+    global _default_lexicon
+    if _default_lexicon is None:
+        _default_lexicon = IngredientLexicon()
+    return _default_lexicon
+
+
+def categorize_recipe_ingredients(recipe_text: str) -> Tuple[Dict[str, List[dict]], List[dict]]:
+    """
+    레시피의 [재료] 섹션을 카테고리별 {"name", "quantity"} 목록으로 분류합니다.
+    반환값: (카테고리 필드명 → 재료 목록, 사전에 없는 재료 목록)
+    """
+    lexicon = get_lexicon()
+    categorized: Dict[str, List[dict]] = {category: [] for category in LEXICON}
+    unknown: List[dict] = []
+
+    for item in extract_ingredient_lines(recipe_text):
+        name, quantity = split_quantity(item)
+        if not name or normalize_name(name) in IGNORED:
+            continue
+        entry = {"name": name, "quantity": quantity}
+        hit = lexicon.lookup(name)
+        if hit:
+            categorized[hit[0]].append(entry)
+        else:
+            unknown.append(entry)
+    return categorized, unknown
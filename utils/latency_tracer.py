@@ -0,0 +1,181 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Optional
+
+# 턴별 기록을 JSONL 로 내보낼 파일 (설정하지 않으면 메모리 요약만 유지)
+REALTIME_TRACE_FILE = os.getenv("REALTIME_TRACE_FILE")
+# 세션 요약(백분위)에 쓰는 지표별 최근 턴 수. 긴 조리 세션에서도 메모리가 늘지 않도록 제한
+TRACE_MAX_SAMPLES = int(os.getenv("TRACE_MAX_SAMPLES", "500"))
+
+# 지표 이름 → (시작 mark, 끝 mark)
+METRICS = {
+    "speech_to_response": ("speech_stopped", "response_created"),
+    "speech_to_first_audio": ("speech_stopped", "first_audio"),
+    "speech_to_tool_call": ("speech_stopped", "tool_call"),
+    "tool_handling": ("tool_call", "tool_output_sent"),
+    "timer_roundtrip": ("timer_done", "first_audio"),
+    "replay_to_first_audio": ("repeat_request", "first_audio"),
+}
+
+class TraceWriter:
+    """
+    기록을 큐에 넣고 백그라운드 스레드가 모아서 파일에 씁니다.
+    턴마다 이벤트 루프에서 파일을 열고 쓰지 않도록, 쌓인 줄은 파일별로 한 번에 씀
+    """
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._start_lock = threading.Lock()
+        self._file_lock = threading.Lock()  # 스레드와 종료 시 flush 가 함께 쓰지 않도록
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, path: str, line: str):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        self._queue.put((path, line))
+
+    def _run(self):
+        while True:
+            self._write_batch([self._queue.get()])
+
+    def _write_batch(self, batch: list):
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        lines = defaultdict(list)
+        for path, line in batch:
+            lines[path].append(line)
+        for path, chunk in lines.items():
+            try:
+                with self._file_lock:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write("".join(chunk))
+            except OSError as e:
+                print(f"⚠️ [Latency] 기록 실패 ({path}): {e}")
+
+    def flush(self):
+        """아직 쓰지 않은 기록을 지금 씀 (프로세스 종료 시)"""
+        self._write_batch([])
+
+
+_writer = TraceWriter()
+
+
+def export_trace(record: dict, path: Optional[str] = None):
+    path = path or REALTIME_TRACE_FILE
+    if not path:
+        return
+    _writer.write(path, json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": round(ordered[len(ordered) // 2], 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        "max": round(ordered[-1], 1),
+    }
+
+
+class TurnTrace:
+    """
+    한 턴(사용자 발화 종료, 타이머 종료, 반복 요청 중 하나로 시작)의 이벤트 시각.
+    같은 mark 는 처음 한 번만 기록합니다 (first audio 등).
+    """
+
+    def __init__(self, index: int, kind: str, start_mark: str):
+        self.index = index
+        self.kind = kind
+        self.started = time.monotonic()
+        self.wall_started = time.time()
+        self.marks: dict[str, float] = {start_mark: 0.0}
+        self.usage: dict[str, int] = {}
+
+    def mark(self, name: str):
+        if name not in self.marks:
+            self.marks[name] = (time.monotonic() - self.started) * 1000
+
+    def record_usage(self, usage: dict):
+        """턴의 첫 응답이 읽은 입력 토큰 수 (세션이 길어질수록 컨텍스트가 얼마나 커지는지)"""
+        if self.usage or usage.get("input_tokens") is None:
+            return
+        self.usage = {
+            "input_tokens": usage["input_tokens"],
+            "cached_tokens": (usage.get("input_token_details") or {}).get("cached_tokens", 0),
+        }
+
+    def metrics(self) -> dict[str, float]:
+        result = {}
+        for metric, (start, end) in METRICS.items():
+            if start in self.marks and end in self.marks:
+                result[metric] = round(self.marks[end] - self.marks[start], 1)
+        return result
+
+
+class LatencyTracer:
+    """세션 하나의 턴별 지연 시간 기록과 지표별 백분위 요약"""
+
+    def __init__(self, session_id: str, export_path: Optional[str] = None):
+        self.session_id = session_id
+        self.export_path = export_path or REALTIME_TRACE_FILE
+        self.started = time.monotonic()
+        self.current: Optional[TurnTrace] = None
+        self.turns = 0
+        self.samples: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=TRACE_MAX_SAMPLES))
+
+    def start_turn(self, kind: str, start_mark: str):
+        self.finish_turn()
+        self.turns += 1
+        self.current = TurnTrace(self.turns, kind, start_mark)
+
+    def mark(self, name: str):
+        if self.current:
+            self.current.mark(name)
+
+    def record_usage(self, usage: dict):
+        if self.current:
+            self.current.record_usage(usage)
+
+    def finish_turn(self):
+        turn, self.current = self.current, None
+        if not turn:
+            return
+        metrics = turn.metrics()
+        for name, value in metrics.items():
+            self.samples[name].append(value)
+        if self.export_path:
+            export_trace({
+                "record": "turn",
+                "session_id": self.session_id,
+                "turn": turn.index,
+                "kind": turn.kind,
+                "started_at": round(turn.wall_started, 3),
+                "age_s": round(turn.started - self.started, 1),
+                "marks_ms": {name: round(value, 1) for name, value in turn.marks.items()},
+                "metrics_ms": metrics,
+                **turn.usage,
+            }, self.export_path)
+
+    def summary(self) -> dict:
+        return {name: percentiles(values) for name, values in self.samples.items() if values}
+
+    def close(self):
+        self.finish_turn()
+        if self.export_path:
+            export_trace({
+                "record": "session",
+                "session_id": self.session_id,
+                "turns": self.turns,
+                "summary_ms": self.summary(),
+            }, self.export_path)
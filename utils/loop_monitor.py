@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Optional
+
+from utils.profiler import stack_lines, stack_origin
+
+logger = logging.getLogger(__name__)
+
+# 측정 간격(초)과 최근 평균에 쓰는 샘플 수 (0.1초 × 10 = 최근 1초)
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+RECENT_SAMPLES = 10
+# 루프가 이 시간(ms) 넘게 멈추면 멈춘 동안의 루프 스레드 스택을 기록 (0 이면 감시 스레드 없음)
+LOOP_STALL_MS = float(os.getenv("LOOP_STALL_MS", "100"))
+# 감시 스레드가 루프를 확인하는 간격(초)
+STALL_CHECK_INTERVAL = 0.02
+STALL_KEEP = 50
+
+
+class LoopMonitor:
+    """
+    이벤트 루프 지연과 프로세스 CPU 사용률을 주기적으로 측정합니다.
+    sleep(interval) 이 예정보다 늦게 깨어난 만큼이 루프 지연 (다른 코루틴/블로킹 코드가 루프를 잡고 있던 시간).
+
+    루프가 멈춘 동안에는 루프 안에서 아무것도 실행되지 않으므로, 별도 감시 스레드가 예정 시각을 stall_ms 넘긴 것을 보면
+    sys._current_frames() 로 루프 스레드의 스택을 샘플링해 두고, 루프가 깨어나면 지연 시간과 가장 많이 잡힌 스택을 함께 기록합니다.
+    """
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, window: int = 600, stall_ms: float = LOOP_STALL_MS):
+        self.interval = interval
+        self.stall_ms = stall_ms
+        self.lag_ms: deque[float] = deque(maxlen=window)
+        self.cpu_percent = 0.0
+        self.stalls: deque[dict] = deque(maxlen=STALL_KEEP)
+        self.stall_origins = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._loop_thread: Optional[int] = None
+        self._expected = float("inf")  # 측정 태스크가 다음에 깨어날 예정 시각 (perf_counter)
+        self._pending: Counter = Counter()  # 현재 멈춤 동안 샘플링한 스택 → 횟수
+        self._origins: dict[tuple, Optional[str]] = {}  # 스택 → 가장 안쪽 프로젝트 코드 위치
+        self._lock = threading.Lock()
+
+    def start(self):
+        """실행 중인 이벤트 루프에서 측정 태스크와 멈춤 감시 스레드 시작 (이미 돌고 있으면 무시)"""
+        if self._task is None or self._task.done():
+            self._loop_thread = threading.get_ident()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        if self.stall_ms > 0 and (self._watchdog is None or not self._watchdog.is_alive()):
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def _run(self):
+        last_cpu = time.process_time()
+        last_wall = time.perf_counter()
+        try:
+            while True:
+                expected = time.perf_counter() + self.interval
+                self._expected = expected
+                await asyncio.sleep(self.interval)
+                self._expected = float("inf")
+                now = time.perf_counter()
+                lag = max(0.0, (now - expected) * 1000)
+                self.lag_ms.append(lag)
+                self._finish_stall(lag)
+                if now - last_wall >= 1.0:
+                    cpu = time.process_time()
+                    self.cpu_percent = (cpu - last_cpu) / (now - last_wall) * 100
+                    last_cpu, last_wall = cpu, now
+        finally:
+            self._expected = float("inf")
+
+    def _watch(self):
+        """감시 스레드: 측정 태스크가 예정보다 stall_ms 이상 늦으면 루프 스레드 스택을 샘플링"""
+        while True:
+            time.sleep(STALL_CHECK_INTERVAL)
+            if (time.perf_counter() - self._expected) * 1000 < self.stall_ms:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = tuple(stack_lines(frame))
+            with self._lock:
+                self._pending[stack] += 1
+                if stack not in self._origins:
+                    self._origins[stack] = stack_origin(frame)
+            del frame
+
+    def _finish_stall(self, lag: float):
+        """루프가 깨어난 직후: 이번 지연이 stall_ms 이상이면 샘플링한 스택과 함께 기록"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            origins, self._origins = self._origins, {}
+        if not self.stall_ms or lag < self.stall_ms:
+            return
+        stack, samples = pending.most_common(1)[0] if pending else ((), 0)
+        origin = origins.get(stack)
+        self.stalls.append({
+            "at": round(time.time(), 3),
+            "lag_ms": round(lag, 1),
+            "origin": origin,
+            "samples": sum(pending.values()),
+            "stack_samples": samples,  # 아래 stack 이 잡힌 횟수 (나머지는 다른 스택)
+            "stack": list(stack),
+        })
+        entry = self.stall_origins[origin or "unknown"]
+        entry["count"] += 1
+        entry["total_ms"] += lag
+        entry["max_ms"] = max(entry["max_ms"], lag)
+        logger.warning(f"Event loop blocked for {lag:.0f}ms at {origin or 'unknown'}.")
+
+    def recent_lag_ms(self) -> float:
+        """최근 1초 평균 루프 지연"""
+        recent = list(self.lag_ms)[-RECENT_SAMPLES:]
+        return sum(recent) / len(recent) if recent else 0.0
+
+    def stats(self) -> dict:
+        ordered = sorted(self.lag_ms)
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "recent_lag_ms": round(self.recent_lag_ms(), 1),
+            "p95_lag_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1) if ordered else 0.0,
+            "max_lag_ms": round(ordered[-1], 1) if ordered else 0.0,
+            "cpu_percent": round(self.cpu_percent, 1),
+            "stall_ms": self.stall_ms,
+            "stalls": sum(entry["count"] for entry in self.stall_origins.values()),
+        }
+
+    def stall_report(self, limit: int = 20) -> dict:
+        """최근 멈춤(스택 포함)과 멈춘 위치별 횟수/누적/최대 시간"""
+        return {
+            "recent": list(self.stalls)[-limit:][::-1],
+            "by_origin": {
+                origin: {**entry, "total_ms": round(entry["total_ms"], 1), "max_ms": round(entry["max_ms"], 1)}
+                for origin, entry in sorted(self.stall_origins.items(), key=lambda item: -item[1]["total_ms"])
+            },
+        }
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> LoopMonitor:
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopMonitor()
+    return _monitor
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from utils.genai_client import get_model
+from utils.prompt_cache import cached_model
+from utils.usage import record_usage
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+# 티어별 모델 (MODEL_TIER_LITE 등으로 교체)
+DEFAULT_TIERS = {
+    "lite": "gemini-2.5-flash-lite",
+    "standard": "gemini-2.0-flash",
+    "strong": "gemini-2.5-flash",
+}
+
+# 작업 → 티어. 분류/숫자 추정/JSON 복구는 lite, 재료 추출은 standard, 레시피 작성은 strong
+# MODEL_ROUTES="cooking_time=standard,recipe_text=lite" 처럼 작업별로 바꿀 수 있음
+TASK_TIERS = {
+    "cooking_time": "lite",
+    "ingredients_classify": "lite",
+    "structured_repair": "lite",
+    "ingredients_menu": "standard",
+    "ingredients_captions": "standard",
+    "ingredients_link": "standard",
+    "recipe_text": "strong",
+    "recipe_captions": "strong",
+    "recipe_video": "strong",
+}
+
+# 응답 꼬리 지연이 사용자 대기로 바로 이어지는 짧은 lite 텍스트 호출만 hedge
+# (레시피/재료 생성처럼 긴 호출은 두 번 보내면 비용이 바로 두 배가 되고, 영상 분석은 비용이 커서 제외)
+DEFAULT_HEDGE_TASKS = "cooking_time,ingredients_classify"
+HEDGE_ENABLED = os.getenv("HEDGE", "1") != "0"
+# 작업별 응답 시간 샘플이 HEDGE_MIN_SAMPLES 개 모이기 전에는 hedge 하지 않음 (p95 를 모르는 채로 고정 지연을 쓰면 긴 호출이 모두 두 번 나감)
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.5"))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "16"))
+
+# 대략적인 USD / 1M 토큰 (입력, 캐시 입력, 출력). 비용 비교용 추정치
+MODEL_PRICES = {
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.025, 0.40),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.075, 0.30),
+}
+
+
+def _parse_routes(value: str) -> dict[str, str]:
+    routes = {}
+    for item in value.split(","):
+        if "=" in item:
+            task, tier = item.split("=", 1)
+            routes[task.strip()] = tier.strip()
+    return routes
+
+
+class ModelRouter:
+    """
+    작업(task) 이름으로 모델 티어를 고르고 Gemini 호출을 실행합니다.
+
+    - 모델: TASK_TIERS(+ MODEL_ROUTES) 로 티어, 티어는 MODEL_TIER_<TIER> 로 모델 이름
+    - hedge: hedge 대상 작업은 작업별 최근 p95 지연이 지나도 응답이 없으면 같은 요청을 한 번 더 보내고
+      먼저 끝난 응답을 사용 (이미 보낸 늦은 쪽은 취소할 수 없으므로 끝까지 받고, 그 비용은 wasted 로 따로 집계)
+    - 모델별 호출 수/토큰/추정 비용, 작업별 hedge 횟수/승리 횟수/버린 응답 비용을 집계
+    generate 는 응답(hedge 면 p95 + 두 번째 요청)까지 호출한 스레드를 막으므로, async 함수에서는 generate_async 를 씀
+    """
+
+    def __init__(self):
+        self.tiers = {tier: os.getenv(f"MODEL_TIER_{tier.upper()}", model) for tier, model in DEFAULT_TIERS.items()}
+        self.routes = {**TASK_TIERS, **_parse_routes(os.getenv("MODEL_ROUTES", ""))}
+        self.hedge_tasks = set(filter(None, os.getenv("HEDGE_TASKS", DEFAULT_HEDGE_TASKS).split(","))) if HEDGE_ENABLED else set()
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._latencies: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=200))
+        self._hedges = defaultdict(
+            lambda: {"calls": 0, "hedged": 0, "hedge_won": 0, "wasted_calls": 0, "wasted_cost_usd": 0.0}
+        )
+        self._models = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+
+    def model_name(self, task: str) -> str:
+        tier = self.routes.get(task, "standard")
+        return self.tiers.get(tier, tier)  # 티어 대신 모델 이름을 직접 적어도 동작
+
+    def model(self, task: str, name: Optional[str] = None, instruction: Optional[str] = None) -> "genai.GenerativeModel":
+        """task 티어의 모델. instruction 이 있으면 name 별 고정 지시문을 묶은 모델 (prompt_cache)"""
+        model_name = self.model_name(task)
+        if instruction:
+            return cached_model(model_name, name or task, instruction)
+        return get_model(model_name)
+
+    def hedge_delay(self, task: str) -> Optional[float]:
+        """작업별 최근 p95 응답 시간. 샘플이 부족하면 None (hedge 하지 않음)"""
+        samples = sorted(self._latencies[task])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, samples[min(len(samples) - 1, int(len(samples) * 0.95))])
+
+    def generate(self, task: str, contents, name: Optional[str] = None, instruction: Optional[str] = None, **kwargs):
+        """task 티어 모델로 generate_content (hedge 대상이면 hedged)"""
+        model_name = self.model_name(task)
+        model = self.model(task, name, instruction)
+        with self._lock:
+            self._hedges[task]["calls"] += 1
+        delay = self.hedge_delay(task) if task in self.hedge_tasks and not kwargs.get("stream") else None
+        if delay is None:
+            return self._call(task, model_name, model, contents, kwargs)
+        return self._hedged(task, model_name, model, contents, kwargs, delay)
+
+    async def generate_async(self, task: str, contents, name: Optional[str] = None, instruction: Optional[str] = None,
+                             **kwargs):
+        """generate 를 스레드에서 실행 (이벤트 루프를 막지 않음)"""
+        return await asyncio.to_thread(self.generate, task, contents, name, instruction, **kwargs)
+
+    def stream(self, task: str, contents, name: Optional[str] = None, instruction: Optional[str] = None,
+               **kwargs) -> Iterator[str]:
+        """
+        task 티어 모델로 stream=True 생성. 받은 텍스트 조각을 순서대로 내보내고 (hedge 없음),
+        끝까지 받은 뒤 전체 응답 기준으로 토큰/비용/응답 시간을 기록합니다.
+        """
+        model_name = self.model_name(task)
+        model = self.model(task, name, instruction)
+        with self._lock:
+            self._hedges[task]["calls"] += 1
+        start = time.perf_counter()
+        response = model.generate_content(contents, stream=True, **kwargs)
+        for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+        record_usage(task, response, time.perf_counter() - start)
+        self.account(model_name, response)
+
+    def _call(self, task: str, model_name: str, model, contents, kwargs: dict):
+        start = time.perf_counter()
+        response = model.generate_content(contents, **kwargs)
+        elapsed = time.perf_counter() - start
+        record_usage(task, response, elapsed)
+        self.account(model_name, response)
+        with self._lock:
+            self._latencies[task].append(elapsed)
+        return response
+
+    def _hedged(self, task: str, model_name: str, model, contents, kwargs: dict, delay: float):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+        primary = self._pool.submit(self._call, task, model_name, model, contents, kwargs)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+
+        logger.info(f"'{task}' slower than {delay:.2f}s, sending hedged request.")
+        backup = self._pool.submit(self._call, task, model_name, model, contents, kwargs)
+        with self._lock:
+            self._hedges[task]["hedged"] += 1
+        pending = {primary, backup}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        with self._lock:
+                            self._hedges[task]["hedge_won"] += 1
+                    for loser in pending:
+                        # 아직 시작하지 않았으면 취소, 이미 보낸 요청은 끝날 때 버린 비용으로 집계
+                        if not loser.cancel():
+                            loser.add_done_callback(lambda f: self._account_wasted(task, model_name, f))
+                    return future.result()
+        # 둘 다 실패하면 원래 요청의 에러를 그대로 전달
+        return primary.result()
+
+    def _account_wasted(self, task: str, model_name: str, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        cost = self._cost(model_name, future.result())
+        with self._lock:
+            self._hedges[task]["wasted_calls"] += 1
+            self._hedges[task]["wasted_cost_usd"] += cost
+
+    def account(self, model_name: str, response):
+        """모델별 토큰/추정 비용 누적 (영상 분석처럼 라우터 밖에서 호출한 응답도 여기로)"""
+        model_name = model_name.removeprefix("models/")
+        usage = getattr(response, "usage_metadata", None)
+        prompt = getattr(usage, "prompt_token_count", 0) or 0
+        cached = getattr(usage, "cached_content_token_count", 0) or 0
+        output = getattr(usage, "candidates_token_count", 0) or 0
+        cost = self._cost(model_name, response)
+        with self._lock:
+            entry = self._models[model_name]
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt
+            entry["cached_tokens"] += cached
+            entry["output_tokens"] += output
+            entry["cost_usd"] += cost
+
+    @staticmethod
+    def _cost(model_name: str, response) -> float:
+        usage = getattr(response, "usage_metadata", None)
+        prompt = getattr(usage, "prompt_token_count", 0) or 0
+        cached = getattr(usage, "cached_content_token_count", 0) or 0
+        output = getattr(usage, "candidates_token_count", 0) or 0
+        input_price, cached_price, output_price = MODEL_PRICES.get(model_name.removeprefix("models/"), (0.0, 0.0, 0.0))
+        return ((prompt - cached) * input_price + cached * cached_price + output * output_price) / 1_000_000
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "routes": {task: self.model_name(task) for task in self.routes},
+                "models": {name: {**entry, "cost_usd": round(entry["cost_usd"], 6)} for name, entry in self._models.items()},
+                "hedging": {
+                    task: {
+                        **entry,
+                        "wasted_cost_usd": round(entry["wasted_cost_usd"], 6),
+                        "delay_seconds": round(delay, 2) if (delay := self.hedge_delay(task)) else None,
+                    }
+                    for task, entry in self._hedges.items()
+                    if task in self.hedge_tasks
+                },
+            }
+
+
+_router: Optional[ModelRouter] = None
+
+
+def get_router() -> ModelRouter:
+    """MODEL_TIER_LITE/STANDARD/STRONG, MODEL_ROUTES, HEDGE, HEDGE_TASKS, HEDGE_MIN_DELAY"""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
+
+
+def task_model(task: str, name: Optional[str] = None, instruction: Optional[str] = None) -> "genai.GenerativeModel":
+    return get_router().model(task, name, instruction)
+
+
+def routed_generate(task: str, contents, name: Optional[str] = None, instruction: Optional[str] = None, **kwargs):
+    return get_router().generate(task, contents, name, instruction, **kwargs)
+
+
+async def routed_generate_async(task: str, contents, name: Optional[str] = None, instruction: Optional[str] = None,
+                                **kwargs):
+    return await get_router().generate_async(task, contents, name, instruction, **kwargs)
+
+
+def routed_stream(task: str, contents, name: Optional[str] = None, instruction: Optional[str] = None,
+                  **kwargs) -> Iterator[str]:
+    return get_router().stream(task, contents, name, instruction, **kwargs)
@@ -0,0 +1,284 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Optional
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 1 이면 ?profile=1 쿼리나 X-Profile: 1 헤더가 붙은 요청/웹소켓을 프로파일링 (기본 꺼짐)
+PROFILING_ENABLED = os.getenv("PROFILING", "0") == "1"
+# 표시 없이도 이 비율만큼 무작위로 프로파일링 (0~1)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+# 웹소켓 세션처럼 긴 요청은 처음 이만큼만 샘플링
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_KEEP = 50
+
+# 스택 맨 위가 이 함수면 대기 중인 스레드 (루프의 select, 스레드 풀 워커의 작업 대기 등)
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+# 샘플에서 빼는 진단용 스레드
+_OWN_THREADS = {"profiler", "loop-watchdog"}
+# 멈춘 위치를 고를 때 건너뛰는 파일 (미들웨어 자체는 원인이 아님)
+_SKIP_ORIGIN_FILES = {"profiler.py", "loop_monitor.py"}
+
+
+def short_path(path: str) -> str:
+    """프로젝트 파일은 상대 경로, 라이브러리는 site-packages/ 이후 또는 파일 이름만"""
+    if path.startswith(BASE_DIR + os.sep) and "site-packages" not in path:
+        return os.path.relpath(path, BASE_DIR)
+    if "site-packages" in path:
+        return path.split("site-packages" + os.sep, 1)[1]
+    return os.path.basename(path)
+
+
+def is_project_file(path: str) -> bool:
+    return path.startswith(BASE_DIR + os.sep) and "site-packages" not in path and f"{os.sep}.venv" not in path
+
+
+def walk_stack(frame) -> list:
+    """바깥(root) → 안쪽(leaf) 순서의 프레임 목록"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def stack_lines(frame, limit: int = 15) -> list[str]:
+    """안쪽 limit 개 프레임의 "파일:줄 in 함수" (root → leaf)"""
+    return [
+        f"{short_path(f.f_code.co_filename)}:{f.f_lineno} in {f.f_code.co_name}"
+        for f in walk_stack(frame)[-limit:]
+    ]
+
+
+def stack_origin(frame) -> Optional[str]:
+    """가장 안쪽의 프로젝트 코드 위치 (어느 코드가 루프를 잡고 있었는지)"""
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if is_project_file(path) and os.path.basename(path) not in _SKIP_ORIGIN_FILES:
+            return f"{short_path(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES
+
+
+def _function_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profile:
+    """요청 하나(또는 웹소켓 세션 하나)가 진행되는 동안 모은 스택 샘플"""
+
+    def __init__(self, kind: str, method: str, path: str, loop_thread: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.method = method
+        self.path = path
+        self.loop_thread = loop_thread
+        self.started = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        self.stacks: Counter = Counter()  # (스레드, 함수, ..., 함수) → 샘플 수
+        self.ticks = 0
+        self.loop_idle = 0
+        self.concurrent = 1  # 같은 시간에 프로파일링 중이던 요청 수 (1 보다 크면 샘플이 섞여 있음)
+        self.truncated = False
+
+    @property
+    def expired(self) -> bool:
+        return time.perf_counter() - self._started > PROFILE_MAX_SECONDS
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def collapsed(self) -> str:
+        """flamegraph.pl / speedscope 에서 바로 여는 collapsed stack 형식"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 15) -> list[dict]:
+        """함수별 self(맨 위)/total(스택에 포함) 샘플 수"""
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack[1:]):
+                total_counts[label] += count
+        return [
+            {"function": label, "self": self_counts[label], "total": total}
+            for label, total in sorted(total_counts.items(), key=lambda item: (-self_counts[item[0]], -item[1]))[:limit]
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started": round(self.started, 3),
+            "duration_ms": self.duration_ms,
+            "ticks": self.ticks,
+            "samples": sum(self.stacks.values()),
+            # 샘플링 시점에 이벤트 루프가 코드를 실행 중이던 비율
+            "loop_busy_percent": round((1 - self.loop_idle / self.ticks) * 100, 1) if self.ticks else 0.0,
+            "concurrent": self.concurrent,
+            "truncated": self.truncated,
+        }
+
+    def to_dict(self) -> dict:
+        return {**self.summary(), "top": self.top_functions()}
+
+
+class SamplingProfiler:
+    """
+    프로파일링 중인 요청이 하나라도 있는 동안 PROFILE_INTERVAL 마다 모든 스레드의 스택을 샘플링합니다.
+    이벤트 루프 스레드와 to_thread/hedge 작업 스레드가 모두 포함되고, 대기 중인 스레드는 제외합니다.
+    샘플은 그 시점에 진행 중이던 모든 프로파일에 들어가므로 동시에 여러 요청을 프로파일링하면 서로 섞입니다 (concurrent 참고).
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.active: dict[str, Profile] = {}
+        self.finished: deque[Profile] = deque(maxlen=PROFILE_KEEP)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def should_profile(self, scope: dict) -> bool:
+        if not PROFILING_ENABLED or scope["path"].startswith("/debug"):
+            return False
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("profile", ["0"])[0] == "1":
+            return True
+        if dict(scope.get("headers", [])).get(b"x-profile") == b"1":
+            return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    def begin(self, kind: str, method: str, path: str) -> Profile:
+        profile = Profile(kind, method, path, threading.get_ident())
+        with self._lock:
+            self.active[profile.id] = profile
+            for other in self.active.values():
+                other.concurrent = max(other.concurrent, len(self.active))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def end(self, profile: Profile):
+        profile.finish()
+        with self._lock:
+            self.active.pop(profile.id, None)
+            self.finished.append(profile)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = [profile for profile in self.active.values() if not profile.truncated]
+                if not self.active:
+                    self._thread = None
+                    return
+            for profile in profiles:
+                if profile.expired:
+                    profile.truncated = True
+            profiles = [profile for profile in profiles if not profile.truncated]
+            if not profiles:
+                continue
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            samples = []
+            loop_idle = set()
+            for ident, frame in sys._current_frames().items():
+                if names.get(ident) in _OWN_THREADS:
+                    continue
+                if _is_idle(frame):
+                    loop_idle.add(ident)
+                    continue
+                samples.append((ident, tuple(_function_label(f) for f in walk_stack(frame))))
+            with self._lock:
+                for profile in profiles:
+                    profile.ticks += 1
+                    if profile.loop_thread in loop_idle:
+                        profile.loop_idle += 1
+                    for ident, stack in samples:
+                        thread = "loop" if ident == profile.loop_thread else names.get(ident, str(ident))
+                        profile.stacks[(thread, *stack)] += 1
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            if profile_id in self.active:
+                return self.active[profile_id]
+            return next((profile for profile in self.finished if profile.id == profile_id), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": PROFILING_ENABLED,
+                "sample_rate": PROFILE_SAMPLE_RATE,
+                "interval_ms": round(self.interval * 1000, 1),
+                "active": [profile.summary() for profile in self.active.values()],
+                "profiles": [profile.summary() for profile in reversed(self.finished)],
+            }
+
+
+class ProfileMiddleware:
+    """
+    PROFILING=1 일 때 ?profile=1 / X-Profile: 1 요청(HTTP, 웹소켓)을 SamplingProfiler 로 프로파일링하는 ASGI 미들웨어.
+    응답 헤더 X-Profile-Id 로 프로파일 ID 를 돌려주며, 결과는 /debug/profiles/{id} 에서 조회합니다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profiler = get_profiler()
+        if scope["type"] not in ("http", "websocket") or not profiler.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.begin(scope["type"], scope.get("method", "WS"), scope["path"])
+        header = (b"x-profile-id", profile.id.encode())
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            elif message["type"] == "websocket.accept":
+                profile.status = 101
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.end(profile)
+            logger.info(f"Profiled {profile.method} {profile.path}: {profile.duration_ms}ms, id={profile.id}")
+
+
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    """PROFILING, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS, PROFILE_MAX_SECONDS"""
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
@@ -0,0 +1,162 @@
+import datetime
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from utils.genai_client import get_genai, get_model
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+# 명시적 컨텍스트 캐시 수명(초)과, 만료 이만큼 전에 연장
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", "3600"))
+PROMPT_CACHE_REFRESH_MARGIN = 300
+# 0 이면 명시적 캐시를 쓰지 않고 항상 system_instruction 으로만 묶음
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE", "1") != "0"
+
+# 모델별 명시적 캐시 최소 토큰 수. 이보다 짧은 지시문은 캐시를 만들 수 없으므로 system_instruction 으로 묶음
+_MIN_CACHE_TOKENS = {
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-pro": 4096,
+}
+_DEFAULT_MIN_CACHE_TOKENS = 4096
+
+
+def min_cache_tokens(model_name: str) -> int:
+    override = os.getenv("PROMPT_CACHE_MIN_TOKENS")
+    if override:
+        return int(override)
+    return _MIN_CACHE_TOKENS.get(model_name, _DEFAULT_MIN_CACHE_TOKENS)
+
+
+@dataclass
+class _Entry:
+    model: "genai.GenerativeModel"
+    mode: str  # "cached_content" | "system_instruction"
+    static_tokens: Optional[int] = None
+    cached: object = None  # caching.CachedContent
+    expires_at: float = 0.0
+
+
+class PromptCache:
+    """
+    엔드포인트마다 반복해서 보내는 고정 지시문(규칙, 출력 형식)을 한 번만 묶어 둔 모델을 제공합니다.
+
+    - 지시문이 모델의 최소 캐시 크기 이상이면 Gemini 컨텍스트 캐시(CachedContent)를 만들고
+      from_cached_content 모델을 사용 (입력 토큰이 cached_content_token_count 로 청구됨)
+    - 그보다 짧으면 system_instruction 으로 묶은 모델을 재사용
+      (고정 부분이 항상 프롬프트 앞에 오므로 Gemini 암시적 캐시에도 유리)
+    - 캐시 수명: 만료가 가까우면 TTL 연장, 연장에 실패하면(삭제/만료) 다시 생성
+    지금 있는 지시문은 모두 최소 캐시 크기(flash 1024 토큰)보다 짧아 system_instruction 으로 묶입니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        # 토큰 수 확인/캐시 생성/연장은 네트워크 호출이므로 전역 잠금 밖에서, 지시문별 잠금으로 한 번만 실행
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+
+    def model(self, model_name: str, name: str, instruction: str) -> "genai.GenerativeModel":
+        key = (model_name, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expiring(entry):
+                return entry.model
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # 기다리는 동안 다른 스레드가 만들었거나 연장했을 수 있음
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                entry = self._create(model_name, name, instruction)
+                with self._lock:
+                    self._entries[key] = entry
+            elif self._expiring(entry):
+                entry = self._refresh(entry, model_name, name, instruction)
+            return entry.model
+
+    @staticmethod
+    def _expiring(entry: _Entry) -> bool:
+        return entry.mode == "cached_content" and entry.expires_at - time.time() < PROMPT_CACHE_REFRESH_MARGIN
+
+    def _count_tokens(self, model_name: str, instruction: str) -> Optional[int]:
+        try:
+            return get_model(model_name).count_tokens(instruction).total_tokens
+        except Exception as e:
+            logger.warning(f"Could not count tokens for prompt cache: {e}")
+            return None
+
+    def _create(self, model_name: str, name: str, instruction: str) -> _Entry:
+        tokens = self._count_tokens(model_name, instruction) if PROMPT_CACHE_ENABLED else None
+        if tokens is not None and tokens >= min_cache_tokens(model_name):
+            try:
+                return self._create_cached(model_name, name, instruction, tokens)
+            except Exception as e:
+                logger.warning(f"Context cache creation failed for '{name}', using system instruction: {e}")
+        logger.info(f"Prompt '{name}' bound as system instruction ({tokens} tokens).")
+        return _Entry(get_model(model_name, system_instruction=instruction), "system_instruction", tokens)
+
+    def _create_cached(self, model_name: str, name: str, instruction: str, tokens: int) -> _Entry:
+        genai = get_genai()
+        cached = genai.caching.CachedContent.create(
+            model=f"models/{model_name}",
+            display_name=name,
+            system_instruction=instruction,
+            ttl=datetime.timedelta(seconds=PROMPT_CACHE_TTL),
+        )
+        logger.info(f"Created context cache '{name}' ({tokens} tokens): {cached.name}")
+        return _Entry(
+            genai.GenerativeModel.from_cached_content(cached),
+            "cached_content",
+            tokens,
+            cached,
+            time.time() + PROMPT_CACHE_TTL,
+        )
+
+    def _refresh(self, entry: _Entry, model_name: str, name: str, instruction: str) -> _Entry:
+        try:
+            entry.cached.update(ttl=datetime.timedelta(seconds=PROMPT_CACHE_TTL))
+            entry.expires_at = time.time() + PROMPT_CACHE_TTL
+            return entry
+        except Exception as e:
+            logger.warning(f"Context cache '{name}' could not be extended, recreating: {e}")
+            entry = self._create(model_name, name, instruction)
+            with self._lock:
+                self._entries[(model_name, name)] = entry
+            return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                f"{model_name}/{name}": {
+                    "mode": entry.mode,
+                    "static_tokens": entry.static_tokens,
+                    "expires_in": round(entry.expires_at - time.time()) if entry.cached else None,
+                }
+                for (model_name, name), entry in self._entries.items()
+            }
+
+    def close(self):
+        """종료 시 만든 컨텍스트 캐시 삭제 (남겨 두면 TTL 까지 저장 비용이 나감)"""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.cached is not None:
+                    try:
+                        entry.cached.delete()
+                    except Exception as e:
+                        logger.warning(f"Failed to delete context cache: {e}")
+            self._entries.clear()
+
+
+prompt_cache = PromptCache()
+
+
+def cached_model(model_name: str, name: str, instruction: str) -> "genai.GenerativeModel":
+    """name 별 고정 지시문을 묶은 모델 (처음 호출 시 캐시 방식 결정)"""
+    return prompt_cache.model(model_name, name, instruction)
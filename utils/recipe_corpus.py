@@ -0,0 +1,252 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 한 줄에 {"name", "aliases", "recipe", "source"} 하나. recipe 는 Gemini 결과와 같은 [재료]/[조리 단계] 텍스트
+RECIPE_CORPUS_PATH = os.getenv("RECIPE_CORPUS_PATH", os.path.join(BASE_DIR, "data", "recipes.jsonl"))
+# 0 이면 로컬 코퍼스를 쓰지 않고 항상 생성
+RECIPE_CORPUS_ENABLED = os.getenv("RECIPE_CORPUS", "1") != "0"
+# 메뉴명 유사도(0~1)가 이 값 이상이고 2위와 차이가 MATCH_MARGIN 이상일 때만 바로 사용
+RECIPE_MATCH_THRESHOLD = float(os.getenv("RECIPE_MATCH_THRESHOLD", "0.8"))
+MATCH_MARGIN = 0.05
+# 음절 수가 같은 이름끼리의 자모 편집 유사도 기준 ("김치찌게" → "김치찌개"). 음절이 더 붙은 다른 요리("미역국수")는 제외
+TYPO_MATCH_THRESHOLD = 0.85
+# 마지막 음절은 보통 요리 종류라서, 이 글자가 바뀌거나 초성이 다르면 오타가 아니라 다른 요리로 봄 ("미역죽" ≠ "미역국")
+DISH_KIND_SYLLABLES = set("국죽찜전밥탕면회")
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_NON_WORD_RE = re.compile(r"[^0-9a-z가-힣]")
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+
+
+def normalize_name(name: str) -> str:
+    """공백/기호를 지우고 소문자로 ("김치 찌개" → "김치찌개")"""
+    return _NON_WORD_RE.sub("", name.lower())
+
+
+def to_jamo(text: str) -> str:
+    """한글 음절을 초성/중성/종성 자모로 분해. 한 글자 오타도 자모 대부분이 겹치게 됨"""
+    chars = []
+    for char in text:
+        code = ord(char)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            offset = code - _HANGUL_BASE
+            initial, rest = divmod(offset, 21 * 28)
+            medial, final = divmod(rest, 28)
+            chars.append(chr(0x1100 + initial))
+            chars.append(chr(0x1161 + medial))
+            if final:
+                chars.append(chr(0x11A7 + final))
+        else:
+            chars.append(char)
+    return "".join(chars)
+
+
+def _ngrams(text: str, n: int) -> list[str]:
+    padded = f"^{text}$"
+    if len(padded) <= n:
+        return [padded]
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+def name_tokens(name: str) -> Counter:
+    """음절 bigram(s:) + 자모 trigram(j:). 띄어쓰기 차이는 정규화로, 오타는 자모 trigram 으로 흡수"""
+    normalized = normalize_name(name)
+    tokens = Counter("s:" + gram for gram in _ngrams(normalized, 2))
+    tokens.update("j:" + gram for gram in _ngrams(to_jamo(normalized), 3))
+    return tokens
+
+
+def similarity(a: Counter, b: Counter) -> float:
+    """토큰 multiset Dice 계수 (0~1)"""
+    total = sum(a.values()) + sum(b.values())
+    return 2 * sum((a & b).values()) / total if total else 0.0
+
+
+def typo_similarity(query: str, name: str) -> float:
+    """음절 수가 같고 마지막 음절(요리 종류)이 같은 요리를 가리킬 때만 1 - 자모 편집 거리 / 자모 길이, 아니면 0"""
+    query, name = normalize_name(query), normalize_name(name)
+    if not query or len(query) != len(name):
+        return 0.0
+    last_q, last_n = query[-1], name[-1]
+    if last_q != last_n and (
+        last_q in DISH_KIND_SYLLABLES or last_n in DISH_KIND_SYLLABLES or to_jamo(last_q)[0] != to_jamo(last_n)[0]
+    ):
+        return 0.0
+    a, b = to_jamo(query), to_jamo(name)
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return 1 - previous[-1] / max(len(a), len(b), 1)
+
+
+@dataclass
+class CorpusRecipe:
+    name: str
+    recipe: str
+    aliases: list[str] = field(default_factory=list)
+    source: str = "seed"
+
+
+@dataclass
+class RecipeMatch:
+    query: str
+    name: str
+    matched: str  # 일치한 이름 또는 별칭
+    bm25: float
+    similarity: float  # 토큰 Dice
+    typo_similarity: float  # 같은 음절 수일 때 자모 편집 유사도
+    confident: bool
+    recipe: str
+
+    @property
+    def best(self) -> float:
+        return max(self.similarity, self.typo_similarity)
+
+    def to_dict(self, with_recipe: bool = False) -> dict:
+        data = asdict(self)
+        if not with_recipe:
+            data.pop("recipe")
+        return data
+
+
+class RecipeCorpus:
+    """
+    메뉴명 → 레시피 로컬 코퍼스.
+    이름/별칭마다 음절 bigram + 자모 trigram 토큰으로 BM25 색인을 만들고,
+    BM25 상위 후보를 토큰 유사도(Dice)와 자모 편집 유사도로 다시 점수 매겨 확신할 수 있는 경우에만 반환합니다.
+    """
+
+    def __init__(self, recipes: list[CorpusRecipe]):
+        self.recipes = recipes
+        self.entries: list[tuple[int, str, Counter]] = []  # (recipe index, 이름/별칭, 토큰)
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)  # 토큰 → [(entry, tf)]
+        self.exact: dict[str, int] = {}
+        for index, recipe in enumerate(recipes):
+            for label in [recipe.name, *recipe.aliases]:
+                tokens = name_tokens(label)
+                entry = len(self.entries)
+                self.entries.append((index, label, tokens))
+                for token, tf in tokens.items():
+                    self.postings[token].append((entry, tf))
+                self.exact.setdefault(normalize_name(label), entry)
+        lengths = [sum(tokens.values()) for _, _, tokens in self.entries]
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        self.lengths = lengths
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        self.recent: list[dict] = []
+
+    @classmethod
+    def load(cls, path: str = RECIPE_CORPUS_PATH) -> "RecipeCorpus":
+        recipes = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        recipes.append(CorpusRecipe(**json.loads(line)))
+                    except (json.JSONDecodeError, TypeError) as e:
+                        logger.warning(f"Skipping invalid corpus line {line_no} in {path}: {e}")
+        logger.info(f"Loaded {len(recipes)} corpus recipes from {path}.")
+        return cls(recipes)
+
+    def _idf(self, token: str) -> float:
+        df = len(self.postings.get(token, ()))
+        n = len(self.entries)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 5) -> list[RecipeMatch]:
+        """BM25 후보를 레시피별로 모아 유사도(Dice/자모 편집 중 큰 값) 내림차순 상위 k 개"""
+        query_tokens = name_tokens(query)
+        scores: dict[int, float] = defaultdict(float)
+        for token, qtf in query_tokens.items():
+            idf = self._idf(token)
+            for entry, tf in self.postings.get(token, ()):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[entry] / self.avg_length)
+                scores[entry] += idf * tf * (BM25_K1 + 1) / (tf + norm) * qtf
+
+        exact = self.exact.get(normalize_name(query))
+        best: dict[int, RecipeMatch] = {}
+        for entry, score in sorted(scores.items(), key=lambda item: -item[1])[:k * 4]:
+            index, label, tokens = self.entries[entry]
+            sim = 1.0 if entry == exact else similarity(query_tokens, tokens)
+            typo = typo_similarity(query, label)
+            current = best.get(index)
+            if current is None or max(sim, typo) > current.best:
+                best[index] = RecipeMatch(
+                    query, self.recipes[index].name, label, round(score, 3), round(sim, 3), round(typo, 3),
+                    False, self.recipes[index].recipe,
+                )
+        matches = sorted(best.values(), key=lambda m: (-m.best, -m.bm25))[:k]
+        if matches:
+            top = matches[0]
+            runner_up = matches[1].best if len(matches) > 1 else 0.0
+            good = top.similarity >= RECIPE_MATCH_THRESHOLD or top.typo_similarity >= TYPO_MATCH_THRESHOLD
+            top.confident = good and (top.similarity == 1.0 or top.best - runner_up >= MATCH_MARGIN)
+        return matches
+
+    def lookup(self, query: str) -> Optional[RecipeMatch]:
+        """확신할 수 있는 일치가 있으면 그 레시피, 아니면 None (점수는 recent/counts 에 기록)"""
+        started = time.perf_counter()
+        matches = self.search(query, k=2)
+        top = matches[0] if matches else None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.counts["lookups"] += 1
+            self.counts["hits" if top and top.confident else "misses"] += 1
+            self.recent.append({
+                **(top.to_dict() if top else {"query": query}),
+                "elapsed_ms": round(elapsed_ms, 3),
+            })
+            del self.recent[:-20]
+        return top if top and top.confident else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "recipes": len(self.recipes),
+                "names": len(self.entries),
+                "threshold": RECIPE_MATCH_THRESHOLD,
+                "typo_threshold": TYPO_MATCH_THRESHOLD,
+                "counts": dict(self.counts),
+                "recent": list(self.recent),
+            }
+
+
+_corpus: Optional[RecipeCorpus] = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus() -> RecipeCorpus:
+    """RECIPE_CORPUS_PATH 를 처음 호출할 때 한 번만 읽어 색인"""
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = RecipeCorpus.load()
+    return _corpus
+
+
+def lookup_local_recipe(menu_name: str) -> Optional[RecipeMatch]:
+    if not RECIPE_CORPUS_ENABLED:
+        return None
+    return get_corpus().lookup(menu_name)
@@ -0,0 +1,146 @@
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+# 세션마다 보관할 최근 응답 수 / 오디오(base64) 총 크기 한도
+REPLAY_MAX_RESPONSES = int(os.getenv("REPLAY_MAX_RESPONSES", "8"))
+REPLAY_MAX_BYTES = int(os.getenv("REPLAY_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# 시스템 프롬프트가 단계를 "첫 번째 단계"처럼 서수로만 말하도록 하므로 서수로 단계 번호를 찾음
+_ORDINALS = {
+    "첫": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10,
+    "열한": 11, "열두": 12, "열세": 13, "열네": 14, "열다섯": 15,
+}
+_ORDINAL_RE = re.compile(
+    r"(" + "|".join(sorted(_ORDINALS, key=len, reverse=True)) + r")\s*번\s*째\s*단계"
+)
+_DIGIT_STEP_RE = re.compile(r"(\d+)\s*단계")
+
+_REPEAT_PHRASES = (
+    "다시 말해", "다시 설명", "다시 알려", "다시 들려", "한 번만 더", "한번만 더", "한 번 더 말해",
+    "못 들었", "잘 안 들", "뭐였", "뭐라고",
+)
+_PREVIOUS_PHRASES = ("전 단계", "이전 단계", "앞 단계")
+# 처음부터 다시 안내하는 요청은 모델이 직접 처리 (캐시된 한 단계로 대신할 수 없음)
+_RESTART_PHRASES = ("처음부터", "처음 단계부터")
+
+
+def find_step(text: str) -> Optional[int]:
+    """텍스트에서 처음 나오는 단계 번호 ("두 번째 단계" → 2)"""
+    match = _ORDINAL_RE.search(text)
+    if match:
+        return _ORDINALS[match.group(1)]
+    match = _DIGIT_STEP_RE.search(text)
+    return int(match.group(1)) if match else None
+
+
+@dataclass
+class RepeatRequest:
+    step: Optional[int] = None  # None 이면 직전 응답
+    previous: bool = False  # "전 단계": 직전 단계의 한 단계 앞
+
+
+def detect_repeat(user_text: str) -> Optional[RepeatRequest]:
+    """
+    사용자 발화가 반복 요청이면 RepeatRequest, 아니면 None.
+    확실한 표현만 잡고, 애매하면 None 으로 두어 모델이 응답하게 합니다.
+    """
+    text = " ".join(user_text.split())
+    if not text or any(phrase in text for phrase in _RESTART_PHRASES):
+        return None
+    asks_repeat = any(phrase in text for phrase in _REPEAT_PHRASES)
+    step = find_step(text)
+    if step is not None and (asks_repeat or "알려" in text):
+        return RepeatRequest(step=step)
+    if any(phrase in text for phrase in _PREVIOUS_PHRASES) and (asks_repeat or "알려" in text):
+        return RepeatRequest(previous=True)
+    if asks_repeat:
+        return RepeatRequest()
+    return None
+
+
+@dataclass
+class ReplayEntry:
+    response_id: str
+    audio: list[str] = field(default_factory=list)  # response.audio.delta 의 base64 PCM 조각 그대로
+    transcript: str = ""
+    step: Optional[int] = None
+    done: bool = False
+
+    @property
+    def size(self) -> int:
+        return sum(len(chunk) for chunk in self.audio)
+
+
+class ReplayBuffer:
+    """
+    세션별 최근 어시스턴트 응답(오디오 + 자막)을 단계 번호와 함께 보관하는 링 버퍼.
+    반복 요청 시 OpenAI 를 다시 호출하지 않고 서버에서 바로 재생합니다.
+    """
+
+    def __init__(self, max_responses: int = REPLAY_MAX_RESPONSES, max_bytes: int = REPLAY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries: deque[ReplayEntry] = deque(maxlen=max_responses)
+        self.current_step: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, response_id: str) -> ReplayEntry:
+        for entry in reversed(self.entries):
+            if entry.response_id == response_id:
+                return entry
+        entry = ReplayEntry(response_id)
+        self.entries.append(entry)
+        return entry
+
+    def add_audio(self, response_id: str, b64_audio: str):
+        self._entry(response_id).audio.append(b64_audio)
+        self._enforce_size()
+
+    def finish(self, response_id: str, transcript: str):
+        """응답이 끝나면 자막에서 단계 번호를 찾아 태그 (없으면 진행 중인 단계로 간주하지 않음)"""
+        entry = self._entry(response_id)
+        entry.transcript = transcript or ""
+        entry.step = find_step(entry.transcript)
+        entry.done = bool(entry.audio)
+        if entry.step is not None:
+            self.current_step = entry.step
+
+    def discard(self, response_id: str):
+        """취소/중단된 응답은 재생하지 않도록 제거"""
+        self.entries = deque((e for e in self.entries if e.response_id != response_id), maxlen=self.entries.maxlen)
+
+    def _enforce_size(self):
+        while len(self.entries) > 1 and sum(e.size for e in self.entries) > self.max_bytes:
+            self.entries.popleft()
+
+    def lookup(self, request: RepeatRequest) -> Optional[ReplayEntry]:
+        """
+        재생할 응답을 찾습니다.
+        - step 지정: 그 단계를 안내한 가장 최근 응답
+        - previous: 현재 단계의 한 단계 앞
+        - 그 외: 가장 최근에 끝난 응답
+        """
+        step = request.step
+        if request.previous:
+            step = self.current_step - 1 if self.current_step and self.current_step > 1 else None
+            if step is None:
+                self.misses += 1
+                return None
+        for entry in reversed(self.entries):
+            if entry.done and (step is None or entry.step == step):
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "responses": len(self.entries),
+            "bytes": sum(e.size for e in self.entries),
+            "current_step": self.current_step,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,136 @@
+"""
+/ws 실시간 세션 녹화 (REALTIME_CAPTURE_DIR 를 설정했을 때만 동작)
+
+파일 형식 (append-only, <session_id>.rtcap):
+    헤더  b"RTCAP1\\n"
+    레코드 struct "<dBI" (세션 시작 후 경과 초, 종류, 길이) + payload
+
+오디오 프레임은 받은 바이트 그대로, 나머지는 JSON 텍스트(UTF-8) 그대로 저장합니다.
+replay_session.py 가 이 파일로 같은 세션을 로컬에서 재현합니다.
+"""
+import json
+import logging
+import os
+import struct
+import time
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RTCAP1\n"
+_RECORD = struct.Struct("<dBI")
+
+# 레코드 종류
+CLIENT_AUDIO = 0  # 클라이언트 → 서버 (마이크 PCM 바이트)
+CLIENT_TEXT = 1  # 클라이언트 → 서버 (제어 메시지)
+UPSTREAM_IN = 2  # OpenAI → 서버 (Realtime 이벤트)
+UPSTREAM_OUT = 3  # 서버 → OpenAI
+CLIENT_OUT = 4  # 서버 → 클라이언트
+
+KIND_NAMES = {
+    CLIENT_AUDIO: "client_audio",
+    CLIENT_TEXT: "client_text",
+    UPSTREAM_IN: "upstream_in",
+    UPSTREAM_OUT: "upstream_out",
+    CLIENT_OUT: "client_out",
+}
+
+
+class SessionRecorder:
+    """세션 하나의 모든 프레임을 monotonic 시각과 함께 기록"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._start = time.monotonic()
+        self.records = 0
+
+    def write(self, kind: int, payload: bytes | str):
+        if self._file.closed:
+            return
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        self._file.write(_RECORD.pack(time.monotonic() - self._start, kind, len(payload)))
+        self._file.write(payload)
+        self.records += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"Captured {self.records} frames to {self.path}")
+
+
+def open_recorder(session_id: str) -> Optional[SessionRecorder]:
+    capture_dir = os.getenv("REALTIME_CAPTURE_DIR")
+    if not capture_dir:
+        return None
+    os.makedirs(capture_dir, exist_ok=True)
+    return SessionRecorder(os.path.join(capture_dir, f"{session_id}.rtcap"))
+
+
+def read_capture(path: str) -> Iterator[tuple[float, int, bytes]]:
+    """(경과 초, 종류, payload) 를 기록 순서대로 반환. 잘린 마지막 레코드는 무시"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a realtime capture file: {path}")
+        while True:
+            head = f.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                return
+            offset, kind, length = _RECORD.unpack(head)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield offset, kind, payload
+
+
+class CapturedClient:
+    """클라이언트 WebSocket 래퍼: 주고받는 프레임을 기록하고 나머지는 그대로 위임"""
+
+    def __init__(self, websocket, recorder: SessionRecorder):
+        self._ws = websocket
+        self._recorder = recorder
+
+    async def receive(self):
+        message = await self._ws.receive()
+        if message.get("bytes") is not None:
+            self._recorder.write(CLIENT_AUDIO, message["bytes"])
+        elif message.get("text") is not None:
+            self._recorder.write(CLIENT_TEXT, message["text"])
+        return message
+
+    async def send_json(self, data):
+        self._recorder.write(CLIENT_OUT, json.dumps(data, ensure_ascii=False))
+        await self._ws.send_json(data)
+
+    async def send_text(self, text: str):
+        self._recorder.write(CLIENT_OUT, text)
+        await self._ws.send_text(text)
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+
+class CapturedUpstream:
+    """OpenAI Realtime 연결 래퍼: 보내고 받은 이벤트를 기록"""
+
+    def __init__(self, connection, recorder: SessionRecorder):
+        self._conn = connection
+        self._recorder = recorder
+
+    async def send(self, message):
+        self._recorder.write(UPSTREAM_OUT, message)
+        await self._conn.send(message)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        async for message in self._conn:
+            self._recorder.write(UPSTREAM_IN, message)
+            yield message
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
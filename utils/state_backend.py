@@ -0,0 +1,508 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(BASE_DIR, "cache", "state.db")
+# 결과 캐시(results) 보관 기간. 이보다 오래된 결과는 주기적으로 삭제 (0 이면 삭제 안 함)
+RESULT_TTL_DAYS = float(os.getenv("STATE_RESULT_TTL_DAYS", "30"))
+# 끝난 작업(done/failed)의 진행 이벤트 보관 시간. 결과는 jobs 에 남으므로 이벤트만 삭제 (0 이면 삭제 안 함)
+JOB_EVENT_TTL_SECONDS = float(os.getenv("JOB_EVENT_TTL_SECONDS", "3600"))
+STATE_PRUNE_INTERVAL = float(os.getenv("STATE_PRUNE_INTERVAL", "3600"))
+
+
+def text_key(text: str) -> str:
+    """긴 텍스트(레시피 본문 등)를 키로 쓸 때 사용하는 해시"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+class StateBackend(ABC):
+    """
+    여러 uvicorn 워커가 함께 보는 서버 상태 저장소 인터페이스.
+
+    - results: Gemini 결과 캐시 (namespace/key → JSON 값)
+    - recipes: /recipe, /youtube-recipe 로 만든 레시피 (실시간 세션이 recipe_id 로 조회)
+    - sessions: /ws 실시간 세션 기록
+    - timers: 세션별 타이머 기록
+    - jobs: 백그라운드 작업(유튜브 처리 등) 상태와 결과
+    - job_events: 작업 진행 이벤트 (다운로드 진행률, 단계 전환, 생성 중인 텍스트 조각)
+    """
+
+    # --- results ---
+    @abstractmethod
+    def get_result(self, namespace: str, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def put_result(self, namespace: str, key: str, value: Any) -> None:
+        ...
+
+    def has_result(self, namespace: str, key: str) -> bool:
+        return self.get_result(namespace, key) is not None
+
+    @abstractmethod
+    def prune_results(self, before: float) -> int:
+        """created_at 이 before 보다 오래된 결과를 지우고 지운 개수를 반환"""
+
+    # --- recipes ---
+    @abstractmethod
+    def save_recipe(self, recipe_text: str, estimated_time: int, source: str, title: str) -> str:
+        ...
+
+    @abstractmethod
+    def get_recipe(self, recipe_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def get_latest_recipe(self) -> Optional[dict]:
+        ...
+
+    # --- sessions ---
+    @abstractmethod
+    def open_session(self, recipe_id: Optional[str]) -> str:
+        ...
+
+    @abstractmethod
+    def close_session(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[dict]:
+        """세션 기록 (pid 는 세션을 연 워커, 종료됐으면 ended_at 이 있음)"""
+
+    @abstractmethod
+    def list_sessions(self, active_only: bool = True) -> list[dict]:
+        ...
+
+    # --- timers ---
+    @abstractmethod
+    def start_timer(self, session_id: str, seconds: int) -> str:
+        ...
+
+    @abstractmethod
+    def finish_timer(self, timer_id: str, status: str) -> None:
+        ...
+
+    @abstractmethod
+    def active_timers(self, session_id: str) -> list[dict]:
+        ...
+
+    # --- jobs ---
+    @abstractmethod
+    def create_job(self, kind: str, payload: dict) -> str:
+        ...
+
+    @abstractmethod
+    def update_job(self, job_id: str, **fields) -> None:
+        """status, stage, stages, result, error 중 바뀐 값만 전달"""
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def add_job_event(self, job_id: str, event: dict) -> int:
+        """이벤트를 추가하고 순번(seq)을 반환. seq 는 작업 안에서 증가하는 값"""
+
+    @abstractmethod
+    def job_events(self, job_id: str, after: int = 0) -> list[dict]:
+        """seq 가 after 보다 큰 이벤트를 순서대로 반환"""
+
+    @abstractmethod
+    def prune_job_events(self, finished_before: float) -> int:
+        """finished_before 전에 끝난 작업의 이벤트를 지우고 지운 개수를 반환"""
+
+
+_JOB_JSON_FIELDS = ("payload", "stages", "result")
+_FINISHED_STATUSES = ("done", "failed")
+
+
+class MemoryStateBackend(StateBackend):
+    """단일 프로세스용 (개발/테스트). 워커끼리 상태를 공유하지 않습니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: dict = {}
+        self._recipes: dict = {}
+        self._sessions: dict = {}
+        self._timers: dict = {}
+        self._jobs: dict = {}
+        self._job_events: dict = {}
+        self._event_seq = 0
+
+    def get_result(self, namespace, key):
+        with self._lock:
+            entry = self._results.get((namespace, key))
+            return entry[0] if entry else None
+
+    def put_result(self, namespace, key, value):
+        with self._lock:
+            self._results[(namespace, key)] = (value, time.time())
+
+    def prune_results(self, before):
+        with self._lock:
+            expired = [key for key, (_, created_at) in self._results.items() if created_at < before]
+            for key in expired:
+                del self._results[key]
+            return len(expired)
+
+    def save_recipe(self, recipe_text, estimated_time, source, title):
+        recipe_id = new_id()
+        with self._lock:
+            self._recipes[recipe_id] = {
+                "recipe_id": recipe_id, "title": title, "source": source,
+                "recipe_text": recipe_text, "estimated_time": estimated_time, "created_at": time.time(),
+            }
+        return recipe_id
+
+    def get_recipe(self, recipe_id):
+        with self._lock:
+            return self._recipes.get(recipe_id)
+
+    def get_latest_recipe(self):
+        with self._lock:
+            return max(self._recipes.values(), key=lambda r: r["created_at"], default=None)
+
+    def open_session(self, recipe_id):
+        session_id = new_id()
+        with self._lock:
+            self._sessions[session_id] = {
+                "session_id": session_id, "recipe_id": recipe_id, "pid": os.getpid(),
+                "started_at": time.time(), "ended_at": None,
+            }
+        return session_id
+
+    def close_session(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id]["ended_at"] = time.time()
+
+    def get_session(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return dict(session) if session else None
+
+    def list_sessions(self, active_only=True):
+        with self._lock:
+            return [dict(s) for s in self._sessions.values() if not active_only or s["ended_at"] is None]
+
+    def start_timer(self, session_id, seconds):
+        timer_id = new_id()
+        with self._lock:
+            self._timers[timer_id] = {
+                "timer_id": timer_id, "session_id": session_id, "seconds": seconds,
+                "started_at": time.time(), "status": "running",
+            }
+        return timer_id
+
+    def finish_timer(self, timer_id, status):
+        with self._lock:
+            if timer_id in self._timers:
+                self._timers[timer_id]["status"] = status
+
+    def active_timers(self, session_id):
+        with self._lock:
+            return [dict(t) for t in self._timers.values()
+                    if t["session_id"] == session_id and t["status"] == "running"]
+
+    def create_job(self, kind, payload):
+        job_id = new_id()
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id, "kind": kind, "payload": payload, "status": "queued", "stage": None,
+                "stages": {}, "result": None, "error": None, "created_at": now, "updated_at": now,
+            }
+        return job_id
+
+    def update_job(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def add_job_event(self, job_id, event):
+        with self._lock:
+            self._event_seq += 1
+            self._job_events.setdefault(job_id, []).append(
+                {**event, "seq": self._event_seq, "created_at": time.time()}
+            )
+            return self._event_seq
+
+    def job_events(self, job_id, after=0):
+        with self._lock:
+            return [dict(e) for e in self._job_events.get(job_id, []) if e["seq"] > after]
+
+    def prune_job_events(self, finished_before):
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in _FINISHED_STATUSES and job["updated_at"] < finished_before
+                and job_id in self._job_events
+            ]
+            return sum(len(self._job_events.pop(job_id)) for job_id in expired)
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    SQLite(WAL 모드) 파일 하나를 여러 워커 프로세스가 함께 사용합니다.
+    WAL 모드에서는 읽기가 쓰기를 막지 않으므로 워커 수가 늘어도 조회가 밀리지 않습니다.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at);
+            CREATE TABLE IF NOT EXISTS recipes (
+                recipe_id TEXT PRIMARY KEY,
+                title TEXT,
+                source TEXT,
+                recipe_text TEXT NOT NULL,
+                estimated_time INTEGER,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS recipes_created_at ON recipes (created_at);
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                recipe_id TEXT,
+                pid INTEGER,
+                started_at REAL NOT NULL,
+                ended_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS timers (
+                timer_id TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                seconds INTEGER NOT NULL,
+                started_at REAL NOT NULL,
+                status TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS timers_session ON timers (session_id, status);
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload BLOB,
+                status TEXT NOT NULL,
+                stage TEXT,
+                stages BLOB,
+                result BLOB,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                data BLOB NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq);
+            """
+        )
+        self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    def _fetchone(self, sql: str, params: tuple = ()) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+    def _fetchall(self, sql: str, params: tuple = ()) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_result(self, namespace, key):
+        row = self._fetchone("SELECT value FROM results WHERE namespace = ? AND key = ?", (namespace, key))
+        return orjson.loads(row["value"]) if row else None
+
+    def put_result(self, namespace, key, value):
+        self._execute(
+            "INSERT OR REPLACE INTO results (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, orjson.dumps(value), time.time()),
+        )
+
+    def has_result(self, namespace, key):
+        return self._fetchone("SELECT 1 FROM results WHERE namespace = ? AND key = ?", (namespace, key)) is not None
+
+    def prune_results(self, before):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM results WHERE created_at < ?", (before,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def save_recipe(self, recipe_text, estimated_time, source, title):
+        recipe_id = new_id()
+        self._execute(
+            "INSERT INTO recipes (recipe_id, title, source, recipe_text, estimated_time, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (recipe_id, title, source, recipe_text, estimated_time, time.time()),
+        )
+        return recipe_id
+
+    def get_recipe(self, recipe_id):
+        return self._fetchone("SELECT * FROM recipes WHERE recipe_id = ?", (recipe_id,))
+
+    def get_latest_recipe(self):
+        return self._fetchone("SELECT * FROM recipes ORDER BY created_at DESC LIMIT 1")
+
+    def open_session(self, recipe_id):
+        session_id = new_id()
+        self._execute(
+            "INSERT INTO sessions (session_id, recipe_id, pid, started_at) VALUES (?, ?, ?, ?)",
+            (session_id, recipe_id, os.getpid(), time.time()),
+        )
+        return session_id
+
+    def close_session(self, session_id):
+        self._execute("UPDATE sessions SET ended_at = ? WHERE session_id = ?", (time.time(), session_id))
+
+    def get_session(self, session_id):
+        return self._fetchone("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
+
+    def list_sessions(self, active_only=True):
+        where = "WHERE ended_at IS NULL" if active_only else ""
+        return self._fetchall(f"SELECT * FROM sessions {where} ORDER BY started_at")
+
+    def start_timer(self, session_id, seconds):
+        timer_id = new_id()
+        self._execute(
+            "INSERT INTO timers (timer_id, session_id, seconds, started_at, status) VALUES (?, ?, ?, ?, 'running')",
+            (timer_id, session_id, seconds, time.time()),
+        )
+        return timer_id
+
+    def finish_timer(self, timer_id, status):
+        self._execute("UPDATE timers SET status = ? WHERE timer_id = ?", (status, timer_id))
+
+    def active_timers(self, session_id):
+        return self._fetchall(
+            "SELECT * FROM timers WHERE session_id = ? AND status = 'running' ORDER BY started_at", (session_id,)
+        )
+
+    def create_job(self, kind, payload):
+        job_id = new_id()
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (job_id, kind, payload, status, stages, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, orjson.dumps(payload), orjson.dumps({}), now, now),
+        )
+        return job_id
+
+    def update_job(self, job_id, **fields):
+        if not fields:
+            return
+        columns = []
+        values = []
+        for name, value in fields.items():
+            columns.append(f"{name} = ?")
+            values.append(orjson.dumps(value) if name in _JOB_JSON_FIELDS else value)
+        columns.append("updated_at = ?")
+        values.extend([time.time(), job_id])
+        self._execute(f"UPDATE jobs SET {', '.join(columns)} WHERE job_id = ?", tuple(values))
+
+    def get_job(self, job_id):
+        job = self._fetchone("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        if job:
+            for name in _JOB_JSON_FIELDS:
+                job[name] = orjson.loads(job[name]) if job[name] else None
+        return job
+
+    def add_job_event(self, job_id, event):
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO job_events (job_id, data, created_at) VALUES (?, ?, ?)",
+                (job_id, orjson.dumps(event), time.time()),
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def job_events(self, job_id, after=0):
+        rows = self._fetchall(
+            "SELECT seq, data, created_at FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after),
+        )
+        return [{**orjson.loads(row["data"]), "seq": row["seq"], "created_at": row["created_at"]} for row in rows]
+
+    def prune_job_events(self, finished_before):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM job_events WHERE job_id IN "
+                "(SELECT job_id FROM jobs WHERE status IN (?, ?) AND updated_at < ?)",
+                (*_FINISHED_STATUSES, finished_before),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+
+_backend: Optional[StateBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend() -> StateBackend:
+    """
+    STATE_BACKEND 환경 변수로 구현을 고릅니다.
+    - sqlite (기본값): STATE_DB_PATH 파일을 워커들이 공유
+    - memory: 프로세스 내부 전용
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            kind = os.getenv("STATE_BACKEND", "sqlite").lower()
+            if kind == "memory":
+                _backend = MemoryStateBackend()
+            elif kind == "sqlite":
+                _backend = SQLiteStateBackend(os.getenv("STATE_DB_PATH", DEFAULT_PATH))
+            else:
+                raise ValueError(f"Unknown STATE_BACKEND: {kind}")
+            logger.info(f"State backend: {type(_backend).__name__}")
+    return _backend
+
+
+def prune_state() -> dict:
+    """보관 기간이 지난 상태를 삭제 (동기 호출이므로 이벤트 루프에서는 to_thread 로 실행)"""
+    backend = get_state_backend()
+    pruned = {}
+    if RESULT_TTL_DAYS > 0:
+        pruned["results"] = backend.prune_results(time.time() - RESULT_TTL_DAYS * 86400)
+    if JOB_EVENT_TTL_SECONDS > 0:
+        pruned["job_events"] = backend.prune_job_events(time.time() - JOB_EVENT_TTL_SECONDS)
+    if any(pruned.values()):
+        logger.info(f"State pruned: {pruned}")
+    return pruned
@@ -0,0 +1,151 @@
+import logging
+import re
+from typing import Any, Callable, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+_STRING_SPECIAL_RE = re.compile(r'["\\]')
+_SCALAR_END = set(",]} \t\r\n")
+_WHITESPACE = set(" \t\r\n")
+
+
+class _Container:
+    __slots__ = ("kind", "start", "path", "key", "expect_key", "count")
+
+    def __init__(self, kind: str, start: int, path: tuple):
+        self.kind = kind  # "{" 또는 "["
+        self.start = start
+        self.path = path
+        self.key: Optional[str] = None
+        self.expect_key = kind == "{"
+        self.count = 0  # 배열에서 시작된 원소 수
+
+
+class StreamingJSONParser:
+    """
+    조각으로 들어오는 JSON 텍스트를 한 글자씩 따라가며, 값이 완성되는 즉시 (경로, 값) 으로 꺼냅니다.
+
+    경로는 루트부터의 키/인덱스 튜플입니다. 예: {"ingredients": [{"과일/채소": [{...}]}]} 에서
+    첫 재료 객체는 ("ingredients", 0, "과일/채소", 0). want(path) 가 True 인 값만 그 구간을 잘라 orjson 으로 읽습니다.
+
+    첫 '{' / '[' 앞의 잡음(코드블록 표시 등)은 건너뜁니다. 완성된 값만 내보내므로 중간에 끊긴 조각은 나오지 않으며,
+    전체 결과의 검증/복구는 끝난 뒤 text 로 parse_structured 를 다시 호출해서 합니다.
+    """
+
+    def __init__(self, want: Callable[[tuple], bool]):
+        self.want = want
+        self.buffer = ""
+        self.pos = 0
+        self.stack: list[_Container] = []
+        self.started = False
+        self.complete = False
+        self._string_start: Optional[int] = None
+        self._string_path: Optional[tuple] = None  # None 이면 객체 키
+        self._scalar_start: Optional[int] = None
+        self._scalar_path: tuple = ()
+
+    @property
+    def text(self) -> str:
+        return self.buffer
+
+    def feed(self, chunk: str) -> list[tuple[tuple, Any]]:
+        """chunk 를 이어 붙이고 이번에 완성된 (경로, 값) 목록을 반환"""
+        self.buffer += chunk
+        values: list[tuple[tuple, Any]] = []
+        buffer = self.buffer
+        pos = self.pos
+        end = len(buffer)
+
+        while pos < end and not self.complete:
+            if self._string_start is not None:
+                # 문자열 안: 따옴표/역슬래시까지 한 번에 건너뜀
+                match = _STRING_SPECIAL_RE.search(buffer, pos)
+                if match is None:
+                    pos = end
+                    break
+                pos = match.start()
+                if buffer[pos] == "\\":
+                    if pos + 1 >= end:
+                        break  # 이스케이프 다음 글자를 기다림
+                    pos += 2
+                    continue
+                self._end_string(pos, values)
+                pos += 1
+                continue
+
+            char = buffer[pos]
+            if self._scalar_start is not None:
+                if char not in _SCALAR_END:
+                    pos += 1
+                    continue
+                self._emit(self._scalar_path, self._scalar_start, pos, values)
+                self._scalar_start = None
+                if not self.stack:
+                    self.complete = True
+                    break
+
+            if not self.started:
+                if char in "{[":
+                    self.started = True
+                else:
+                    pos += 1
+                    continue
+
+            if char in _WHITESPACE:
+                pass
+            elif char in "{[":
+                self.stack.append(_Container(char, pos, self._child_path()))
+            elif char in "}]":
+                if not self.stack:
+                    self.complete = True
+                    break
+                container = self.stack.pop()
+                self._emit(container.path, container.start, pos + 1, values)
+                if not self.stack:
+                    self.complete = True
+            elif char == ":":
+                if self.stack:
+                    self.stack[-1].expect_key = False
+            elif char == ",":
+                if self.stack and self.stack[-1].kind == "{":
+                    self.stack[-1].expect_key = True
+            elif char == '"':
+                top = self.stack[-1] if self.stack else None
+                is_key = top is not None and top.kind == "{" and top.expect_key
+                self._string_path = None if is_key else self._child_path()
+                self._string_start = pos
+            else:
+                self._scalar_path = self._child_path()
+                self._scalar_start = pos
+            pos += 1
+
+        self.pos = pos
+        return values
+
+    def _child_path(self) -> tuple:
+        if not self.stack:
+            return ()
+        top = self.stack[-1]
+        if top.kind == "[":
+            top.count += 1
+            return (*top.path, top.count - 1)
+        return (*top.path, top.key)
+
+    def _end_string(self, pos: int, values: list):
+        start, self._string_start = self._string_start, None
+        if self._string_path is None:
+            self.stack[-1].key = orjson.loads(self.buffer[start:pos + 1])
+        else:
+            self._emit(self._string_path, start, pos + 1, values)
+            if not self.stack:
+                self.complete = True
+
+    def _emit(self, path: tuple, start: int, end: int, values: list):
+        if not self.want(path):
+            return
+        try:
+            values.append((path, orjson.loads(self.buffer[start:end])))
+        except orjson.JSONDecodeError as e:
+            logger.debug(f"Skipping unparsable streamed value at {path}: {e}")
@@ -0,0 +1,175 @@
+import logging
+import re
+from typing import Any, Callable, Optional
+
+import orjson
+from pydantic import TypeAdapter, ValidationError
+
+from utils.model_router import routed_generate
+
+logger = logging.getLogger(__name__)
+
+# Gemini response_schema(OpenAPI subset)가 이해하는 키만 남긴다.
+_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "properties", "items", "required"}
+
+
+class StructuredOutputError(ValueError):
+    """모델 출력이 JSON/스키마 검증을 끝내 통과하지 못했을 때 발생합니다."""
+
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_TRAILING_COMMA_RE = re.compile(r",\s*([\]}])")
+
+
+def build_response_schema(response_type) -> dict:
+    """
+    Pydantic 모델(또는 List[Model] 같은 타입)에서 alias 기준 JSON 스키마를 만들고,
+    $ref 를 펼쳐서 Gemini response_schema 로 바로 넘길 수 있는 dict 로 변환합니다.
+    """
+    schema = TypeAdapter(response_type).json_schema(by_alias=True)
+    defs = schema.pop("$defs", {})
+
+    def _convert(node: dict) -> dict:
+        if "$ref" in node:
+            node = defs[node["$ref"].rsplit("/", 1)[-1]]
+        out = {}
+        for key, value in node.items():
+            if key not in _SCHEMA_KEYS:
+                continue
+            if key == "properties":
+                out[key] = {name: _convert(sub) for name, sub in value.items()}
+            elif key == "items":
+                out[key] = _convert(value)
+            else:
+                out[key] = value
+        return out
+
+    return _convert(schema)
+
+
+def load_json(raw_text: str) -> Any:
+    """
+    모델 출력 텍스트를 orjson 으로 파싱합니다.
+    코드블록(```json ... ```), 앞뒤 잡음, trailing comma 정도는 로컬에서 바로 복구합니다.
+    복구가 불가능하면 StructuredOutputError 를 발생시킵니다.
+    """
+    if not raw_text or not raw_text.strip():
+        raise StructuredOutputError("모델 응답이 비어 있습니다.")
+
+    cleaned = _FENCE_RE.sub("", raw_text.strip())
+    try:
+        return orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
+        pass
+
+    # 가장 바깥쪽 JSON 덩어리만 잘라내고 trailing comma 제거 후 재시도
+    starts = [i for i in (cleaned.find("{"), cleaned.find("[")) if i != -1]
+    end = max(cleaned.rfind("}"), cleaned.rfind("]"))
+    if starts and end > min(starts):
+        candidate = _TRAILING_COMMA_RE.sub(r"\1", cleaned[min(starts):end + 1])
+        try:
+            return orjson.loads(candidate)
+        except orjson.JSONDecodeError as e:
+            logger.error(f"JSON 로컬 복구 실패: {e}")
+
+    raise StructuredOutputError("모델 응답을 JSON으로 파싱하는 데 실패했습니다.")
+
+
+def _invalid_fragments(error: ValidationError) -> dict:
+    """
+    ValidationError 의 loc 에서 '처음 등장하는 리스트 인덱스'까지를 잘라
+    {(컨테이너 경로, 인덱스): [에러 메시지...]} 형태로 묶습니다.
+    """
+    fragments: dict = {}
+    for err in error.errors():
+        loc = err.get("loc", ())
+        for pos, part in enumerate(loc):
+            if isinstance(part, int):
+                key = (tuple(loc[:pos]), part)
+                fragments.setdefault(key, []).append(f"{'.'.join(map(str, loc[pos + 1:]))}: {err.get('msg')}")
+                break
+        else:
+            return {}
+    return fragments
+
+
+def _container_at(data: Any, path: tuple):
+    for part in path:
+        data = data[part]
+    return data
+
+
+def parse_structured(
+    raw_text: str,
+    response_type,
+    *,
+    item_type=None,
+    repair: Optional[Callable[[str, Any, list], str]] = None,
+):
+    """
+    모델 출력 텍스트를 response_type 으로 파싱/검증합니다.
+
+    - JSON 자체가 깨졌으면 로컬 복구 → (repair 가 있으면) 전체 텍스트만 다시 고쳐 달라고 요청
+    - 검증에 실패하면 실패한 리스트 원소(item_type)만 골라서 repair 로 다시 생성하고 끼워 넣음
+
+    repair(fragment_text, fragment_type, errors) 는 고쳐진 JSON 텍스트를 반환해야 합니다.
+    """
+    adapter = TypeAdapter(response_type)
+
+    try:
+        data = load_json(raw_text)
+    except StructuredOutputError:
+        if not repair:
+            raise
+        logger.warning("JSON 파싱 실패, 전체 응답 복구를 요청합니다.")
+        data = load_json(repair(raw_text, response_type, ["invalid JSON"]))
+
+    try:
+        return adapter.validate_python(data)
+    except ValidationError as e:
+        fragments = _invalid_fragments(e) if (repair and item_type) else {}
+        if not fragments:
+            logger.error(f"Pydantic validation error for {response_type}: {e}")
+            raise StructuredOutputError("모델 응답이 응답 스키마와 일치하지 않습니다.") from e
+
+    item_adapter = TypeAdapter(item_type)
+    for (path, index), errors in fragments.items():
+        container = _container_at(data, path)
+        fragment_text = orjson.dumps(container[index]).decode("utf-8")
+        logger.warning(f"잘못된 조각만 복구 요청: path={path}, index={index}, errors={errors}")
+        fixed = load_json(repair(fragment_text, item_type, errors))
+        try:
+            container[index] = item_adapter.dump_python(item_adapter.validate_python(fixed), by_alias=True)
+        except ValidationError as e:
+            logger.error(f"Pydantic validation error after repair: {e}")
+            raise StructuredOutputError("모델 응답이 응답 스키마와 일치하지 않습니다.") from e
+
+    try:
+        return adapter.validate_python(data)
+    except ValidationError as e:
+        logger.error(f"Pydantic validation error after repair: {e}")
+        raise StructuredOutputError("모델 응답이 응답 스키마와 일치하지 않습니다.") from e
+
+
+def make_gemini_repair() -> Callable[[str, Any, list], str]:
+    """
+    잘못된 JSON 조각만 Gemini 에게 스키마 강제 모드로 다시 받아오는 repair 함수를 만듭니다.
+    (structured_repair 작업 티어의 모델 사용)
+    """
+    def _repair(fragment_text: str, fragment_type, errors: list) -> str:
+        prompt = (
+            "다음 JSON을 스키마에 맞게 고쳐서 JSON만 반환하세요. 값의 의미는 유지하세요.\n"
+            f"오류: {'; '.join(errors)}\n"
+            f"JSON: {fragment_text}"
+        )
+        result = routed_generate(
+            "structured_repair",
+            prompt,
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": build_response_schema(fragment_type),
+            },
+        )
+        return result.text or ""
+
+    return _repair
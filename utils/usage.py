@@ -0,0 +1,44 @@
+import threading
+from collections import defaultdict
+
+# 작업(task)별 Gemini 호출 수, 토큰 사용량, 응답 시간 (프로세스 단위 누적)
+_lock = threading.Lock()
+_totals = defaultdict(lambda: {
+    "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "total_tokens": 0,
+    "timed_calls": 0, "latency_ms": 0.0,
+})
+
+
+def record_usage(task: str, response, elapsed: float | None = None) -> None:
+    """
+    generate_content 응답의 usage_metadata 를 task 별로 누적합니다.
+    cached_tokens 는 prompt_tokens 중 컨텍스트 캐시(명시적/암시적)에서 처리된 토큰 수.
+    elapsed(초)를 주면 평균 응답 시간도 집계합니다.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    with _lock:
+        entry = _totals[task]
+        entry["calls"] += 1
+        if usage:
+            entry["prompt_tokens"] += getattr(usage, "prompt_token_count", 0) or 0
+            entry["cached_tokens"] += getattr(usage, "cached_content_token_count", 0) or 0
+            entry["output_tokens"] += getattr(usage, "candidates_token_count", 0) or 0
+            entry["total_tokens"] += getattr(usage, "total_token_count", 0) or 0
+        if elapsed is not None:
+            entry["timed_calls"] += 1
+            entry["latency_ms"] += elapsed * 1000
+
+
+def usage_snapshot() -> dict:
+    with _lock:
+        snapshot = {}
+        for task, entry in _totals.items():
+            item = {k: v for k, v in entry.items() if k not in ("timed_calls", "latency_ms")}
+            if entry["prompt_tokens"]:
+                item["cached_ratio"] = round(entry["cached_tokens"] / entry["prompt_tokens"], 3)
+            if entry["calls"]:
+                item["avg_prompt_tokens"] = round(entry["prompt_tokens"] / entry["calls"], 1)
+            if entry["timed_calls"]:
+                item["avg_latency_ms"] = round(entry["latency_ms"] / entry["timed_calls"], 1)
+            snapshot[task] = item
+        return snapshot
@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DIR = os.path.join(BASE_DIR, "videos")
+
+VIDEO_EXT = ".mp4"
+PARTIAL_EXT = ".part"
+# 다른 워커가 아직 받고 있을 수 있으므로, 살아있는 프로세스의 임시 파일은 이 시간 전까지 지우지 않음
+PARTIAL_MAX_AGE = 60 * 60
+# lookup()/commit() 으로 최근 이 시간(초) 안에 넘겨준 영상은 다른 작업이 아직 업로드 중일 수 있으므로 용량을 넘어도 지우지 않음
+IN_USE_SECONDS = float(os.getenv("VIDEO_IN_USE_SECONDS", str(10 * 60)))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class VideoWorkspace:
+    """
+    다운로드한 유튜브 영상을 영상 ID 단위로 보관하는 로컬 작업 공간.
+
+    - 경로: <root>/<video_id>.mp4 (같은 제목의 다른 영상과 충돌하지 않음)
+    - 쓰기: <video_id>.<pid>.<random>.part 에 받은 뒤 os.replace 로 원자적으로 교체
+    - 용량: 전체 크기가 quota 를 넘으면 가장 오래 쓰지 않은 영상부터 삭제 (LRU).
+      최근 IN_USE_SECONDS 안에 넘겨준 영상은 다른 작업(다른 워커 포함)이 쓰는 중일 수 있어 건너뜀
+    """
+
+    def __init__(self, root: str = DEFAULT_DIR, quota_bytes: int = 2 * 1024 ** 3):
+        self.root = os.path.abspath(root)
+        self.quota_bytes = quota_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, video_id: str) -> str:
+        return os.path.join(self.root, f"{video_id}{VIDEO_EXT}")
+
+    def lookup(self, video_id: str) -> Optional[str]:
+        """이미 받아 둔 영상이 있으면 경로를 반환하고 최근 사용 시각을 갱신"""
+        path = self.path_for(video_id)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def partial_path(self, video_id: str) -> str:
+        return os.path.join(self.root, f"{video_id}.{os.getpid()}.{uuid.uuid4().hex[:8]}{PARTIAL_EXT}")
+
+    def commit(self, partial_path: str, video_id: str) -> str:
+        """다 받은 임시 파일을 최종 경로로 옮기고 용량 한도를 맞춤"""
+        final_path = self.path_for(video_id)
+        os.replace(partial_path, final_path)
+        self.enforce_quota(keep=final_path)
+        return final_path
+
+    def discard(self, partial_path: str):
+        try:
+            os.remove(partial_path)
+        except FileNotFoundError:
+            pass
+
+    def _videos(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(VIDEO_EXT):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def enforce_quota(self, keep: Optional[str] = None):
+        """quota 를 넘으면 최근 사용 시각(mtime)이 오래된 영상부터 삭제 (사용 중인 영상은 제외)"""
+        with self._lock:
+            videos = sorted(self._videos())
+            total = sum(size for _, size, _ in videos)
+            in_use_since = time.time() - IN_USE_SECONDS
+            for mtime, size, path in videos:
+                if total <= self.quota_bytes:
+                    break
+                if path == keep or mtime >= in_use_since:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.info(f"Evicted video from workspace: {path} ({size} bytes)")
+                except FileNotFoundError:
+                    pass
+            if total > self.quota_bytes:
+                logger.warning(f"Video workspace over quota while videos are in use: {total} > {self.quota_bytes} bytes")
+
+    def cleanup_partials(self) -> int:
+        """죽은 프로세스가 남긴 임시 파일, 너무 오래된 임시 파일을 삭제"""
+        removed = 0
+        now = time.time()
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith(PARTIAL_EXT):
+                continue
+            parts = entry.name.split(".")
+            pid = int(parts[1]) if len(parts) >= 4 and parts[1].isdigit() else None
+            too_old = now - entry.stat().st_mtime > PARTIAL_MAX_AGE
+            if too_old or pid is None or not _pid_alive(pid):
+                self.discard(entry.path)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} orphaned partial video files.")
+        return removed
+
+    def usage(self) -> dict:
+        videos = self._videos()
+        return {
+            "root": self.root,
+            "videos": len(videos),
+            "bytes": sum(size for _, size, _ in videos),
+            "quota_bytes": self.quota_bytes,
+        }
+
+
+_workspace: Optional[VideoWorkspace] = None
+_workspace_lock = threading.Lock()
+
+
+def get_workspace() -> VideoWorkspace:
+    """VIDEO_WORKSPACE_DIR, VIDEO_WORKSPACE_QUOTA_MB 환경 변수로 설정"""
+    global _workspace
+    with _workspace_lock:
+        if _workspace is None:
+            quota_mb = int(os.getenv("VIDEO_WORKSPACE_QUOTA_MB", "2048"))
+            _workspace = VideoWorkspace(os.getenv("VIDEO_WORKSPACE_DIR", DEFAULT_DIR), quota_mb * 1024 * 1024)
+    return _workspace
@@ -0,0 +1,80 @@
+import logging
+import os
+import re
+from typing import Optional
+
+from utils.ingredient_lexicon import extract_ingredient_lines
+
+logger = logging.getLogger(__name__)
+
+# 자막 우선 경로 사용 여부 (0 이면 항상 영상 분석)
+CAPTION_FAST_PATH = os.getenv("CAPTION_FAST_PATH", "1") != "0"
+# 프롬프트에 넣을 자막 최대 길이 (문자 수)
+MAX_CAPTION_CHARS = int(os.getenv("MAX_CAPTION_CHARS", "20000"))
+
+# 한국어 수동 자막 → 한국어 자동 생성 자막 → 그 외 아무 자막 순
+_CAPTION_PREFERENCE = ("ko", "a.ko", "ko-KR")
+_STEP_RE = re.compile(r"^\s*\d+\s*[.)]\s*\S", re.M)
+
+MIN_INGREDIENTS = 3
+MIN_STEPS = 2
+
+
+def fetch_video_text(url: str) -> Optional[dict]:
+    """
+    영상을 받지 않고 제목, 설명, 자막만 가져옵니다.
+    자막도 설명도 없거나 가져오지 못하면 None.
+    """
+    from pytubefix import YouTube  # import 비용이 커서 실제 사용 시점에 로드
+
+    try:
+        yt = YouTube(url)
+        title = yt.title or ""
+        description = yt.description or ""
+
+        captions = None
+        caption_code = None
+        available = {caption.code: caption for caption in yt.captions}
+        for code in _CAPTION_PREFERENCE + tuple(available):
+            if code in available:
+                captions = available[code].generate_txt_captions()
+                caption_code = code
+                break
+    except Exception as e:
+        logger.warning(f"Failed to fetch captions/description for {url}: {e}")
+        return None
+
+    if not captions and not description.strip():
+        return None
+
+    logger.info(f"Fetched video text: captions={caption_code}, description={len(description)} chars")
+    return {
+        "title": title,
+        "description": description,
+        "captions": (captions or "")[:MAX_CAPTION_CHARS],
+        "caption_code": caption_code,
+    }
+
+
+def format_video_text(video_text: dict) -> str:
+    """프롬프트에 붙일 영상 정보 블록"""
+    return (
+        f"[영상 제목]\n{video_text['title']}\n\n"
+        f"[영상 설명]\n{video_text['description']}\n\n"
+        f"[자막]\n{video_text['captions'] or '(없음)'}"
+    )
+
+
+def score_recipe_text(recipe_text: str) -> dict:
+    """
+    텍스트만으로 만든 레시피가 충분한지 판단합니다.
+    [재료] 항목이 MIN_INGREDIENTS 개 이상, 번호 매긴 조리 단계가 MIN_STEPS 개 이상이면 complete.
+    """
+    ingredients = len(extract_ingredient_lines(recipe_text))
+    steps_section = recipe_text.split("[조리 단계]", 1)[1] if "[조리 단계]" in recipe_text else ""
+    steps = len(_STEP_RE.findall(steps_section))
+    return {
+        "ingredients": ingredients,
+        "steps": steps,
+        "complete": ingredients >= MIN_INGREDIENTS and steps >= MIN_STEPS,
+    }
@@ -1,30 +1,163 @@
-from pytubefix import YouTube
 import os
 import time
-import google.generativeai as genai
+import re
 import logging
+from typing import TYPE_CHECKING
+from utils.usage import record_usage
+from utils.model_router import get_router
+from utils.genai_client import get_genai
+from utils.video_workspace import get_workspace
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def download_youtube(url: str) -> str | None:
-    """Downloads a YouTube video and returns the file path."""
+_VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/|shorts/|embed/|live/)([A-Za-z0-9_-]{11})")
+
+
+def video_cache_key(url: str) -> str:
+    """URL 표기(단축 링크, 파라미터 등)가 달라도 같은 영상이면 같은 키가 되도록 영상 ID 를 사용"""
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else url.strip()
+
+
+def _report_cached(path: str, on_progress):
+    if on_progress:
+        size = os.path.getsize(path)
+        on_progress(size, size)
+
+
+def download_youtube(url: str, on_progress=None) -> str | None:
+    """
+    Downloads a YouTube video into the video workspace and returns the file path.
+    on_progress(downloaded_bytes, total_bytes) is called as chunks arrive (pytubefix callback).
+    """
+    workspace = get_workspace()
+
+    # 같은 영상을 최근에 받아 뒀으면 다시 받지 않음
+    video_id = video_cache_key(url)
+    if _VIDEO_ID_RE.search(url) and (cached_path := workspace.lookup(video_id)):
+        logger.info(f"Reusing downloaded video: {cached_path}")
+        _report_cached(cached_path, on_progress)
+        return cached_path
+
+    from pytubefix import YouTube  # import 비용이 커서 실제 다운로드 시점에 로드
+
     logger.info(f"Starting download for YouTube video from: {url}")
+    partial_path = None
     try:
-        yt = YouTube(url)
+        def _on_chunk(stream, chunk, bytes_remaining):
+            if on_progress:
+                on_progress(stream.filesize - bytes_remaining, stream.filesize)
+
+        yt = YouTube(url, on_progress_callback=_on_chunk)
+        video_id = yt.video_id
+        if cached_path := workspace.lookup(video_id):
+            logger.info(f"Reusing downloaded video: {cached_path}")
+            _report_cached(cached_path, on_progress)
+            return cached_path
+
         stream = yt.streams.filter(progressive=True, file_extension='mp4').order_by('resolution').desc().first()
         if not stream:
             logger.error("No suitable progressive mp4 stream found.")
             return None
         
-        file_path = stream.download(output_path="./videos")
+        # 임시 파일로 받은 뒤 원자적으로 교체 (중간에 죽어도 반쪽짜리 영상이 남지 않음)
+        partial_path = workspace.partial_path(video_id)
+        stream.download(
+            output_path=workspace.root,
+            filename=os.path.basename(partial_path),
+            skip_existing=False,
+        )
+        file_path = workspace.commit(partial_path, video_id)
+        partial_path = None
         logger.info(f"Video downloaded successfully to: {file_path}")
         return file_path
     except Exception as e:
         logger.error(f"An error occurred during YouTube download: {e}")
         raise
+    finally:
+        if partial_path:
+            workspace.discard(partial_path)
+
+
+def upload_video(file_path: str):
+    """Uploads a local video to Gemini (retries up to 5 times)."""
+    genai = get_genai()
+    logger.info(f"Uploading file to Gemini: {file_path}")
+    for _ in range(5):
+        try:
+            uploaded_file = genai.upload_file(path=file_path)
+            logger.info(f"File uploaded successfully: {uploaded_file.name}")
+            return uploaded_file
+        except Exception as e:
+            logger.warning(f"File upload failed, retrying... Error: {e}")
+            time.sleep(2)
+    raise ValueError("Failed to upload file to Gemini after multiple retries.")
+
+
+def wait_until_active(uploaded_file, on_state=None):
+    """Blocks until Gemini finishes processing the uploaded file."""
+    genai = get_genai()
+    last_state = None
+    while True:
+        file = genai.get_file(uploaded_file.name)
+        if file.state.name != last_state and on_state:
+            on_state(file.state.name)
+        last_state = file.state.name
+        if file.state.name == "ACTIVE":
+            logger.info("File is ACTIVE and ready for processing.")
+            return file
+        elif file.state.name == "FAILED":
+            raise ValueError("File processing failed on Gemini server.")
+
+        logger.info("Waiting for file processing...")
+        time.sleep(2)
+
+
+def generate_from_video(prompt: str, uploaded_file, model: "genai.GenerativeModel", generation_config: dict,
+                        task: str = "video", on_chunk=None) -> str:
+    """
+    Runs a streamed generation over the uploaded video and returns the full text.
+    on_chunk(text) is called for every streamed chunk so callers can show partial output.
+    """
+    contents = [prompt, uploaded_file]
+    logger.info("Generating content with Gemini...")
+    start = time.perf_counter()
+    responses = model.generate_content(contents, stream=True, generation_config=generation_config)
+
+    # Concatenate all parts of the streamed response
+    parts = []
+    for response in responses:
+        parts.append(response.text)
+        if on_chunk:
+            on_chunk(response.text)
+    full_response = "".join(parts)
+    record_usage(task, responses, time.perf_counter() - start)
+    get_router().account(model.model_name, responses)
+
+    logger.info("Finished generating content from Gemini.")
+    return full_response.strip()
 
-def recog_video(prompt: str, url: str, model: genai.GenerativeModel, generation_config: dict) -> str:
+
+def cleanup_video(uploaded_file):
+    """
+    Deletes the uploaded Gemini file.
+    The local video stays in the workspace for re-runs and is evicted by its quota.
+    """
+    if uploaded_file:
+        try:
+            get_genai().delete_file(uploaded_file.name)
+            logger.info(f"Successfully deleted uploaded file from Gemini: {uploaded_file.name}")
+        except Exception as e:
+            logger.error(f"Error deleting uploaded file {uploaded_file.name} from Gemini: {e}")
+
+
+def recog_video(prompt: str, url: str, model: "genai.GenerativeModel", generation_config: dict, task: str = "video",
+                on_chunk=None) -> str:
+    """Downloads, uploads and analyses the video. on_chunk(text) receives streamed output (see generate_from_video)."""
     file_path = None
     uploaded_file = None
     try:
@@ -32,54 +165,13 @@ def recog_video(prompt: str, url: str, model: genai.GenerativeModel, generation_
         if not file_path:
             raise ValueError("Failed to download video.")
 
-        logger.info(f"Uploading file to Gemini: {file_path}")
-        for _ in range(5):
-            try:
-                uploaded_file = genai.upload_file(path=file_path)
-                break
-            except Exception as e:
-                logger.warning(f"File upload failed, retrying... Error: {e}")
-                time.sleep(2)
-        
-        if not uploaded_file:
-            raise ValueError("Failed to upload file to Gemini after multiple retries.")
-            
-        logger.info(f"File uploaded successfully: {uploaded_file.name}")
+        uploaded_file = upload_video(file_path)
 
         # [추가] 파일 처리가 완료될 때까지 대기 (ACTIVE 상태 확인)
-        while True:
-            file = genai.get_file(uploaded_file.name)
-            if file.state.name == "ACTIVE":
-                logger.info("File is ACTIVE and ready for processing.")
-                break
-            elif file.state.name == "FAILED":
-                raise ValueError("File processing failed on Gemini server.")
-            
-            logger.info("Waiting for file processing...")
-            time.sleep(2)
+        wait_until_active(uploaded_file)
 
-        # Make the Gemini API call
-        contents = [prompt, uploaded_file]
-        logger.info("Generating content with Gemini...")
-        responses = model.generate_content(contents, stream=True, generation_config=generation_config)
-        
-        # Concatenate all parts of the streamed response
-        full_response = "".join(response.text for response in responses)
-        
-        logger.info("Finished generating content from Gemini.")
-        return full_response.strip()
+        return generate_from_video(prompt, uploaded_file, model, generation_config, task, on_chunk)
 
     finally:
-        # Clean up the files
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                logger.info(f"Successfully deleted video file: {file_path}")
-            except OSError as e:
-                logger.error(f"Error deleting video file {file_path}: {e}")
-        if uploaded_file:
-            try:
-                genai.delete_file(uploaded_file.name)
-                logger.info(f"Successfully deleted uploaded file from Gemini: {uploaded_file.name}")
-            except Exception as e:
-                logger.error(f"Error deleting uploaded file {uploaded_file.name} from Gemini: {e}")
+        # Clean up the uploaded file
+        cleanup_video(uploaded_file)
@@ -0,0 +1,178 @@
+"""
+인기 메뉴/영상 결과를 미리 채워 두는 캐시 워밍업 CLI
+
+    python warmup.py popular.txt --concurrency 2 --rate 20
+    python warmup.py popular.txt --dry-run
+
+입력 파일은 한 줄에 메뉴명 또는 YouTube URL 하나 (# 으로 시작하면 주석).
+메뉴는 레시피 → 조리 시간 → 재료, 영상은 영상 레시피 → 조리 시간 → 재료 순으로 실행하고
+결과는 서비스들이 쓰는 상태 저장소(STATE_DB_PATH)에 그대로 저장됩니다.
+완료된 항목은 진행 파일에 기록되어, 중간에 끊겨도 다시 실행하면 이어서 진행합니다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from api import search_service  # noqa: E402
+from api.ingredient_service import FoodRequest, LinkRequest, get_ingredients_by_link, get_ingredients_by_menu  # noqa: E402
+from utils.state_backend import get_state_backend, text_key  # noqa: E402
+from utils.usage import usage_snapshot  # noqa: E402
+from utils.youtube_download import video_cache_key  # noqa: E402
+
+
+def is_video(item: str) -> bool:
+    return item.startswith("http") and ("youtube.com" in item or "youtu.be" in item)
+
+
+def read_items(path: str) -> list[str]:
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#") and line not in items:
+                items.append(line)
+    return items
+
+
+def read_done(progress_path: str) -> set[str]:
+    done = set()
+    if not os.path.exists(progress_path):
+        return done
+    with open(progress_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 중간에 끊긴 마지막 줄
+            if record.get("status") == "done":
+                done.add(record["item"])
+    return done
+
+
+def cached_stages(item: str) -> list[str]:
+    """이미 저장소에 채워져 있는 단계 목록 (dry-run 출력용)"""
+    store = get_state_backend()
+    if is_video(item):
+        key = video_cache_key(item)
+        recipe = store.get_result("recipe_video", key)
+        stages = [("recipe_video", recipe), ("ingredients_link", store.get_result("ingredients_link", key))]
+    else:
+        key = search_service.menu_key(item)
+        recipe = store.get_result("recipe_text", key)
+        stages = [("recipe_text", recipe), ("ingredients_menu", store.get_result("ingredients_menu", key))]
+    if recipe:
+        stages.append(("cooking_time", store.get_result("cooking_time", text_key(recipe))))
+    return [name for name, value in stages if value is not None]
+
+
+async def warm_menu(menu_name: str):
+    recipe_text = await search_service.search_recipe_text(menu_name)
+    if recipe_text.startswith("❌"):
+        raise RuntimeError(recipe_text)
+    await search_service.estimate_cooking_time(recipe_text)
+    await get_ingredients_by_menu(FoodRequest(food_name=menu_name))
+
+
+async def warm_video(video_url: str):
+    recipe_text = await search_service.search_recipe_video(video_url)
+    if recipe_text.startswith("❌"):
+        raise RuntimeError(recipe_text)
+    await search_service.estimate_cooking_time(recipe_text)
+    await get_ingredients_by_link(LinkRequest(link=video_url))
+
+
+class RateLimiter:
+    """작업 시작 간격을 최소 60/rate 초로 유지"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+async def run(items: list[str], args) -> list[dict]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limiter = RateLimiter(args.rate)
+    progress = open(args.progress, "a", encoding="utf-8")
+    results = []
+
+    async def worker(item: str):
+        async with semaphore:
+            await limiter.wait()
+            job = warm_video if is_video(item) else warm_menu
+            start = time.perf_counter()
+            print(f"▶️ {item}")
+            try:
+                # 서비스 함수들이 내부에서 동기 Gemini 호출을 하므로 항목마다 별도 스레드/이벤트 루프에서 실행
+                await asyncio.to_thread(asyncio.run, job(item))
+                record = {"item": item, "status": "done"}
+            except Exception as e:
+                record = {"item": item, "status": "failed", "error": str(e)}
+            record["seconds"] = round(time.perf_counter() - start, 2)
+            print(f"{'✅' if record['status'] == 'done' else '❌'} {item} ({record['seconds']}s)")
+            progress.write(json.dumps(record, ensure_ascii=False) + "\n")
+            progress.flush()
+            results.append(record)
+
+    try:
+        await asyncio.gather(*(worker(item) for item in items))
+    finally:
+        progress.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm up recipe/ingredient result caches.")
+    parser.add_argument("input", help="메뉴명 또는 YouTube URL 목록 파일")
+    parser.add_argument("--concurrency", type=int, default=2, help="동시에 처리할 항목 수")
+    parser.add_argument("--rate", type=float, default=20, help="분당 최대 시작 항목 수 (0 이면 제한 없음)")
+    parser.add_argument("--progress", default="warmup_progress.jsonl", help="진행 기록 파일 (재실행 시 이어서 진행)")
+    parser.add_argument("--restart", action="store_true", help="진행 기록을 무시하고 처음부터 실행")
+    parser.add_argument("--dry-run", action="store_true", help="실행하지 않고 대상과 캐시 상태만 출력")
+    args = parser.parse_args()
+
+    items = read_items(args.input)
+    done = set() if args.restart else read_done(args.progress)
+    pending = [item for item in items if item not in done]
+    print(f"📋 전체 {len(items)}개, 완료 {len(items) - len(pending)}개, 대기 {len(pending)}개")
+
+    if args.dry_run:
+        for item in pending:
+            kind = "video" if is_video(item) else "menu"
+            cached = ", ".join(cached_stages(item)) or "-"
+            print(f"  [{kind}] {item}  (cached: {cached})")
+        return
+
+    start = time.perf_counter()
+    results = asyncio.run(run(pending, args))
+    elapsed = time.perf_counter() - start
+
+    failed = [r for r in results if r["status"] != "done"]
+    usage = usage_snapshot()
+    print(f"\n{'='*60}")
+    print(f"⏱️ 총 소요 시간: {elapsed:.1f}s, 성공 {len(results) - len(failed)}개, 실패 {len(failed)}개")
+    for task, entry in sorted(usage.items()):
+        print(f"  {task:<22} calls={entry['calls']:<4} prompt={entry['prompt_tokens']:<8} "
+              f"cached={entry['cached_tokens']:<8} output={entry['output_tokens']:<8} total={entry['total_tokens']} "
+              f"avg_latency={entry.get('avg_latency_ms', '-')}ms")
+    print(f"  {'TOTAL':<22} tokens={sum(e['total_tokens'] for e in usage.values())}")
+    for record in failed:
+        print(f"❌ {record['item']}: {record.get('error')}")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()